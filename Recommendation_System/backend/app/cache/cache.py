@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+import orjson
+
+# Sentinel returned by TTLCache.get() when a key is not cached.
+MISSING = object()
+
+
+def json_size(value: Any) -> int:
+    """Approximate the memory held by a JSON-like value by its encoded length."""
+    try:
+        return len(orjson.dumps(value))
+    except TypeError:
+        return len(repr(value))
+
+
+class TTLCache:
+    """Bounded, thread-safe LRU cache whose entries expire after a TTL.
+
+    The cache is bounded both by number of entries and (optionally) by an
+    approximate byte budget computed with ``sizeof``. A ``None`` value stored
+    through ``set_negative`` is a negative entry: it records that the key is
+    known not to exist, typically with a shorter TTL, and ``get`` returns it
+    as ``None`` (distinct from ``MISSING``).
+
+    With ``stale_ttl``, expired entries are kept that much longer: ``get``
+    treats them as missing, but ``get_stale`` still returns them (flagged as
+    stale), e.g. to serve something while the source of truth is unreachable.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 3600.0,
+        max_bytes: Optional[int] = None,
+        negative_ttl: Optional[float] = None,
+        stale_ttl: float = 0.0,
+        sizeof: Callable[[Any], int] = json_size,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.max_bytes = max_bytes or None
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.stale_ttl = stale_ttl
+        self._sizeof = sizeof
+        self._clock = clock
+        # key -> (expires_at, size, value)
+        self._data: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_hits = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, count=False) is not MISSING
+
+    def get(self, key: Hashable, count: bool = True) -> Any:
+        """Return the cached value for ``key`` or ``MISSING``."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] <= self._clock():
+                if entry[0] + self.stale_ttl <= self._clock():
+                    self._remove(key)
+                    self.expirations += 1
+                entry = None
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return MISSING
+            self._data.move_to_end(key)
+            if count:
+                if entry[2] is None:
+                    self.negative_hits += 1
+                else:
+                    self.hits += 1
+            return entry[2]
+
+    def get_stale(self, key: Hashable) -> Tuple[Any, bool]:
+        """``(value, is_stale)`` for ``key``, also finding entries expired less
+        than ``stale_ttl`` ago (``is_stale`` True); ``(MISSING, False)`` if none."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISSING, False
+            now = self._clock()
+            if entry[0] + self.stale_ttl <= now:
+                self._remove(key)
+                self.expirations += 1
+                return MISSING, False
+            is_stale = entry[0] <= now
+            if is_stale:
+                self.stale_hits += 1
+            return entry[2], is_stale
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store ``value`` under ``key``, evicting least recently used entries."""
+        size = self._sizeof(value) if self.max_bytes and value is not None else 0
+        if self.max_bytes and size > self.max_bytes:
+            return
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (expires_at, size, value)
+            self._bytes += size
+            while len(self._data) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes):
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def set_negative(self, key: Hashable) -> None:
+        """Remember that ``key`` does not exist for ``negative_ttl`` seconds."""
+        self.set(key, None, ttl=self.negative_ttl)
+
+    def pop(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISSING
+            self._remove(key)
+            return entry[2]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "stale_hits": self.stale_hits,
+                "hit_ratio": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+    def _remove(self, key: Hashable) -> None:
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Fail fast while an upstream is down, probe it in the background.
+
+    Closed: calls go through and their outcomes are kept for ``window``
+    seconds. Once at least ``min_calls`` outcomes are known and the share of
+    failures reaches ``failure_ratio``, the breaker opens.
+
+    Open: ``allow`` returns False, so callers skip the upstream (and can serve
+    stale data) instead of waiting for timeouts. After ``open_seconds`` the
+    breaker goes half-open and runs ``probe`` once on a timer thread; no user
+    request is used as the probe. A passing probe closes the breaker, a
+    failing one opens it again for twice as long, up to ``max_open_seconds``.
+    """
+
+    def __init__(
+        self,
+        probe: Callable[[], bool],
+        failure_ratio: float = 0.5,
+        min_calls: int = 10,
+        window: float = 30.0,
+        open_seconds: float = 15.0,
+        max_open_seconds: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.probe = probe
+        self.failure_ratio = failure_ratio
+        self.min_calls = max(1, min_calls)
+        self.window = window
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max(open_seconds, max_open_seconds)
+        self._clock = clock
+        self._lock = threading.Lock()
+        # (time, failed) of the calls made while closed, oldest first.
+        self._outcomes = deque()
+        self._failures = 0
+        self.state = CLOSED
+        self.opened_at: Optional[float] = None
+        self.retry_at: Optional[float] = None
+        self._open_for = open_seconds
+        self._timer: Optional[threading.Timer] = None
+        self.opens = 0
+        self.rejected = 0
+        self.probes = 0
+        self.last_error: Optional[str] = None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, ok: bool, error: Optional[str] = None) -> None:
+        """Count the outcome of a call that ``allow`` let through."""
+        with self._lock:
+            if self.state != CLOSED:
+                return
+            now = self._clock()
+            self._outcomes.append((now, not ok))
+            self._failures += not ok
+            while self._outcomes and self._outcomes[0][0] <= now - self.window:
+                self._failures -= self._outcomes.popleft()[1]
+            if ok:
+                return
+            self.last_error = error
+            calls = len(self._outcomes)
+            if calls >= self.min_calls and self._failures >= self.failure_ratio * calls:
+                print(f"[BREAKER] opening: {self._failures}/{calls} calls failed in {self.window:.0f}s ({error})")
+                self._open(now)
+
+    def _open(self, now: float) -> None:
+        if self.state == CLOSED:
+            self.opened_at = now
+        self.state = OPEN
+        self.retry_at = now + self._open_for
+        self.opens += 1
+        self._outcomes.clear()
+        self._failures = 0
+        self._timer = threading.Timer(self._open_for, self._run_probe)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _run_probe(self) -> None:
+        with self._lock:
+            self.state = HALF_OPEN
+            self.probes += 1
+        try:
+            ok, error = bool(self.probe()), "probe failed"
+        except Exception as exc:
+            ok, error = False, str(exc)
+        with self._lock:
+            if ok:
+                print(f"[BREAKER] closing: probe passed after {self._clock() - self.opened_at:.0f}s open")
+                self.state = CLOSED
+                self.retry_at = None
+                self._open_for = self.open_seconds
+            else:
+                self.last_error = error
+                self._open_for = min(self._open_for * 2, self.max_open_seconds)
+                print(f"[BREAKER] probe failed ({error}), staying open for {self._open_for:.0f}s")
+                self._open(self._clock())
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = self._clock()
+            calls = len(self._outcomes)
+            return {
+                "state": self.state,
+                "window_calls": calls,
+                "window_failures": self._failures,
+                "open_for_seconds": None if self.opened_at is None or self.state == CLOSED
+                else round(now - self.opened_at, 3),
+                "next_probe_in_seconds": None if self.retry_at is None else round(max(0.0, self.retry_at - now), 3),
+                "opens": self.opens,
+                "rejected": self.rejected,
+                "probes": self.probes,
+                "last_error": self.last_error,
+            }
@@ -0,0 +1,228 @@
+"""Outbound rate limiting and backoff that do not park request threads.
+
+``TokenBucket`` paces calls to an upstream API: ``rate`` tokens per second
+with bursts of up to ``burst``. It is kept as a GCRA (a single "theoretical
+arrival time") plus a "paused until" time, so the whole state is two floats.
+That state lives either in the process or, with ``shared_path``, in a small
+file locked with ``flock`` so that every worker on the host draws from the
+same bucket. ``pause`` stops all acquisitions for a while, e.g. for the
+``Retry-After`` of a 429.
+
+``BackoffScheduler`` runs a retry later on an executor instead of sleeping
+in the thread that saw the failure.
+"""
+import heapq
+import itertools
+import os
+import struct
+import threading
+import time
+from concurrent.futures import Executor
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-worker coordination
+    fcntl = None
+
+_STATE = struct.Struct("<dd")
+
+
+class _LocalState:
+    """Bucket state shared by the threads of one process."""
+
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = (0.0, 0.0)
+
+    def update(self, fn):
+        with self._lock:
+            self._values, result = fn(self._values, self.clock())
+            return result
+
+
+class _FileState:
+    """Bucket state in a file shared by every process that opens it.
+
+    Times are wall-clock so that they mean the same in every worker.
+    """
+
+    clock = staticmethod(time.time)
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+
+    def update(self, fn):
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                raw = os.pread(self._fd, _STATE.size, 0)
+                values = _STATE.unpack(raw) if len(raw) == _STATE.size else (0.0, 0.0)
+                values, result = fn(values, self.clock())
+                os.pwrite(self._fd, _STATE.pack(*values), 0)
+                return result
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a ``Retry-After`` header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Thread-safe (and optionally cross-process) token bucket."""
+
+    def __init__(self, rate: float, burst: int = 1, shared_path: Optional[str] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.interval = 1.0 / rate
+        self.tolerance = (self.burst - 1) * self.interval
+        if shared_path and fcntl is None:
+            print(f"[RATE] no flock on this platform; {shared_path} ignored, limiting per process")
+            shared_path = None
+        self._state = _FileState(shared_path) if shared_path else _LocalState()
+        self.shared_path = shared_path
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.throttled = 0
+        self.waited_seconds = 0.0
+        self.pauses = 0
+
+    def reserve(self, max_wait: float = 0.0) -> Tuple[bool, float]:
+        """Take the next free slot if it starts within ``max_wait`` seconds.
+
+        Returns ``(reserved, wait)``: the caller owns the slot ``wait``
+        seconds from now, or, when not reserved, the earliest one is that far
+        away and nothing was taken.
+        """
+        def take(values, now):
+            tat, paused_until = values
+            start = max(tat - self.tolerance, paused_until, now)
+            wait = start - now
+            if wait > max_wait:
+                return values, (False, wait)
+            return (max(tat, start) + self.interval, paused_until), (True, wait)
+
+        return self._state.update(take)
+
+    def acquire(self, max_wait: float = 0.0) -> Tuple[bool, float]:
+        """Take a token, sleeping for it only if it is free within ``max_wait``.
+
+        The default never sleeps. Returns ``(granted, wait)``; when not
+        granted, ``wait`` is how far away the next free slot is, e.g. for a
+        Retry-After or a retry delay.
+        """
+        granted, wait = self.reserve(max_wait)
+        with self._lock:
+            if granted:
+                self.acquired += 1
+                self.waited_seconds += wait
+            else:
+                self.throttled += 1
+        if granted and wait > 0:
+            time.sleep(wait)
+        return granted, wait
+
+    def pause(self, seconds: float) -> None:
+        """Grant nothing for ``seconds`` (never shortens a pause in progress)."""
+        def extend(values, now):
+            tat, paused_until = values
+            return (tat, max(paused_until, now + seconds)), None
+
+        self._state.update(extend)
+        with self._lock:
+            self.pauses += 1
+
+    def stats(self) -> dict:
+        paused_for = self._state.update(lambda values, now: (values, max(0.0, values[1] - now)))
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "shared_path": self.shared_path,
+                "acquired": self.acquired,
+                "throttled": self.throttled,
+                "waited_seconds": round(self.waited_seconds, 3),
+                "pauses": self.pauses,
+                "paused_for_seconds": round(paused_for, 3),
+            }
+
+
+class BackoffScheduler:
+    """Run calls after a delay on ``executor`` without blocking the caller.
+
+    A single daemon thread keeps the due times in a heap. Each key has at
+    most one pending call, and at most ``max_pending`` calls wait at once;
+    ``schedule`` returns False for the ones it drops.
+    """
+
+    def __init__(self, executor: Executor, max_pending: int = 10000):
+        self.executor = executor
+        self.max_pending = max_pending
+        self._cond = threading.Condition()
+        self._heap = []
+        self._pending: Dict[Hashable, float] = {}
+        self._order = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+        self.scheduled = 0
+        self.dropped = 0
+        self.ran = 0
+
+    def pending(self, key: Hashable) -> bool:
+        with self._cond:
+            return key in self._pending
+
+    def schedule(self, key: Hashable, delay: float, fn: Callable[[], object]) -> bool:
+        with self._cond:
+            if key in self._pending or len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+            due = time.monotonic() + max(0.0, delay)
+            self._pending[key] = due
+            heapq.heappush(self._heap, (due, next(self._order), key, fn))
+            self.scheduled += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="backoff", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+            return True
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    self._cond.wait(None if not self._heap else self._heap[0][0] - time.monotonic())
+                _, _, key, fn = heapq.heappop(self._heap)
+                # Cleared before running so that fn may schedule the next attempt.
+                del self._pending[key]
+                self.ran += 1
+            try:
+                self.executor.submit(fn)
+            except RuntimeError as exc:  # executor shut down
+                print(f"[RATE] dropped a scheduled retry: {exc}")
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "pending": len(self._pending),
+                "scheduled": self.scheduled,
+                "ran": self.ran,
+                "dropped": self.dropped,
+            }
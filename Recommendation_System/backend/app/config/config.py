@@ -12,6 +12,47 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: Optional[int] = 30
     APP_NAME: Optional[str] = 'Movie Recommendation System'
     DEBUG: Optional[bool] = False
+    GZIP_MINIMUM_SIZE: int = 1024
+    GZIP_COMPRESS_LEVEL: int = 5
+    TMDB_BASE_URL: str = 'https://api.themoviedb.org/3'
+    TMDB_MAX_CONCURRENCY: int = 8
+    TMDB_CACHE_MAX_ENTRIES: int = 5000
+    TMDB_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    TMDB_CACHE_TTL_SECONDS: float = 6 * 60 * 60
+    TMDB_CACHE_NEGATIVE_TTL_SECONDS: float = 60 * 60
+    TMDB_CACHE_STALE_SECONDS: float = 7 * 24 * 60 * 60
+    TMDB_RATE_LIMIT_PER_SECOND: float = 40
+    TMDB_RATE_LIMIT_BURST: int = 20
+    # Hydration workers may wait this long for a token; request threads never wait.
+    TMDB_RATE_LIMIT_WORKER_WAIT_SECONDS: float = 1.0
+    TMDB_RATE_LIMIT_FILE: Optional[str] = None
+    TMDB_RETRY_AFTER_MAX_SECONDS: float = 60
+    TMDB_BREAKER_FAILURE_RATIO: float = 0.5
+    TMDB_BREAKER_MIN_CALLS: int = 10
+    TMDB_BREAKER_WINDOW_SECONDS: float = 30
+    TMDB_BREAKER_OPEN_SECONDS: float = 15
+    TMDB_BREAKER_MAX_OPEN_SECONDS: float = 5 * 60
+    MOVIE_STORE_ENABLED: bool = True
+    MOVIE_STORE_MAX_AGE_SECONDS: float = 7 * 24 * 60 * 60
+    SIMILAR_CACHE_MAX_ENTRIES: int = 4096
+    SIMILAR_CACHE_TTL_SECONDS: float = 24 * 60 * 60
+    RESPONSE_CACHE_MAX_ENTRIES: int = 2000
+    RESPONSE_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    TOP_RATED_CACHE_TTL_SECONDS: float = 60 * 60
+    TOP_RATED_PREWARM_PAGES: int = 3
+    SEARCH_CACHE_TTL_SECONDS: float = 10 * 60
+    DEGRADED_RESPONSE_CACHE_TTL_SECONDS: float = 15
+    USER_RECOMMENDATION_CACHE_MAX_ENTRIES: int = 10000
+    USER_RECOMMENDATION_CACHE_TTL_SECONDS: float = 30 * 60
+    NEIGHBOUR_BACKEND: str = 'exact'
+    ANN_N_PROBE: int = 16
+    ANN_QUERY_WORKERS: int = 1
+    MODEL_DOWNLOAD_SEGMENTS: int = 4
+    MODEL_DOWNLOAD_TIMEOUT_SECONDS: float = 60
+    MODEL_WATCH_INTERVAL_SECONDS: float = 30
+    ADMIN_TOKEN: Optional[str] = None
+    COLD_START_POOL_SIZE: int = 5000
+    COLD_START_REFRESH_SECONDS: float = 15 * 60
 
     model_config = {
         'env_file': '.env',
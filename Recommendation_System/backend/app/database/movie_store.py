@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Tuple
+
+from pymongo import UpdateOne
+
+from app.database.database import movie_data
+
+# TMDB movie details are stored on the catalogue documents of ``all_movies``
+# under these fields, next to the existing ``id``/``title`` keys. Only
+# documents that already exist are updated: the catalogue is what the
+# cold-start pool and the model build read, so hydrating an id it does not
+# have (a history entry, a TMDB search hit) must not add a movie to it.
+DETAILS_FIELD = "tmdb_details"
+UPDATED_AT_FIELD = "tmdb_details_updated_at"
+
+_index_ready = False
+
+
+def _ensure_index():
+    """Create the ``id`` index used by the ``$in`` lookups (once per process)."""
+    global _index_ready
+    if not _index_ready:
+        movie_data.create_index("id")
+        _index_ready = True
+
+
+def find_movie_details(movie_ids: Iterable[int], max_age: timedelta) -> Tuple[Dict[int, dict], List[int]]:
+    """Look up stored TMDB details for many ids with a single ``$in`` query.
+
+    Returns ``(found, stale)``: ``found`` maps id -> details for every id that
+    has stored details, and ``stale`` lists the ids among them whose details
+    are older than ``max_age`` and should be refreshed in the background.
+    """
+    ids = list(dict.fromkeys(movie_ids))
+    if not ids:
+        return {}, []
+
+    cursor = movie_data.find(
+        {"id": {"$in": ids}, DETAILS_FIELD: {"$exists": True}},
+        {"_id": 0, "id": 1, DETAILS_FIELD: 1, UPDATED_AT_FIELD: 1}
+    )
+    cutoff = datetime.now(timezone.utc) - max_age
+    found, stale = {}, []
+    for doc in cursor:
+        found[doc["id"]] = doc[DETAILS_FIELD]
+        updated_at = doc.get(UPDATED_AT_FIELD)
+        if updated_at is not None and updated_at.tzinfo is None:
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        if updated_at is None or updated_at < cutoff:
+            stale.append(doc["id"])
+    return found, stale
+
+
+def save_movie_details(movies: Iterable[dict]) -> int:
+    """Store fetched TMDB details on their catalogue documents in one
+    unordered ``bulk_write``. Ids ``all_movies`` does not have are skipped.
+
+    Returns the number of documents written.
+    """
+    now = datetime.now(timezone.utc)
+    operations = [
+        UpdateOne({"id": movie["id"]}, {"$set": {DETAILS_FIELD: movie, UPDATED_AT_FIELD: now}}, upsert=False)
+        for movie in movies
+        if movie and movie.get("id") is not None
+    ]
+    if not operations:
+        return 0
+    _ensure_index()
+    result = movie_data.bulk_write(operations, ordered=False)
+    return result.modified_count
@@ -0,0 +1,292 @@
+"""Approximate nearest-neighbour backend over per-movie feature vectors.
+
+The neighbour index (neighbour_index.py) and the dense matrix both need every
+pair scored offline, which stops scaling long before a million titles. This
+module keeps one L2-normalised vector per movie instead and answers "most
+similar to X" with an inverted-file (IVF) index, in pure NumPy/SciPy:
+
+* build: spherical k-means on a sample of the vectors gives ``n_lists``
+  centroids and every movie is filed under its nearest centroid,
+* query: score the centroids, gather the movies of the ``n_probe`` closest
+  lists and rank those candidates by their exact cosine.
+
+The vectors are the sparse TF-IDF features written by build_model.py, or a
+dense ``embeddings`` (N, d) array when the artifact carries one (``build
+--dim`` makes one by random projection, smaller but less exact). The index
+itself adds, next to the usual arrays:
+
+    ann_centroids   float32 (n_lists, d)
+    ann_offsets     int64   (n_lists + 1,)   list l is ann_rows[offsets[l]:offsets[l+1]]
+    ann_rows        int32   (N,)             model rows grouped by list
+
+Build and query work in blocks over a thread pool (NumPy and SciPy release
+the GIL in the products); the worker counts are parameters. Serving picks
+this backend with ``NEIGHBOUR_BACKEND=ivf`` (see recommand.py).
+
+Usage (from the backend directory):
+    python -m app.recommendation_model.ann_index build [--lists 1024] [--workers 4] [--dim 256]
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from app.recommendation_model import artifacts
+from app.recommendation_model.topk import top_k, top_k_block
+
+DEFAULT_N_PROBE = 16
+DEFAULT_KMEANS_ITERATIONS = 10
+DEFAULT_TRAIN_SAMPLE = 64 * 1024
+ASSIGN_BLOCK_SIZE = 16 * 1024
+ANN_ARRAYS = ("ann_centroids", "ann_offsets", "ann_rows")
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _dense(vectors) -> np.ndarray:
+    if sparse.issparse(vectors):
+        return vectors.toarray().astype(np.float32, copy=False)
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def default_n_lists(n: int) -> int:
+    """About sqrt(N) lists: a probe scans ~n_probe * sqrt(N) vectors."""
+    return max(1, int(np.sqrt(n)))
+
+
+def _map_blocks(fn, n: int, block_size: int, workers: int):
+    """``fn(start, stop)`` over row blocks, on ``workers`` threads."""
+    blocks = [(start, min(start + block_size, n)) for start in range(0, n, block_size)]
+    if workers <= 1 or len(blocks) <= 1:
+        return [fn(start, stop) for start, stop in blocks]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda bounds: fn(*bounds), blocks))
+
+
+def assign(vectors, centroids: np.ndarray, workers: int = 1, block_size: int = ASSIGN_BLOCK_SIZE) -> np.ndarray:
+    """Index of the most similar centroid for every vector (dense or CSR rows)."""
+    def block(start, stop):
+        return np.asarray(np.argmax(vectors[start:stop] @ centroids.T, axis=1)).ravel()
+
+    return np.concatenate(_map_blocks(block, vectors.shape[0], block_size, workers))
+
+
+def spherical_kmeans(vectors, n_lists: int, iterations: int = DEFAULT_KMEANS_ITERATIONS,
+                     workers: int = 1, seed: int = 0) -> np.ndarray:
+    """Unit-norm centroids maximising the summed cosine to their members."""
+    rng = np.random.default_rng(seed)
+    n = vectors.shape[0]
+    centroids = _dense(vectors[rng.choice(n, size=n_lists, replace=False)])
+    for _ in range(iterations):
+        labels = assign(vectors, centroids, workers)
+        members = sparse.csr_matrix(
+            (np.ones(n, dtype=np.float32), (labels, np.arange(n))), shape=(n_lists, n)
+        )
+        sums = _dense(members @ vectors)
+        empty = np.flatnonzero(~sums.any(axis=1))
+        # Re-seed empty lists with random members so no list is wasted.
+        sums[empty] = _dense(vectors[rng.choice(n, size=len(empty), replace=False)])
+        centroids = normalize(sums)
+    return centroids
+
+
+class IVFIndex:
+    """Inverted-file index answering top-k cosine queries approximately.
+
+    ``vectors`` are the per-movie vectors in model row order, a dense array
+    or a CSR matrix; the index only stores which rows belong to which list.
+    """
+
+    def __init__(self, vectors, centroids: np.ndarray, offsets: np.ndarray, rows: np.ndarray,
+                 n_probe: int = DEFAULT_N_PROBE, workers: int = 1):
+        self.vectors = vectors
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.offsets = offsets
+        self.rows = rows
+        self.n_probe = min(n_probe, len(self.centroids))
+        self.workers = workers
+
+    @classmethod
+    def build(cls, vectors, n_lists: Optional[int] = None, iterations: int = DEFAULT_KMEANS_ITERATIONS,
+              train_sample: int = DEFAULT_TRAIN_SAMPLE, workers: int = 1, seed: int = 0,
+              **kwargs) -> "IVFIndex":
+        """Train the centroids on a sample of ``vectors`` and fill the lists.
+
+        ``vectors`` should be L2-normalised rows.
+        """
+        n = vectors.shape[0]
+        n_lists = min(n_lists or default_n_lists(n), n)
+        rng = np.random.default_rng(seed)
+        sample = vectors[np.sort(rng.choice(n, size=min(train_sample, n), replace=False))]
+        centroids = spherical_kmeans(sample, n_lists, iterations, workers, seed)
+
+        labels = assign(vectors, centroids, workers)
+        rows = np.argsort(labels, kind="stable").astype(np.int32)
+        offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(labels, minlength=n_lists))
+        return cls(vectors, centroids, offsets, rows, workers=workers, **kwargs)
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], **kwargs) -> "IVFIndex":
+        """Open the index stored in an artifact's arrays (see ``index_vectors``)."""
+        return cls(index_vectors(arrays), arrays["ann_centroids"], arrays["ann_offsets"], arrays["ann_rows"],
+                   **kwargs)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {"ann_centroids": self.centroids, "ann_offsets": self.offsets, "ann_rows": self.rows}
+
+    @property
+    def nbytes(self) -> int:
+        return sum(np.asarray(a).nbytes for a in self.to_arrays().values())
+
+    def vectors_for_rows(self, rows) -> np.ndarray:
+        """Dense float32 vectors of the given model rows."""
+        return _dense(self.vectors[np.asarray(rows, dtype=np.int64)])
+
+    def _search_one(self, query: np.ndarray, lists: np.ndarray, k: int, exclude: np.ndarray,
+                    mask: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        rows = np.concatenate([self.rows[self.offsets[list_id]:self.offsets[list_id + 1]]
+                               for list_id in lists]).astype(np.int64)
+        if mask is not None:
+            rows = rows[mask[rows]]
+        if len(exclude):
+            rows = rows[~np.isin(rows, exclude)]
+        scores = np.asarray(self.vectors[rows] @ query, dtype=np.float32).ravel()
+        top = top_k(scores, min(k, len(scores)))
+        # Same order as the exact paths: score descending, then row ascending.
+        order = np.lexsort((rows[top], -scores[top]))
+        return rows[top][order], scores[top][order]
+
+    def search(self, queries: np.ndarray, k: int, exclude: Optional[Sequence[Sequence[int]]] = None,
+               n_probe: Optional[int] = None, mask: Optional[np.ndarray] = None):
+        """Approximate top-``k`` rows per query: a list of ``(rows, scores)``.
+
+        ``exclude`` optionally gives, per query, rows never to return (the
+        seeds themselves). ``mask`` restricts every query to the rows where it
+        is true; ``n_probe`` then grows with the inverse of the fraction kept,
+        so about as many candidates are scored as without a filter. Queries
+        are spread over ``workers`` threads.
+        """
+        queries = normalize(np.atleast_2d(queries))
+        n_probe = n_probe or self.n_probe
+        if mask is not None:
+            n_probe = int(np.ceil(n_probe * len(mask) / max(1, np.count_nonzero(mask))))
+        n_probe = min(n_probe, len(self.centroids))
+        probes = top_k_block(queries @ self.centroids.T, n_probe)
+        exclude = exclude if exclude is not None else [()] * len(queries)
+
+        def block(start, stop):
+            return [self._search_one(queries[i], probes[i], k, np.asarray(exclude[i], dtype=np.int64), mask)
+                    for i in range(start, stop)]
+
+        block_size = max(1, -(-len(queries) // max(1, self.workers)))
+        return [hit for hits in _map_blocks(block, len(queries), block_size, self.workers) for hit in hits]
+
+
+def brute_force(vectors: np.ndarray, queries: np.ndarray, k: int, exclude=None,
+                block_size: int = ASSIGN_BLOCK_SIZE * 4) -> np.ndarray:
+    """Exact top-``k`` rows per query by scanning every vector, for recall checks."""
+    queries = normalize(np.atleast_2d(queries))
+    n = vectors.shape[0]
+    best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+    best_rows = np.empty((len(queries), 0), dtype=np.int64)
+    for start in range(0, n, block_size):
+        scores = np.asarray(vectors[start:start + block_size] @ queries.T, dtype=np.float32).T
+        if exclude is not None:
+            for q, rows in enumerate(exclude):
+                rows = np.asarray(rows, dtype=np.int64)
+                rows = rows[(rows >= start) & (rows < start + scores.shape[1])]
+                scores[q, rows - start] = -np.inf
+        all_scores = np.hstack([best_scores, scores])
+        all_rows = np.hstack([best_rows, np.broadcast_to(np.arange(start, start + scores.shape[1]), scores.shape)])
+        top = top_k_block(all_scores, min(k, all_scores.shape[1]))
+        best_scores = np.take_along_axis(all_scores, top, axis=1)
+        best_rows = np.take_along_axis(all_rows, top, axis=1)
+    return best_rows
+
+
+# ---------------------------------------------------------------------------
+# Artifacts
+# ---------------------------------------------------------------------------
+def index_vectors(arrays: Dict[str, np.ndarray]):
+    """The vectors an artifact's IVF index ranks: ``embeddings`` or the sparse features."""
+    if arrays.get("embeddings") is not None:
+        return arrays["embeddings"]
+    if arrays.get("feature_indptr") is None:
+        raise ValueError("artifact has neither embeddings nor features (see build_model.py)")
+    from app.recommendation_model.build_model import load_features
+
+    return load_features(arrays)
+
+
+def random_projection(features, dim: int, seed: int = 0, block_size: int = ASSIGN_BLOCK_SIZE) -> np.ndarray:
+    """Gaussian random projection of the (sparse) features to ``dim`` dense dimensions.
+
+    Approximately preserves cosine similarity; the error shrinks with ``dim``.
+    """
+    projection = np.random.default_rng(seed).standard_normal((features.shape[1], dim)).astype(np.float32)
+    out = np.empty((features.shape[0], dim), dtype=np.float32)
+    for start in range(0, features.shape[0], block_size):
+        out[start:start + block_size] = features[start:start + block_size] @ projection
+    return normalize(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    cmd = sub.add_parser("build", help="add an IVF index to an artifact, as a new version")
+    cmd.add_argument("--base", default=None, help="artifact version to index (default: CURRENT)")
+    cmd.add_argument("--lists", type=int, default=None, help="number of IVF lists (default: sqrt(N))")
+    cmd.add_argument("--dim", type=int, default=None,
+                     help="store dense embeddings of this size (random projection of the features)")
+    cmd.add_argument("--iterations", type=int, default=DEFAULT_KMEANS_ITERATIONS)
+    cmd.add_argument("--workers", type=int, default=1)
+    cmd.add_argument("--version", default=None, help="artifact version name")
+    cmd.add_argument("--no-activate", action="store_true", help="do not update artifacts/CURRENT")
+    args = parser.parse_args()
+
+    base = args.base or artifacts.current_version()
+    if base is None:
+        print("[MODEL] no --base given and artifacts/CURRENT is missing")
+        return 1
+    artifact = artifacts.load_artifact(artifacts.ARTIFACTS_DIR / base)
+    arrays = dict(artifact.arrays)
+
+    t0 = time.perf_counter()
+    if args.dim:
+        from app.recommendation_model.build_model import load_features
+
+        arrays["embeddings"] = random_projection(load_features(artifact), args.dim)
+    vectors = index_vectors(arrays)
+    index = IVFIndex.build(vectors, args.lists, args.iterations, workers=args.workers)
+    elapsed = time.perf_counter() - t0
+
+    arrays.update(index.to_arrays())
+    unaligned = {name for name, entry in artifact.manifest["arrays"].items() if not entry.get("row_aligned", True)}
+    version = args.version or artifacts.new_version_name()
+    extra = {key: value for key, value in artifact.manifest.items()
+             if key not in ("format_version", "version", "created_at", "movies", "arrays")}
+    artifacts.write_artifact(
+        artifacts.ARTIFACTS_DIR / version, arrays, version,
+        {**extra, "ann": {"type": "ivf", "lists": len(index.centroids), "dim": int(vectors.shape[1])},
+         "base_version": base},
+        unaligned=unaligned | set(ANN_ARRAYS),
+    )
+    if not args.no_activate:
+        artifacts.set_current_version(version)
+    print(f"[MODEL] IVF index over {vectors.shape[0]} movies ({len(index.centroids)} lists, "
+          f"{index.nbytes / 2**20:.1f} MiB) built in {elapsed:.1f}s, wrote artifact {version}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+"""Versioned, pickle-free on-disk format for the recommendation model.
+
+An artifact version is a directory of plain ``.npy`` arrays plus a small
+``manifest.json``:
+
+    artifacts/
+        CURRENT                 name of the version served by default
+        <version>/
+            manifest.json
+            ids.npy             int64   (N,)    TMDB id of each row
+            titles.npy          unicode (N,)    title of each row
+            popularity.npy      float32 (N,)    optional, ranks search hits
+            neighbour_rows.npy  int32   (N, k)  see neighbour_index.py
+            neighbour_scores.npy float16 (N, k)
+            similarity.npy      (N, N)          optional dense matrix (float64/32/16)
+            similarity_q.npy    int8    (N, N)  or the same as per-row scaled int8,
+            similarity_scale.npy float32 (N,)   see quantize.py
+            feature_*.npy, vocabulary.npy, idf.npy
+                                optional sparse features (build_model.py)
+            genre_bits.npy, years.npy, language_codes.npy, ...
+                                optional filter columns (filter_index.py)
+
+Arrays are opened with ``np.load(mmap_mode="r")`` so the pages are shared
+between uvicorn workers through the OS page cache instead of being copied
+into each process, and opening a version costs a few syscalls.
+
+Usage (from the backend directory; ``convert`` needs pandas for the pickles):
+    python -m app.recommendation_model.artifacts convert [--k 200] [--keep-dense [--similarity-dtype int8]]
+    python -m app.recommendation_model.artifacts verify [--version NAME]
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from app.recommendation_model.neighbour_index import DEFAULT_K, build_neighbour_index, rank_row
+from app.recommendation_model.quantize import DTYPES, quantize_arrays, similarity_from_arrays
+
+FORMAT_VERSION = 1
+MODEL_DIR = Path(__file__).resolve().parent
+ARTIFACTS_DIR = MODEL_DIR / "artifacts"
+CURRENT_FILE = ARTIFACTS_DIR / "CURRENT"
+MANIFEST_NAME = "manifest.json"
+REQUIRED_ARRAYS = ("ids", "titles")
+
+
+class ModelArtifact:
+    """A loaded artifact version: its manifest and (memory-mapped) arrays."""
+
+    def __init__(self, path: Path, manifest: dict, arrays: Dict[str, np.ndarray]):
+        self.path = path
+        self.manifest = manifest
+        self.arrays = arrays
+
+    @property
+    def version(self) -> str:
+        return self.manifest["version"]
+
+    def get(self, name: str) -> Optional[np.ndarray]:
+        return self.arrays.get(name)
+
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def new_version_name() -> str:
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def write_artifact(out_dir: Path, arrays: Dict[str, np.ndarray], version: str, extra: Optional[dict] = None,
+                   unaligned: Iterable[str] = ()) -> dict:
+    """Write ``arrays`` as ``.npy`` files plus a manifest into ``out_dir``.
+
+    Every array has one entry per movie along its first axis, except those
+    named in ``unaligned`` (e.g. the CSR parts of the feature matrix).
+    """
+    unaligned = set(unaligned)
+    missing = [name for name in REQUIRED_ARRAYS if name not in arrays]
+    if missing:
+        raise ValueError(f"artifact is missing required arrays: {missing}")
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    entries = {}
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        file_name = f"{name}.npy"
+        np.save(out_dir / file_name, array, allow_pickle=False)
+        entries[name] = {
+            "file": file_name,
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "bytes": (out_dir / file_name).stat().st_size,
+            "sha256": file_sha256(out_dir / file_name),
+            "row_aligned": name not in unaligned,
+        }
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "movies": int(arrays["ids"].shape[0]),
+        "arrays": entries,
+        **(extra or {}),
+    }
+    tmp = out_dir / (MANIFEST_NAME + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp, out_dir / MANIFEST_NAME)
+    return manifest
+
+
+def read_manifest(path: Path) -> dict:
+    manifest = json.loads((path / MANIFEST_NAME).read_text())
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(
+            f"unsupported artifact format {manifest.get('format_version')!r} in {path} "
+            f"(expected {FORMAT_VERSION})"
+        )
+    return manifest
+
+
+def load_artifact(path: Path, mmap: bool = True) -> ModelArtifact:
+    """Open an artifact version, memory-mapping every array read-only."""
+    manifest = read_manifest(path)
+    arrays = {}
+    for name, entry in manifest["arrays"].items():
+        array = np.load(path / entry["file"], mmap_mode="r" if mmap else None, allow_pickle=False)
+        if list(array.shape) != entry["shape"] or array.dtype.str != entry["dtype"]:
+            raise ValueError(f"{entry['file']} does not match its manifest entry")
+        arrays[name] = array
+    n = manifest["movies"]
+    for name, array in arrays.items():
+        if manifest["arrays"][name].get("row_aligned", True) and array.shape[0] != n:
+            raise ValueError(f"{name} has {array.shape[0]} rows, manifest says {n}")
+    return ModelArtifact(path, manifest, arrays)
+
+
+def current_version() -> Optional[str]:
+    if not CURRENT_FILE.exists():
+        return None
+    return CURRENT_FILE.read_text().strip() or None
+
+
+def set_current_version(version: str) -> None:
+    tmp = CURRENT_FILE.with_suffix(".tmp")
+    tmp.write_text(version)
+    os.replace(tmp, CURRENT_FILE)
+
+
+# ---------------------------------------------------------------------------
+# Conversion from the legacy pickles
+# ---------------------------------------------------------------------------
+def _load_pickles(movie_df_path: Path, vector_path: Path):
+    with open(movie_df_path, "rb") as f:
+        movie_df = pickle.load(f)
+    with open(vector_path, "rb") as f:
+        vector = pickle.load(f)
+    return movie_df, np.asarray(vector)
+
+
+def arrays_from_movie_df(movie_df) -> Dict[str, np.ndarray]:
+    """Extract the columns the serving code needs from the legacy DataFrame."""
+    from app.recommendation_model.filter_index import filter_arrays_from_movie_df
+
+    movie_df = movie_df.reset_index(drop=True)
+    arrays = {
+        "ids": movie_df["id"].to_numpy(dtype=np.int64),
+        "titles": np.array(movie_df["title"].fillna("").astype(str).tolist(), dtype=str),
+    }
+    for column in ("popularity", "vote_count"):
+        if column in movie_df.columns:
+            arrays["popularity"] = movie_df[column].fillna(0).to_numpy(dtype=np.float32)
+            break
+    arrays.update(filter_arrays_from_movie_df(movie_df) or {})
+    return arrays
+
+
+def convert(movie_df_path: Path, vector_path: Path, k: int, keep_dense: bool, version: Optional[str],
+            similarity_dtype: str = "float64") -> dict:
+    from app.recommendation_model.filter_index import FILTER_VOCABULARIES
+
+    movie_df, vector = _load_pickles(movie_df_path, vector_path)
+    arrays = arrays_from_movie_df(movie_df)
+    if vector.shape != (len(arrays["ids"]), len(arrays["ids"])):
+        raise ValueError(f"vector shape {vector.shape} does not match {len(arrays['ids'])} movies")
+
+    rows, scores = build_neighbour_index(vector, k=k)
+    arrays["neighbour_rows"] = rows
+    arrays["neighbour_scores"] = scores
+    if keep_dense:
+        arrays.update(quantize_arrays(vector, similarity_dtype))
+
+    version = version or new_version_name()
+    extra = {"source": "pickle"}
+    if keep_dense:
+        extra["similarity_dtype"] = similarity_dtype
+    manifest = write_artifact(ARTIFACTS_DIR / version, arrays, version, extra,
+                              unaligned=FILTER_VOCABULARIES)
+    set_current_version(version)
+    return manifest
+
+
+def verify(movie_df_path: Path, vector_path: Path, version: Optional[str], top: int = 12) -> int:
+    """Check that an artifact recommends exactly what the pickles recommend.
+
+    For every movie the reference top-``top`` list is ranked straight from the
+    dense pickle with the same ordering rule; returns the number of movies
+    whose TMDB id lists differ.
+    """
+    movie_df, vector = _load_pickles(movie_df_path, vector_path)
+    legacy = arrays_from_movie_df(movie_df)
+    version = version or current_version()
+    if version is None:
+        raise SystemExit("no artifact version given and artifacts/CURRENT is missing")
+    artifact = load_artifact(ARTIFACTS_DIR / version)
+    ids = artifact.get("ids")
+    rows = artifact.get("neighbour_rows")
+
+    if not np.array_equal(legacy["ids"], ids) or not np.array_equal(legacy["titles"], artifact.get("titles")):
+        print("[VERIFY] ids/titles differ between pickle and artifact")
+        return len(ids)
+
+    mismatches = 0
+    for i in range(len(ids)):
+        expected = legacy["ids"][rank_row(vector[i], i, top)]
+        if rows is not None and rows.shape[1] >= top:
+            actual = ids[rows[i, :top]]
+        else:
+            actual = ids[rank_row(similarity_from_arrays(artifact.arrays)[i], i, top)]
+        if not np.array_equal(expected, actual):
+            mismatches += 1
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("convert", "verify"):
+        cmd = sub.add_parser(name)
+        cmd.add_argument("--movie-df", type=Path, default=MODEL_DIR / "movie_df.pkl")
+        cmd.add_argument("--vector", type=Path, default=MODEL_DIR / "vector.pkl")
+        cmd.add_argument("--version", default=None, help="artifact version name")
+    sub.choices["convert"].add_argument("--k", type=int, default=DEFAULT_K, help="neighbours kept per movie")
+    sub.choices["convert"].add_argument("--keep-dense", action="store_true", help="also store the dense matrix")
+    sub.choices["convert"].add_argument("--similarity-dtype", choices=DTYPES, default="float64",
+                                        help="storage type of the dense matrix (see quantize.py)")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        t0 = time.perf_counter()
+        manifest = convert(args.movie_df, args.vector, args.k, args.keep_dense, args.version, args.similarity_dtype)
+        size = sum(entry["bytes"] for entry in manifest["arrays"].values())
+        print(f"[MODEL] wrote artifact {manifest['version']} ({manifest['movies']} movies, "
+              f"{size / 2**20:.1f} MiB) in {time.perf_counter() - t0:.1f}s")
+        return 0
+
+    mismatches = verify(args.movie_df, args.vector, args.version)
+    if mismatches:
+        print(f"[VERIFY] FAILED: {mismatches} movies get different recommendations")
+        return 1
+    print("[VERIFY] OK: recommendations are identical")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,616 @@
+"""Offline build of the serving artifacts from the ``all_movies`` collection.
+
+Pipeline:
+
+1. stream documents out of ``all_movies`` in batches (only the fields used),
+2. turn each movie into a bag of tags (its ``tags`` string when present,
+   otherwise overview, genres, keywords, top cast and director, also taken
+   from the stored TMDB details) and build a sparse CSR feature matrix,
+   keeping the ``--max-features`` most frequent terms, weighted by raw counts
+   or TF-IDF and L2-normalised,
+3. rank neighbours by cosine similarity in row blocks (``X[block] @ X.T``,
+   sparse) across a process pool, keeping only the top ``k`` per movie, so
+   the N x N matrix never exists,
+4. write a new artifact version (see artifacts.py) with the neighbour index,
+   ids, titles, popularity and the feature matrix, and mark it current.
+
+``--incremental`` instead starts from the current artifact and only adds the
+movies of ``all_movies`` it does not know yet: they are vectorized with the
+stored vocabulary and idf, ranked against the whole catalogue in one block
+pass, and existing neighbour lists are patched where a newcomer now ranks in
+their top ``k``. The cost grows with the number of added movies times the
+catalogue size instead of the catalogue size squared. Term weights are not
+re-fitted, so a full rebuild is still worth running now and then.
+
+Peak memory (this process and its workers) and wall time are reported at
+the end, so the job can be sized for a nightly rebuild.
+
+Usage (from the backend directory):
+    python -m app.recommendation_model.build_model [--k 200] [--workers 4]
+    python -m app.recommendation_model.build_model --incremental [--base VERSION]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_all_start_methods, get_context
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from app.recommendation_model import artifacts
+from app.recommendation_model.filter_index import FILTER_ARRAYS, FILTER_VOCABULARIES, FilterColumns, extend_filter_arrays
+from app.recommendation_model.neighbour_index import DEFAULT_K
+from app.recommendation_model.topk import top_k, top_k_block
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+DEFAULT_MAX_FEATURES = 5000
+DEFAULT_BATCH_SIZE = 2000
+DEFAULT_BLOCK_SIZE = 256
+# Similarity blocks with more than this fraction of non-zeros are ranked dense.
+DENSE_BLOCK_DENSITY = 0.05
+# A worker multiplies and ranks at most this many bytes of dense (rows, N)
+# float64 similarity at once; large catalogues get fewer rows per product.
+DENSE_BLOCK_MAX_BYTES = 64 << 20
+ID_FIELDS = ("id", "tmdb_id", "movieId", "movie_id")
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset("""
+a about after again against all an and any are as at be because been before being between both but by
+can could did do does doing down during each few for from further had has have having he her here hers
+him his how i if in into is it its itself just me more most my no nor not now of off on once only or
+other our out over own same she should so some such than that the their them then there these they this
+those through to too under until up very was we were what when where which while who whom why will with
+would you your
+""".split())
+PROJECTION = {
+    "_id": 0, "id": 1, "tmdb_id": 1, "movieId": 1, "movie_id": 1, "title": 1, "tags": 1,
+    "overview": 1, "genres": 1, "keywords": 1, "cast": 1, "crew": 1, "director": 1,
+    "popularity": 1, "vote_count": 1, "genre_ids": 1, "release_date": 1, "year": 1, "original_language": 1,
+    "tmdb_details": 1,
+}
+
+
+# ---------------------------------------------------------------------------
+# Documents -> tokens
+# ---------------------------------------------------------------------------
+def _names(value) -> List[str]:
+    """Names from a list of strings or TMDB-style ``{"name": ...}`` dicts."""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        value = value.get("keywords") or value.get("results") or []
+    names = []
+    for item in value or []:
+        name = item.get("name") if isinstance(item, dict) else item
+        if name:
+            names.append(str(name))
+    return names
+
+
+def _directors(doc) -> List[str]:
+    if doc.get("director"):
+        return _names(doc["director"])
+    return [c["name"] for c in doc.get("crew") or [] if isinstance(c, dict) and c.get("job") == "Director"]
+
+
+def document_tokens(doc: dict) -> List[str]:
+    """Bag of tags for one ``all_movies`` document.
+
+    Multi-word names (genres, keywords, people) are collapsed into one tag,
+    e.g. "Science Fiction" -> "sciencefiction".
+    """
+    if isinstance(doc.get("tags"), str):
+        return [t for t in TOKEN_RE.findall(doc["tags"].lower()) if t not in STOP_WORDS]
+
+    details = doc.get("tmdb_details") or {}
+
+    def field(name):
+        return doc.get(name) if doc.get(name) is not None else details.get(name)
+
+    words = [t for t in TOKEN_RE.findall(str(field("overview") or "").lower()) if t not in STOP_WORDS]
+    tags = _names(field("genres")) + _names(field("keywords")) + _names(field("cast"))[:3] + _directors(doc)
+    words += ["".join(TOKEN_RE.findall(tag.lower())) for tag in tags]
+    return [w for w in words if w]
+
+
+def document_id(doc: dict) -> Optional[int]:
+    for key in ID_FIELDS:
+        if doc.get(key) is not None:
+            try:
+                return int(doc[key])
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+def stream_new_movies(known_ids: Iterable[int], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[dict]]:
+    """Yield batches of the ``all_movies`` documents whose id is not in ``known_ids``.
+
+    Only ids are read for the whole collection; full documents are fetched
+    for the new movies alone.
+    """
+    from app.database.database import movie_data
+
+    known = set(int(i) for i in known_ids)
+    id_projection = {"_id": 0, **{key: 1 for key in ID_FIELDS}}
+    new_ids = []
+    for doc in movie_data.find({}, id_projection, batch_size=10 * batch_size):
+        movie_id = document_id(doc)
+        if movie_id is not None and movie_id not in known:
+            known.add(movie_id)
+            new_ids.append(movie_id)
+    for start in range(0, len(new_ids), batch_size):
+        chunk = new_ids[start:start + batch_size]
+        yield list(movie_data.find({"$or": [{key: {"$in": chunk}} for key in ID_FIELDS]}, PROJECTION))
+
+
+def stream_catalogue(batch_size: int = DEFAULT_BATCH_SIZE, query: Optional[dict] = None) -> Iterator[List[dict]]:
+    """Yield lists of ``all_movies`` documents, ``batch_size`` at a time."""
+    from app.database.database import movie_data
+
+    batch = []
+    for doc in movie_data.find(query or {}, PROJECTION, batch_size=batch_size):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ---------------------------------------------------------------------------
+# Tokens -> sparse features
+# ---------------------------------------------------------------------------
+def _count_terms(batches: Iterable[List[dict]], term_id, seen: Optional[set] = None):
+    """Per-movie term counts for every usable, not yet ``seen`` document.
+
+    ``term_id(token)`` maps a token to its column, or to ``None`` to drop it.
+    Returns ``(arrays, rows, indices, data)``, the last three being the
+    COO triplets of the count matrix; ``arrays`` includes the filter
+    columns (see filter_index.py).
+    """
+    ids, titles, popularity = [], [], []
+    filters = FilterColumns()
+    indices, data, lengths = [], [], []
+    seen = set() if seen is None else seen
+    for batch in batches:
+        for doc in batch:
+            movie_id = document_id(doc)
+            if movie_id is None or movie_id in seen:
+                continue
+            seen.add(movie_id)
+            counts = Counter(t for t in map(term_id, document_tokens(doc)) if t is not None)
+            ids.append(movie_id)
+            titles.append(str(doc.get("title") or ""))
+            popularity.append(float(doc.get("popularity") or doc.get("vote_count") or 0))
+            filters.add_document(doc)
+            indices.append(np.fromiter(counts.keys(), dtype=np.int64, count=len(counts)))
+            data.append(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+            lengths.append(len(counts))
+
+    arrays = {
+        "ids": np.array(ids, dtype=np.int64),
+        "titles": np.array(titles, dtype=str),
+        "popularity": np.array(popularity, dtype=np.float32),
+        **filters.to_arrays(),
+    }
+    indices = np.concatenate(indices) if indices else np.empty(0, dtype=np.int64)
+    data = np.concatenate(data) if data else np.empty(0, dtype=np.float32)
+    rows = np.repeat(np.arange(len(ids)), lengths)
+    return arrays, rows, indices, data
+
+
+def build_features(batches: Iterable[List[dict]], max_features: int = DEFAULT_MAX_FEATURES,
+                   weighting: str = "tfidf"):
+    """Build the catalogue arrays and the L2-normalised CSR feature matrix.
+
+    Returns ``(arrays, features, vocabulary, idf)`` where ``arrays`` holds
+    ids/titles/popularity and the filter columns, ``vocabulary`` the kept terms in column order and
+    ``idf`` their weights (all ones for ``weighting="count"``).
+    """
+    term_ids = {}
+    arrays, rows, indices, data = _count_terms(batches, lambda t: term_ids.setdefault(t, len(term_ids)))
+    n = len(arrays["ids"])
+
+    # Keep the most frequent terms, like CountVectorizer(max_features=...).
+    totals = np.bincount(indices, weights=data, minlength=len(term_ids))
+    kept = np.sort(np.argsort(-totals, kind="stable")[:max_features])
+    remap = np.full(len(term_ids), -1, dtype=np.int64)
+    remap[kept] = np.arange(len(kept))
+    columns = remap[indices]
+    mask = columns >= 0
+    features = sparse.csr_matrix(
+        (data[mask], (rows[mask], columns[mask])), shape=(n, len(kept)), dtype=np.float32
+    )
+    vocabulary = np.empty(len(term_ids), dtype=object)
+    for term, term_id in term_ids.items():
+        vocabulary[term_id] = term
+    vocabulary = np.array(vocabulary[kept].tolist(), dtype=str)
+
+    if weighting == "tfidf":
+        df = np.bincount(features.indices, minlength=len(kept))
+        idf = (np.log((1 + n) / (1 + df)) + 1).astype(np.float32)
+    else:
+        idf = np.ones(len(kept), dtype=np.float32)
+    features = normalize_rows(features @ sparse.diags(idf))
+    return arrays, features, vocabulary, idf
+
+
+def vectorize(batches: Iterable[List[dict]], vocabulary: np.ndarray, idf: np.ndarray,
+              known_ids: Iterable[int] = ()):
+    """Features of new movies in an existing vocabulary, skipping ``known_ids``.
+
+    Terms outside ``vocabulary`` are dropped. Returns ``(arrays, features)``.
+    """
+    columns = {str(term): column for column, term in enumerate(vocabulary)}
+    arrays, rows, indices, data = _count_terms(batches, columns.get, set(int(i) for i in known_ids))
+    features = sparse.csr_matrix(
+        (data, (rows, indices)), shape=(len(arrays["ids"]), len(vocabulary)), dtype=np.float32
+    )
+    return arrays, normalize_rows(features @ sparse.diags(np.asarray(idf, dtype=np.float32)))
+
+
+def normalize_rows(features) -> sparse.csr_matrix:
+    features = sparse.csr_matrix(features, dtype=np.float32)
+    norms = np.sqrt(np.asarray(features.multiply(features).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.csr_matrix(sparse.diags(1.0 / norms) @ features, dtype=np.float32)
+
+
+# ---------------------------------------------------------------------------
+# Blocked, multi-process neighbour ranking
+# ---------------------------------------------------------------------------
+_worker_state = {}
+
+
+def _init_worker(features, k: int):
+    _worker_state["features"] = features
+    _worker_state["features_t"] = features.T.tocsr()
+    _worker_state["k"] = k
+
+
+def rank_sparse_block(similarity, self_rows: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-``k`` neighbours per row of a sparse similarity block.
+
+    Ranking matches the dense path (descending score, ties by ascending
+    column, self excluded). Rows with fewer than ``k`` non-zero neighbours
+    are padded with the lowest-index remaining movies at score 0, exactly
+    where a dense ranking would put them.
+    """
+    similarity = sparse.csr_matrix(similarity)
+    similarity.sort_indices()
+    b = similarity.shape[0]
+    rows = np.empty((b, k), dtype=np.int32)
+    scores = np.zeros((b, k), dtype=np.float16)
+    for r in range(b):
+        lo, hi = similarity.indptr[r], similarity.indptr[r + 1]
+        cols, vals = similarity.indices[lo:hi], similarity.data[lo:hi]
+        keep = (cols != self_rows[r]) & (vals > 0)
+        cols, vals = cols[keep], vals[keep]
+        top = top_k(vals, k)
+        chosen = cols[top]
+        rows[r, :len(chosen)] = chosen
+        scores[r, :len(chosen)] = vals[top]
+        if len(chosen) < k:
+            taken = set(chosen.tolist())
+            taken.add(int(self_rows[r]))
+            fill = [c for c in range(k + len(taken)) if c not in taken][:k - len(chosen)]
+            rows[r, len(chosen):] = fill
+    return rows, scores
+
+
+def product_rows(n: int, block_size: int) -> int:
+    """Rows per similarity product: ``block_size``, fewer once a dense
+    (rows, ``n``) float64 block would exceed DENSE_BLOCK_MAX_BYTES."""
+    return max(1, min(block_size, DENSE_BLOCK_MAX_BYTES // (8 * n)))
+
+
+def block_memory_mib(n: int, block_size: int) -> float:
+    """Bound on one worker's similarity block: the sparse product (12 bytes
+    per non-zero, at most one per pair) plus its dense copy."""
+    return product_rows(n, block_size) * n * (12 + 8) / 2**20
+
+
+def _rank_rows(start: int, stop: int, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    block = _worker_state["features"][start:stop] @ _worker_state["features_t"]
+    self_rows = np.arange(start, stop)
+    if block.nnz > DENSE_BLOCK_DENSITY * block.shape[0] * block.shape[1]:
+        # Mostly non-zero (e.g. a tag shared by most movies): ranking the
+        # densified block in one vectorized pass beats walking sparse rows.
+        dense = block.toarray()
+        rows = top_k_block(dense, k, exclude=self_rows)
+        return rows.astype(np.int32), np.take_along_axis(dense, rows, axis=1).astype(np.float16)
+    return rank_sparse_block(block, self_rows, k)
+
+
+def _neighbour_block(bounds: Tuple[int, int]):
+    start, stop = bounds
+    k = _worker_state["k"]
+    step = product_rows(_worker_state["features"].shape[0], stop - start)
+    ranked = [_rank_rows(lo, min(lo + step, stop), k) for lo in range(start, stop, step)]
+    return start, np.concatenate([rows for rows, _ in ranked]), np.concatenate([scores for _, scores in ranked])
+
+
+def compute_neighbours(features, k: int = DEFAULT_K, block_size: int = DEFAULT_BLOCK_SIZE,
+                       workers: int = 1, first_row: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Neighbour index for ``features`` computed in row blocks over ``workers`` processes.
+
+    Only rows from ``first_row`` on are ranked (against every row), so the
+    result has ``features.shape[0] - first_row`` rows. Large catalogues are
+    multiplied a few rows of a block at a time (see ``product_rows``), so a
+    worker holds at most ``block_memory_mib`` of similarity scores.
+    """
+    n = features.shape[0]
+    k = min(k, n - 1)
+    rows = np.empty((n - first_row, k), dtype=np.int32)
+    scores = np.empty((n - first_row, k), dtype=np.float16)
+    blocks = [(start, min(start + block_size, n)) for start in range(first_row, n, block_size)]
+
+    if workers <= 1 or len(blocks) <= 1:
+        _init_worker(features, k)
+        results = map(_neighbour_block, blocks)
+        for start, block_rows, block_scores in results:
+            rows[start - first_row:start - first_row + len(block_rows)] = block_rows
+            scores[start - first_row:start - first_row + len(block_rows)] = block_scores
+        return rows, scores
+
+    method = "fork" if "fork" in get_all_start_methods() else "spawn"
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context(method),
+                             initializer=_init_worker, initargs=(features, k)) as pool:
+        for start, block_rows, block_scores in pool.map(_neighbour_block, blocks):
+            rows[start - first_row:start - first_row + len(block_rows)] = block_rows
+            scores[start - first_row:start - first_row + len(block_rows)] = block_scores
+    return rows, scores
+
+
+def _pair_scores(features, rows: np.ndarray, neighbours: np.ndarray, chunk: int = 64) -> np.ndarray:
+    """Similarity of each ``rows[i]`` to each of ``neighbours[i]``, in float32.
+
+    ``chunk`` rows at a time are multiplied with the union of their
+    neighbours. That sums the same products in the same order as the block
+    products of ``compute_neighbours``, so the values match it bit for bit.
+    """
+    out = np.empty(neighbours.shape, dtype=np.float32)
+    for lo in range(0, len(rows), chunk):
+        cols, where = np.unique(neighbours[lo:lo + chunk], return_inverse=True)
+        block = (features[rows[lo:lo + chunk]] @ features[cols].T).toarray()
+        out[lo:lo + chunk] = np.take_along_axis(block, where.reshape(-1, neighbours.shape[1]), axis=1)
+    return out
+
+
+def patch_neighbours(rows: np.ndarray, scores: np.ndarray, features, new_features,
+                     block_size: int = 4 * DEFAULT_BLOCK_SIZE) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Merge new movies into the neighbour lists of the existing ones.
+
+    ``rows``/``scores`` are the current (N, k) index for ``features``; the
+    new movies become rows N, N+1, ... . Only lists where a newcomer may
+    reach the k-th entry are re-ranked, from the old top ``k`` plus the
+    newcomers. The stored scores are float16, so the old entries are
+    rescored from ``features`` first. The result is then the ranking a full
+    rebuild gives (descending score, ties by ascending row). Returns
+    ``(rows, scores, patched)``, ``patched`` counting the lists that changed.
+    """
+    n, k = rows.shape
+    m = new_features.shape[0]
+    rows = np.array(rows, dtype=np.int32)
+    scores = np.array(scores, dtype=np.float16)
+    new_t = sparse.csr_matrix(new_features.T)
+    new_cols = np.arange(n, n + m, dtype=np.int32)
+    patched = 0
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        block = (features[start:stop] @ new_t).toarray()
+        # Rounding is monotonic: a newcomer above the exact k-th score is at
+        # least the stored one at float16.
+        best = block.max(axis=1).astype(np.float16)
+        touched = np.flatnonzero(best >= scores[start:stop, -1])
+        if not len(touched):
+            continue
+        old_rows = rows[start + touched]
+        by_row = np.argsort(old_rows, axis=1)
+        old_rows = np.take_along_axis(old_rows, by_row, axis=1)
+        old_scores = _pair_scores(features, start + touched, old_rows)
+        # Old entries by row, then newcomers (all higher rows), so position
+        # ties are row ties.
+        candidate_scores = np.hstack([old_scores, block[touched]])
+        candidate_rows = np.hstack([old_rows, np.broadcast_to(new_cols, (len(touched), m))])
+        top = top_k_block(candidate_scores, k)
+        ranked = np.take_along_axis(candidate_rows, top, axis=1)
+        patched += int(np.count_nonzero((ranked != rows[start + touched]).any(axis=1)))
+        rows[start + touched] = ranked
+        scores[start + touched] = np.take_along_axis(candidate_scores, top, axis=1)
+    return rows, scores, patched
+
+
+def incremental_update(artifact, batches: Iterable[List[dict]], block_size: int = DEFAULT_BLOCK_SIZE,
+                       workers: int = 1) -> Optional[Tuple[dict, int, int]]:
+    """Arrays of ``artifact`` extended with the new movies in ``batches``.
+
+    Returns ``(arrays, added, patched)``, or ``None`` when nothing is new.
+    """
+    needed = ("neighbour_rows", "neighbour_scores") + FEATURE_ARRAYS
+    missing = [name for name in needed if artifact.get(name) is None]
+    if missing:
+        raise ValueError(f"artifact {artifact.version} has no {', '.join(missing)}; run a full build first")
+    extra = [name for name, entry in artifact.manifest["arrays"].items()
+             if entry.get("row_aligned", True) and name not in ("ids", "titles", "popularity") + needed + FILTER_ARRAYS]
+    if extra:
+        raise ValueError(f"cannot extend per-movie arrays {extra} incrementally; run a full build")
+
+    features = load_features(artifact)
+    vocabulary, idf = artifact.get("vocabulary"), artifact.get("idf")
+    new_arrays, new_features = vectorize(batches, vocabulary, idf, artifact.get("ids"))
+    m = new_features.shape[0]
+    if m == 0:
+        return None
+
+    n = features.shape[0]
+    k = artifact.get("neighbour_rows").shape[1]
+    combined = sparse.vstack([features, new_features], format="csr", dtype=np.float32)
+    new_rows, new_scores = compute_neighbours(combined, k, block_size, workers, first_row=n)
+    rows, scores, patched = patch_neighbours(
+        artifact.get("neighbour_rows"), artifact.get("neighbour_scores"), features, new_features
+    )
+    popularity = artifact.get("popularity")
+    if popularity is None:
+        popularity = np.zeros(n, dtype=np.float32)
+    arrays = {
+        "ids": np.concatenate([artifact.get("ids"), new_arrays["ids"]]),
+        "titles": np.concatenate([artifact.get("titles"), new_arrays["titles"]]),
+        "popularity": np.concatenate([popularity, new_arrays["popularity"]]).astype(np.float32),
+        "neighbour_rows": np.vstack([rows, new_rows]),
+        "neighbour_scores": np.vstack([scores, new_scores]),
+    }
+    arrays.update(feature_arrays(combined, vocabulary, idf))
+    if all(artifact.get(name) is not None for name in FILTER_ARRAYS):
+        arrays.update(extend_filter_arrays(artifact.arrays, new_arrays))
+    return arrays, m, patched
+
+
+# ---------------------------------------------------------------------------
+# Artifact output
+# ---------------------------------------------------------------------------
+FEATURE_ARRAYS = ("feature_indptr", "feature_indices", "feature_data", "vocabulary", "idf")
+
+
+def feature_arrays(features, vocabulary: np.ndarray, idf: np.ndarray) -> dict:
+    features = sparse.csr_matrix(features)
+    return {
+        "feature_indptr": features.indptr.astype(np.int64),
+        "feature_indices": features.indices.astype(np.int32),
+        "feature_data": features.data.astype(np.float32),
+        "vocabulary": vocabulary,
+        "idf": idf,
+    }
+
+
+def load_features(artifact) -> sparse.csr_matrix:
+    """Rebuild the CSR feature matrix stored in an artifact (or its arrays dict)."""
+    return sparse.csr_matrix(
+        (artifact.get("feature_data"), artifact.get("feature_indices"), artifact.get("feature_indptr")),
+        shape=(len(artifact.get("ids")), len(artifact.get("vocabulary")))
+    )
+
+
+def peak_memory_mib() -> Tuple[Optional[float], Optional[float]]:
+    """Peak RSS of this process and of its (finished) children, in MiB."""
+    if resource is None:
+        return None, None
+    scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is KiB on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale / 2**20
+    return own, children
+
+
+def report(started: float, stages: List[Tuple[str, float]], block_mib: Optional[float] = None) -> None:
+    for name, seconds in stages:
+        print(f"[BUILD] {name:<12} {seconds:8.1f}s")
+    print(f"[BUILD] {'wall time':<12} {time.perf_counter() - started:8.1f}s")
+    own, children = peak_memory_mib()
+    if own is not None:
+        print(f"[BUILD] peak memory  {own:8.1f} MiB (workers: {children:.1f} MiB each at most)")
+    if block_mib is not None:
+        print(f"[BUILD] block bound  {block_mib:8.1f} MiB of similarity per worker")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=DEFAULT_K, help="neighbours kept per movie")
+    parser.add_argument("--max-features", type=int, default=DEFAULT_MAX_FEATURES)
+    parser.add_argument("--weighting", choices=("tfidf", "count"), default="tfidf")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Mongo documents per batch")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE, help="rows per similarity block")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--version", default=None, help="artifact version name")
+    parser.add_argument("--no-activate", action="store_true", help="do not update artifacts/CURRENT")
+    parser.add_argument("--incremental", action="store_true", help="only add movies missing from --base")
+    parser.add_argument("--base", default=None, help="artifact version to extend (default: CURRENT)")
+    args = parser.parse_args()
+    if args.incremental:
+        return main_incremental(args)
+
+    started = time.perf_counter()
+    stages = []
+
+    t0 = time.perf_counter()
+    arrays, features, vocabulary, idf = build_features(
+        stream_catalogue(args.batch_size), args.max_features, args.weighting
+    )
+    stages.append(("features", time.perf_counter() - t0))
+    if features.shape[0] < 2:
+        print("[BUILD] all_movies has fewer than 2 usable movies, nothing to build")
+        return 1
+    print(f"[BUILD] {features.shape[0]} movies, {features.shape[1]} terms, {features.nnz} non-zeros")
+
+    t0 = time.perf_counter()
+    arrays["neighbour_rows"], arrays["neighbour_scores"] = compute_neighbours(
+        features, args.k, args.block_size, args.workers
+    )
+    stages.append(("neighbours", time.perf_counter() - t0))
+
+    t0 = time.perf_counter()
+    arrays.update(feature_arrays(features, vocabulary, idf))
+    version = args.version or artifacts.new_version_name()
+    manifest = artifacts.write_artifact(
+        artifacts.ARTIFACTS_DIR / version, arrays, version,
+        {"source": "build_model", "k": int(arrays["neighbour_rows"].shape[1]),
+         "weighting": args.weighting, "max_features": args.max_features},
+        unaligned=FEATURE_ARRAYS + FILTER_VOCABULARIES,
+    )
+    if not args.no_activate:
+        artifacts.set_current_version(version)
+    stages.append(("write", time.perf_counter() - t0))
+
+    print(f"[BUILD] wrote artifact {manifest['version']}")
+    report(started, stages, block_memory_mib(features.shape[0], args.block_size))
+    return 0
+
+
+def main_incremental(args) -> int:
+    started = time.perf_counter()
+    stages = []
+    base = args.base or artifacts.current_version()
+    if base is None:
+        print("[BUILD] no --base given and artifacts/CURRENT is missing")
+        return 1
+    artifact = artifacts.load_artifact(artifacts.ARTIFACTS_DIR / base)
+
+    t0 = time.perf_counter()
+    result = incremental_update(
+        artifact, stream_new_movies(artifact.get("ids"), args.batch_size), args.block_size, args.workers
+    )
+    stages.append(("update", time.perf_counter() - t0))
+    if result is None:
+        print(f"[BUILD] no new movies since {base}, nothing to publish")
+        return 0
+    arrays, added, patched = result
+    print(f"[BUILD] added {added} movies to {artifact.manifest['movies']}, patched {patched} neighbour lists")
+
+    t0 = time.perf_counter()
+    version = args.version or artifacts.new_version_name()
+    extra = {key: artifact.manifest[key] for key in ("weighting", "max_features") if key in artifact.manifest}
+    manifest = artifacts.write_artifact(
+        artifacts.ARTIFACTS_DIR / version, arrays, version,
+        {"source": "build_model", "k": int(arrays["neighbour_rows"].shape[1]), **extra,
+         "base_version": base, "added": added},
+        unaligned=FEATURE_ARRAYS + FILTER_VOCABULARIES,
+    )
+    if not args.no_activate:
+        artifacts.set_current_version(version)
+    stages.append(("write", time.perf_counter() - t0))
+
+    print(f"[BUILD] wrote artifact {manifest['version']}")
+    report(started, stages, block_memory_mib(arrays["neighbour_rows"].shape[0], args.block_size))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""In-memory pool of cold-start candidates with O(k) weighted sampling.
+
+/cold-sample used to run ``$sample`` on ``all_movies`` for every home page
+load, which is a collection scan on many deployments. Instead a background
+refresh (see recommand.py) reads the catalogue once in a while, keeps the
+``size`` best candidates and their weights here, and requests only sample
+from memory:
+
+* a candidate's weight is ``(1 + log1p(popularity)) * rating / 10``, where
+  ``rating`` is the vote average shrunk towards the catalogue mean by
+  ``RATING_PRIOR_VOTES`` votes, so a 9.0 with three votes does not beat a
+  well-known 8.0,
+* sampling uses Vose's alias table (built once per refresh in O(n)), so one
+  draw costs O(1) and a sample of ``k`` distinct ids about O(k): duplicate
+  draws are rejected and redrawn, which is the same as weighted sampling
+  without replacement,
+* a sample can be seeded (e.g. with the user's email) to stay the same for
+  that user until the pool is refreshed.
+
+A ``PoolSnapshot`` is never modified; ``ColdStartPool.replace`` publishes a
+new one in a single assignment, so readers need no lock.
+"""
+import hashlib
+import time
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.recommendation_model.build_model import ID_FIELDS, document_id
+
+DEFAULT_POOL_SIZE = 5000
+RATING_PRIOR_VOTES = 100
+# Give up on rejection sampling after this many draws per requested id.
+MAX_DRAWS_PER_ID = 8
+# Fields read by the refresh; ratings may sit in the cached TMDB details.
+PROJECTION = {"_id": 0, **{key: 1 for key in ID_FIELDS}, "popularity": 1, "vote_average": 1, "vote_count": 1,
+              "tmdb_details.popularity": 1, "tmdb_details.vote_average": 1, "tmdb_details.vote_count": 1}
+
+
+def _field(doc: dict, name: str):
+    value = doc.get(name)
+    if value is None:
+        value = (doc.get("tmdb_details") or {}).get(name)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def candidate_weights(popularity: np.ndarray, vote_average: np.ndarray, vote_count: np.ndarray) -> np.ndarray:
+    """Sampling weight of each candidate (NaN means the field is missing)."""
+    popularity = np.nan_to_num(np.clip(popularity, 0, None), nan=0.0)
+    votes = np.nan_to_num(np.clip(vote_count, 0, None), nan=0.0)
+    rated = ~np.isnan(vote_average) & (votes > 0)
+    mean = float(np.average(vote_average[rated], weights=votes[rated])) if rated.any() else 5.0
+    average = np.where(rated, vote_average, mean)
+    rating = (votes * average + RATING_PRIOR_VOTES * mean) / (votes + RATING_PRIOR_VOTES)
+    return (1.0 + np.log1p(popularity)) * np.clip(rating, 0.5, 10.0) / 10.0
+
+
+def candidates_from_documents(docs: Iterable[dict], size: int = DEFAULT_POOL_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """``(ids, weights)`` of the ``size`` heaviest ``all_movies`` documents."""
+    seen = set()
+    ids: List[int] = []
+    columns: List[Tuple[float, float, float]] = []
+    for doc in docs:
+        movie_id = document_id(doc)
+        if movie_id is None or movie_id in seen:
+            continue
+        seen.add(movie_id)
+        ids.append(movie_id)
+        columns.append(tuple(np.nan if v is None else v for v in
+                             (_field(doc, "popularity"), _field(doc, "vote_average"), _field(doc, "vote_count"))))
+    if not ids:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    values = np.asarray(columns, dtype=np.float64)
+    weights = candidate_weights(values[:, 0], values[:, 1], values[:, 2])
+    ids = np.asarray(ids, dtype=np.int64)
+    if len(ids) > size:
+        keep = np.argpartition(-weights, size - 1)[:size]
+        ids, weights = ids[keep], weights[keep]
+    return ids, weights
+
+
+def alias_table(weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Vose's alias method: ``(prob, alias)`` such that a draw is one uniform
+    column ``i`` kept with probability ``prob[i]``, else replaced by ``alias[i]``."""
+    n = len(weights)
+    scaled = np.asarray(weights, dtype=np.float64) * (n / weights.sum())
+    prob = np.ones(n, dtype=np.float64)
+    alias = np.arange(n, dtype=np.int64)
+    small = [i for i in range(n) if scaled[i] < 1.0]
+    large = [i for i in range(n) if scaled[i] >= 1.0]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        prob[less] = scaled[less]
+        alias[less] = more
+        scaled[more] -= 1.0 - scaled[less]
+        (small if scaled[more] < 1.0 else large).append(more)
+    # Leftovers are 1 up to rounding error.
+    return prob, alias
+
+
+class PoolSnapshot:
+    """Candidate ids, weights and alias table of one refresh."""
+
+    def __init__(self, ids: np.ndarray, weights: np.ndarray, source: str, generation: int):
+        self.ids = ids
+        self.weights = weights
+        self.prob, self.alias = alias_table(weights)
+        self.source = source
+        self.generation = generation
+        self.refreshed_at = time.time()
+
+    def sample(self, k: int, rng: np.random.Generator) -> List[int]:
+        n = len(self.ids)
+        k = min(k, n)
+        picked = {}
+        draws = 0
+        while len(picked) < k and draws < MAX_DRAWS_PER_ID * k:
+            batch = 2 * (k - len(picked))
+            columns = rng.integers(0, n, size=batch)
+            rows = np.where(rng.random(batch) < self.prob[columns], columns, self.alias[columns])
+            for row in rows.tolist():
+                if len(picked) == k:
+                    break
+                picked.setdefault(row, None)
+            draws += batch
+        if len(picked) < k:
+            # A few very heavy candidates keep coming back: finish exactly.
+            rest = np.setdiff1d(np.arange(n), np.fromiter(picked, dtype=np.int64, count=len(picked)))
+            p = self.weights[rest] / self.weights[rest].sum()
+            picked.update(dict.fromkeys(rng.choice(rest, size=k - len(picked), replace=False, p=p).tolist()))
+        return self.ids[list(picked)].tolist()
+
+
+class ColdStartPool:
+    """The current ``PoolSnapshot``; empty until the first refresh."""
+
+    def __init__(self):
+        self.snapshot: Optional[PoolSnapshot] = None
+        self.refreshes = 0
+        self.failures = 0
+        self.samples = 0
+        self.last_error: Optional[str] = None
+        self.refresh_seconds: Optional[float] = None
+
+    def __len__(self) -> int:
+        snapshot = self.snapshot
+        return 0 if snapshot is None else len(snapshot.ids)
+
+    def replace(self, ids: np.ndarray, weights: np.ndarray, source: str) -> None:
+        ids, weights = np.asarray(ids, dtype=np.int64), np.asarray(weights, dtype=np.float64)
+        keep = weights > 0
+        ids, weights = ids[keep], weights[keep]
+        if len(ids) == 0:
+            raise ValueError("cold-start pool needs at least one candidate with a positive weight")
+        self.snapshot = PoolSnapshot(ids, weights, source, self.refreshes + 1)
+        self.refreshes += 1
+
+    def sample(self, k: int, seed: Optional[str] = None) -> List[int]:
+        """``k`` distinct ids, or ``[]`` while the pool is empty.
+
+        With a ``seed`` the sample is the same for every call until the pool
+        is refreshed.
+        """
+        snapshot = self.snapshot
+        if snapshot is None:
+            return []
+        if seed is None:
+            rng = np.random.default_rng()
+        else:
+            digest = hashlib.blake2b(f"{snapshot.generation}:{seed}".encode(), digest_size=8).digest()
+            rng = np.random.default_rng(int.from_bytes(digest, "little"))
+        self.samples += 1
+        return snapshot.sample(k, rng)
+
+    def stats(self) -> dict:
+        snapshot = self.snapshot
+        return {
+            "size": len(self),
+            "source": None if snapshot is None else snapshot.source,
+            "refreshed_at": None if snapshot is None else snapshot.refreshed_at,
+            "refresh_seconds": self.refresh_seconds,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "samples": self.samples,
+            "last_error": self.last_error,
+        }
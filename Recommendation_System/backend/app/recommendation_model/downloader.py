@@ -0,0 +1,232 @@
+"""Parallel, resumable, checksum-verified downloads of model artifacts.
+
+``download(url, path, sha256=...)`` fetches ``url`` into ``path.tmp`` and
+only moves it to ``path`` (``os.replace``) once complete and, when a digest
+is given, once its SHA-256 matches:
+
+* if the server honours ``Range`` requests the file is split into
+  ``segments`` byte ranges fetched concurrently, each streamed in large
+  chunks straight to its offset in the preallocated ``.tmp``,
+* progress per segment is kept in a ``.tmp.parts`` sidecar, so after a
+  dropped connection or a killed deploy the next call resumes where every
+  segment stopped instead of starting over (a ``.tmp`` without its
+  sidecar is preallocated, not a prefix, so it is discarded),
+* without ``Range`` support it falls back to one stream from the start.
+
+A segment that fails is retried from its own offset a few times; if it still
+fails the partial file is kept for the next attempt and the error raised.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+import requests
+
+DEFAULT_SEGMENTS = 4
+DEFAULT_CHUNK_SIZE = 1 << 20
+# Segments below this size are not worth their own connection.
+MIN_SEGMENT_SIZE = 8 << 20
+DEFAULT_TIMEOUT = (10, 60)
+DEFAULT_RETRIES = 3
+# Persist segment progress at most this often while downloading.
+PROGRESS_INTERVAL_SECONDS = 1.0
+
+
+class ChecksumError(RuntimeError):
+    pass
+
+
+def sha256_file(path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class _Progress:
+    """Segment ``[start, end]`` ranges and bytes done, mirrored to ``.tmp.parts``."""
+
+    def __init__(self, parts_path: Path, size: int, validator: Optional[str], segments: List[List[int]]):
+        self.parts_path = parts_path
+        self.size = size
+        self.validator = validator
+        self.segments = segments  # [start, end (inclusive), done]
+        self._lock = threading.Lock()
+        self._saved_at = 0.0
+
+    @classmethod
+    def load(cls, parts_path: Path, tmp_path: Path, size: int, validator: Optional[str]) -> Optional["_Progress"]:
+        """Progress of a previous attempt at the same file version, if any."""
+        if not tmp_path.exists():
+            return None
+        if not parts_path.exists():
+            # Ranged downloads preallocate the whole file, so its length says
+            # nothing about what was written: start over.
+            tmp_path.unlink()
+            return None
+        try:
+            state = json.loads(parts_path.read_text())
+        except ValueError:
+            return None
+        if state.get("size") != size or state.get("validator") != validator:
+            return None
+        return cls(parts_path, size, validator, state["segments"])
+
+    def split(self, segments: int) -> None:
+        """Split the remaining work into about ``segments`` concurrent ranges."""
+        remaining = [s for s in self.segments if s[0] + s[2] <= s[1]]
+        done = [s for s in self.segments if s[0] + s[2] > s[1]]
+        todo = sum(s[1] - s[0] + 1 - s[2] for s in remaining)
+        target = max(MIN_SEGMENT_SIZE, -(-todo // max(1, segments)))
+        split = []
+        for start, end, finished in remaining:
+            # The finished prefix stays its own (complete) segment.
+            if finished:
+                done.append([start, start + finished - 1, finished])
+                start += finished
+            while start <= end:
+                stop = min(end, start + target - 1)
+                split.append([start, stop, 0])
+                start = stop + 1
+        self.segments = done + split
+
+    @property
+    def done_bytes(self) -> int:
+        return sum(s[2] for s in self.segments)
+
+    def advance(self, segment: List[int], count: int) -> None:
+        with self._lock:
+            segment[2] += count
+            if time.monotonic() - self._saved_at >= PROGRESS_INTERVAL_SECONDS:
+                self._save()
+
+    def save(self) -> None:
+        with self._lock:
+            self._save()
+
+    def _save(self) -> None:
+        tmp = self.parts_path.with_suffix(self.parts_path.suffix + ".new")
+        tmp.write_text(json.dumps({"size": self.size, "validator": self.validator, "segments": self.segments}))
+        os.replace(tmp, self.parts_path)
+        self._saved_at = time.monotonic()
+
+
+def _probe(session: requests.Session, url: str, timeout):
+    """Return ``(size, validator, ranged)`` using a one-byte range request."""
+    with session.get(url, headers={"Range": "bytes=0-0"}, stream=True, timeout=timeout) as r:
+        r.raise_for_status()
+        validator = r.headers.get("ETag") or r.headers.get("Last-Modified")
+        content_range = r.headers.get("Content-Range", "")
+        if r.status_code == 206 and "/" in content_range and not content_range.endswith("/*"):
+            return int(content_range.rsplit("/", 1)[1]), validator, True
+        length = r.headers.get("Content-Length")
+        return (int(length) if length else None), validator, False
+
+
+def _fetch_segment(session, url, tmp_path: Path, segment: List[int], progress: _Progress,
+                   chunk_size: int, timeout, retries: int) -> None:
+    for attempt in range(retries + 1):
+        start, end, done = segment
+        if start + done > end:
+            return
+        try:
+            headers = {"Range": f"bytes={start + done}-{end}"}
+            if progress.validator:
+                headers["If-Range"] = progress.validator
+            with session.get(url, headers=headers, stream=True, timeout=timeout) as r:
+                r.raise_for_status()
+                if r.status_code != 206:
+                    raise RuntimeError(f"server ignored the range request ({r.status_code}); file changed?")
+                with open(tmp_path, "r+b") as f:
+                    f.seek(start + done)
+                    for chunk in r.iter_content(chunk_size=chunk_size):
+                        if chunk:
+                            f.write(chunk)
+                            progress.advance(segment, len(chunk))
+            if segment[0] + segment[2] <= segment[1]:
+                raise requests.ConnectionError("connection closed before the range was complete")
+            return
+        except (requests.RequestException, OSError):
+            if attempt == retries:
+                raise
+            time.sleep(0.5 * 2 ** attempt)
+
+
+def _fetch_single(session, url, tmp_path: Path, chunk_size: int, timeout) -> None:
+    with session.get(url, stream=True, timeout=timeout) as r:
+        r.raise_for_status()
+        with open(tmp_path, "wb") as f:
+            for chunk in r.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    f.write(chunk)
+
+
+def download(url: str, path: Path, sha256: Optional[str] = None, segments: int = DEFAULT_SEGMENTS,
+             chunk_size: int = DEFAULT_CHUNK_SIZE, timeout=DEFAULT_TIMEOUT, retries: int = DEFAULT_RETRIES,
+             session: Optional[requests.Session] = None) -> dict:
+    """Download ``url`` to ``path``; see the module docstring.
+
+    Returns throughput stats: ``bytes``, ``resumed_bytes``, ``seconds``,
+    ``mib_per_second`` and ``segments``. Raises ``ChecksumError`` (after
+    discarding the partial file) when the digest does not match.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    parts_path = path.with_suffix(path.suffix + ".tmp.parts")
+    session = session or requests.Session()
+    started = time.perf_counter()
+
+    size, validator, ranged = _probe(session, url, timeout)
+    resumed = 0
+    used_segments = 1
+    if ranged and size:
+        progress = _Progress.load(parts_path, tmp_path, size, validator)
+        if progress is None:
+            progress = _Progress(parts_path, size, validator, [[0, size - 1, 0]])
+            with open(tmp_path, "wb") as f:
+                f.truncate(size)
+        else:
+            with open(tmp_path, "r+b") as f:
+                f.truncate(size)
+        resumed = progress.done_bytes
+        progress.split(segments)
+        progress.save()
+        pending = [s for s in progress.segments if s[0] + s[2] <= s[1]]
+        used_segments = max(1, len(pending))
+        try:
+            with ThreadPoolExecutor(max_workers=min(segments, used_segments)) as pool:
+                futures = [pool.submit(_fetch_segment, session, url, tmp_path, segment, progress,
+                                       chunk_size, timeout, retries) for segment in pending]
+                for future in futures:
+                    future.result()
+        finally:
+            progress.save()
+    else:
+        _fetch_single(session, url, tmp_path, chunk_size, timeout)
+        size = tmp_path.stat().st_size
+
+    if sha256:
+        actual = sha256_file(tmp_path)
+        if actual != sha256:
+            for leftover in (tmp_path, parts_path):
+                leftover.unlink(missing_ok=True)
+            raise ChecksumError(f"{path.name}: sha256 {actual} does not match the manifest ({sha256})")
+    os.replace(tmp_path, path)
+    parts_path.unlink(missing_ok=True)
+
+    seconds = time.perf_counter() - started
+    fetched = size - resumed
+    return {
+        "bytes": size,
+        "resumed_bytes": resumed,
+        "seconds": seconds,
+        "mib_per_second": fetched / 2**20 / seconds if seconds > 0 else None,
+        "segments": used_segments,
+    }
@@ -0,0 +1,367 @@
+"""Columnar genre / year / language filters aligned with the model rows.
+
+Browsing and filtered recommendations need, for every model row, its
+genres, release year and original language. The artifact stores them as
+plain columns next to ``ids``:
+
+    genre_bits      uint32  (N,)    bit g set when the movie has genre_names[g]
+    genre_names     unicode (G,)    genre labels (not row-aligned)
+    years           int16   (N,)    release year, 0 when unknown
+    language_codes  uint16  (N,)    index into language_names, 0 when unknown
+    language_names  unicode (L,)    ISO 639-1 codes, language_names[0] == ""
+
+build_model.py writes them for new versions; ``build --base`` adds them to
+an existing version from ``all_movies``. At load ``FilterIndex`` turns
+``genre_bits`` into one packed bitset per genre, so a filter is a few
+vectorised AND/compare passes over N bits or N small ints producing a
+boolean row mask, which the ranking code applies before its top-k
+selection. Masks are cached per filter, so a repeated filter costs no more
+than an unfiltered query.
+
+Usage (from the backend directory):
+    python -m app.recommendation_model.filter_index build [--base VERSION] [--no-activate]
+"""
+import argparse
+import ast
+import re
+import sys
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.cache.cache import MISSING, TTLCache
+from app.recommendation_model import artifacts
+
+FILTER_ARRAYS = ("genre_bits", "genre_names", "years", "language_codes", "language_names")
+FILTER_VOCABULARIES = ("genre_names", "language_names")
+MAX_GENRES = 32
+MASK_CACHE_ENTRIES = 64
+BROWSE_MIN_CHUNK = 4096
+YEAR_RE = re.compile(r"^\s*(\d{4})")
+# TMDB movie genre ids, for documents that only carry ``genre_ids``.
+TMDB_GENRES = {
+    28: "Action", 12: "Adventure", 16: "Animation", 35: "Comedy", 80: "Crime", 99: "Documentary",
+    18: "Drama", 10751: "Family", 14: "Fantasy", 36: "History", 27: "Horror", 10402: "Music",
+    9648: "Mystery", 10749: "Romance", 878: "Science Fiction", 10770: "TV Movie", 53: "Thriller",
+    10752: "War", 37: "Western",
+}
+# Labels used by the frontend that differ from TMDB's.
+GENRE_ALIASES = {"scifi": "sciencefiction"}
+
+
+def genre_key(label: str) -> str:
+    """Lookup key of a genre label or TMDB genre id: "Sci-Fi" -> "sciencefiction"."""
+    label = str(label).strip()
+    if label.isdigit():
+        label = TMDB_GENRES.get(int(label), label)
+    key = "".join(re.findall(r"[a-z0-9]+", label.lower()))
+    return GENRE_ALIASES.get(key, key)
+
+
+TMDB_GENRE_KEYS = frozenset(genre_key(name) for name in TMDB_GENRES.values())
+
+
+class MovieFilter(NamedTuple):
+    """A browse / recommendation filter; hashable, so it keys caches."""
+
+    genres: Tuple[str, ...] = ()
+    year_from: Optional[int] = None
+    year_to: Optional[int] = None
+    language: Optional[str] = None
+
+    @classmethod
+    def parse(cls, genre: Optional[str] = None, year_from: Optional[int] = None, year_to: Optional[int] = None,
+              lang: Optional[str] = None) -> Optional["MovieFilter"]:
+        """Filter from query parameters (``genre`` is comma separated); ``None`` when empty."""
+        genres = tuple(sorted({genre_key(g) for g in (genre or "").split(",") if g.strip()}))
+        language = lang.strip().lower() if lang and lang.strip() else None
+        spec = cls(genres, year_from, year_to, language)
+        return None if spec == cls() else spec
+
+
+# ---------------------------------------------------------------------------
+# Documents -> columns
+# ---------------------------------------------------------------------------
+def _genre_labels(value) -> List[str]:
+    """Labels from a list of names / ids / ``{"name": ...}`` dicts, or such a list as a string."""
+    if isinstance(value, str):
+        value = value.strip()
+        if value.startswith("["):
+            try:
+                value = ast.literal_eval(value)
+            except (ValueError, SyntaxError):
+                return []
+        else:
+            value = re.split(r"[|,]", value)
+    labels = []
+    for item in value if isinstance(value, (list, tuple)) else []:
+        if isinstance(item, dict):
+            item = item.get("name") or TMDB_GENRES.get(item.get("id"))
+        elif isinstance(item, int):
+            item = TMDB_GENRES.get(item)
+        if item and str(item).strip():
+            labels.append(str(item).strip())
+    return labels
+
+
+def document_filter_fields(doc: dict) -> Tuple[List[str], int, str]:
+    """``(genre labels, year or 0, language or "")`` of an ``all_movies`` document."""
+    details = doc.get("tmdb_details") or {}
+
+    def field(name):
+        return doc.get(name) if doc.get(name) is not None else details.get(name)
+
+    genres = _genre_labels(field("genres")) or _genre_labels(field("genre_ids"))
+    year = field("year")
+    if year is None:
+        match = YEAR_RE.match(str(field("release_date") or ""))
+        year = match.group(1) if match else 0
+    try:
+        year = int(year)
+    except (TypeError, ValueError):
+        year = 0
+    language = field("original_language")
+    language = language.strip().lower() if isinstance(language, str) else ""
+    return genres, year, language
+
+
+class FilterColumns:
+    """Accumulates the filter columns of documents added in row order."""
+
+    def __init__(self, genre_names: Iterable[str] = (), language_names: Iterable[str] = ("",)):
+        self.genre_names = list(genre_names)
+        self.language_names = list(language_names) or [""]
+        self._genres = {genre_key(name): bit for bit, name in enumerate(self.genre_names)}
+        self._languages = {name: code for code, name in enumerate(self.language_names)}
+        self.genre_bits: List[int] = []
+        self.years: List[int] = []
+        self.language_codes: List[int] = []
+
+    def add(self, genres: Iterable[str], year: int, language: str) -> None:
+        bits = 0
+        for label in genres:
+            key = genre_key(label)
+            if key not in self._genres:
+                if len(self.genre_names) == MAX_GENRES:
+                    continue  # more genres than bits: ignore the rare ones
+                self._genres[key] = len(self.genre_names)
+                self.genre_names.append(str(label).strip())
+            bits |= 1 << self._genres[key]
+        self.genre_bits.append(bits)
+        self.years.append(year if 0 < year < 2**15 else 0)
+        self.language_codes.append(self._languages.setdefault(language, len(self._languages)))
+        if len(self._languages) > len(self.language_names):
+            self.language_names.append(language)
+
+    def add_document(self, doc: dict) -> None:
+        self.add(*document_filter_fields(doc))
+
+    def add_missing(self) -> None:
+        self.add((), 0, "")
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "genre_bits": np.array(self.genre_bits, dtype=np.uint32),
+            "genre_names": np.array(self.genre_names, dtype=str),
+            "years": np.array(self.years, dtype=np.int16),
+            "language_codes": np.array(self.language_codes, dtype=np.uint16),
+            "language_names": np.array(self.language_names, dtype=str),
+        }
+
+
+def extend_filter_arrays(arrays: Dict[str, np.ndarray], new_arrays: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Filter columns of ``arrays`` followed by the rows of ``new_arrays``, vocabularies merged."""
+    columns = FilterColumns(arrays["genre_names"].tolist(), arrays["language_names"].tolist())
+    new_genres = new_arrays["genre_names"].tolist()
+    new_languages = new_arrays["language_names"].tolist()
+    for bits, year, code in zip(new_arrays["genre_bits"].tolist(), new_arrays["years"].tolist(),
+                                new_arrays["language_codes"].tolist()):
+        genres = [name for bit, name in enumerate(new_genres) if bits >> bit & 1]
+        columns.add(genres, year, new_languages[code])
+    added = columns.to_arrays()
+    return {
+        "genre_bits": np.concatenate([arrays["genre_bits"], added["genre_bits"]]),
+        "genre_names": added["genre_names"],
+        "years": np.concatenate([arrays["years"], added["years"]]),
+        "language_codes": np.concatenate([arrays["language_codes"], added["language_codes"]]),
+        "language_names": added["language_names"],
+    }
+
+
+def filter_arrays_from_movie_df(movie_df) -> Optional[Dict[str, np.ndarray]]:
+    """Filter columns of the legacy DataFrame, if it has any of them."""
+    wanted = ("genres", "genre_ids", "release_date", "year", "original_language")
+    if not any(column in movie_df.columns for column in wanted):
+        return None
+    columns = FilterColumns()
+    for record in movie_df.reset_index(drop=True).to_dict("records"):
+        columns.add_document({key: value for key, value in record.items() if key in wanted})
+    return columns.to_arrays()
+
+
+# ---------------------------------------------------------------------------
+# Serving
+# ---------------------------------------------------------------------------
+class FilterIndex:
+    """Per-genre bitsets plus year and language columns of one model version."""
+
+    def __init__(self, genre_bits: np.ndarray, genre_names: np.ndarray, years: np.ndarray,
+                 language_codes: np.ndarray, language_names: np.ndarray, popularity: Optional[np.ndarray] = None):
+        genre_bits = np.asarray(genre_bits, dtype=np.uint32)
+        self.n = len(genre_bits)
+        self.genre_names = [str(name) for name in genre_names]
+        self.genre_bitsets = {
+            genre_key(name): np.packbits((genre_bits >> np.uint32(bit)) & np.uint32(1) != 0)
+            for bit, name in enumerate(self.genre_names)
+        }
+        self.years = np.asarray(years)
+        self.language_codes = np.asarray(language_codes)
+        self.language_names = [str(name) for name in language_names]
+        self._languages = {name: code for code, name in enumerate(self.language_names) if name}
+        # Browse order: most popular first, row order for ties.
+        if popularity is None:
+            self.browse_order = np.arange(self.n, dtype=np.int64)
+        else:
+            self.browse_order = np.argsort(-np.asarray(popularity, dtype=np.float64), kind="stable")
+        self._masks = TTLCache(max_entries=MASK_CACHE_ENTRIES, ttl=float("inf"), sizeof=lambda mask: mask.nbytes)
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> Optional["FilterIndex"]:
+        if any(arrays.get(name) is None for name in FILTER_ARRAYS):
+            return None
+        return cls(*(arrays[name] for name in FILTER_ARRAYS), popularity=arrays.get("popularity"))
+
+    def mask(self, spec: MovieFilter) -> np.ndarray:
+        """Boolean (N,) mask of the rows matching every part of ``spec``.
+
+        Movies must have all of ``spec.genres``. A TMDB genre no movie has
+        matches nothing; any other unknown genre raises ``ValueError``.
+        """
+        cached = self._masks.get(spec)
+        if cached is not MISSING:
+            return cached
+        packed = np.full((self.n + 7) // 8, 0xFF, dtype=np.uint8)
+        for key in spec.genres:
+            bitset = self.genre_bitsets.get(key)
+            if bitset is None and key in TMDB_GENRE_KEYS:
+                bitset = np.zeros_like(packed)
+            if bitset is None:
+                raise ValueError(f"unknown genre {key!r}; known genres: {', '.join(self.genre_names)}")
+            packed &= bitset
+        mask = np.unpackbits(packed, count=self.n).astype(bool)
+        if spec.year_from is not None:
+            mask &= self.years >= spec.year_from
+        if spec.year_to is not None:
+            mask &= (self.years <= spec.year_to) & (self.years > 0)
+        if spec.language is not None:
+            code = self._languages.get(spec.language)
+            if code is None:
+                mask[:] = False
+            else:
+                mask &= self.language_codes == code
+        mask.flags.writeable = False
+        self._masks.set(spec, mask)
+        return mask
+
+    def browse(self, spec: Optional[MovieFilter], offset: int, limit: int) -> Tuple[np.ndarray, int]:
+        """Rows ``[offset:offset + limit]`` of the matching movies, most popular first, and the match count."""
+        if spec is None:
+            return self.browse_order[offset:offset + limit], self.n
+        mask = self.mask(spec)
+        total = int(np.count_nonzero(mask))
+        need = min(offset + limit, total)
+        # Walk the popularity order in growing chunks sized by the filter's
+        # selectivity, so an early page only touches about need / selectivity rows.
+        found, count, start = [], 0, 0
+        step = max(BROWSE_MIN_CHUNK, 2 * need * self.n // max(1, total))
+        while count < need:
+            chunk = self.browse_order[start:start + step]
+            hits = chunk[mask[chunk]]
+            found.append(hits)
+            count += len(hits)
+            start += step
+            step *= 2
+        order = np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+        return order[offset:offset + limit], total
+
+    def describe(self) -> dict:
+        """Filter values present in the catalogue, with movie counts."""
+        genres = {name: int(np.unpackbits(self.genre_bitsets[genre_key(name)], count=self.n).sum())
+                  for name in self.genre_names}
+        counts = np.bincount(self.language_codes, minlength=len(self.language_names))
+        languages = {name: int(counts[code]) for code, name in enumerate(self.language_names) if name and counts[code]}
+        known = self.years[self.years > 0]
+        return {
+            "genres": genres,
+            "languages": dict(sorted(languages.items(), key=lambda item: -item[1])),
+            "years": [int(known.min()), int(known.max())] if len(known) else None,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Adding filters to an existing artifact
+# ---------------------------------------------------------------------------
+PROJECTION = {
+    "_id": 0, "id": 1, "tmdb_id": 1, "movieId": 1, "movie_id": 1, "genres": 1, "genre_ids": 1,
+    "release_date": 1, "year": 1, "original_language": 1, "tmdb_details.genres": 1,
+    "tmdb_details.release_date": 1, "tmdb_details.original_language": 1,
+}
+
+
+def filter_arrays_for_ids(ids: np.ndarray, docs: Iterable[dict]) -> Tuple[Dict[str, np.ndarray], int]:
+    """Filter columns aligned with ``ids`` from ``docs``; returns them and the number of rows found."""
+    from app.recommendation_model.build_model import document_id
+
+    fields = {}
+    wanted = set(int(i) for i in ids)
+    for doc in docs:
+        movie_id = document_id(doc)
+        if movie_id in wanted and movie_id not in fields:
+            fields[movie_id] = document_filter_fields(doc)
+    columns = FilterColumns()
+    for movie_id in ids.tolist():
+        if movie_id in fields:
+            columns.add(*fields[movie_id])
+        else:
+            columns.add_missing()
+    return columns.to_arrays(), len(fields)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    cmd = sub.add_parser("build", help="add filter columns from all_movies to an artifact, as a new version")
+    cmd.add_argument("--base", default=None, help="artifact version to extend (default: CURRENT)")
+    cmd.add_argument("--version", default=None, help="artifact version name")
+    cmd.add_argument("--no-activate", action="store_true", help="do not update artifacts/CURRENT")
+    args = parser.parse_args()
+
+    from app.database.database import movie_data
+
+    base = args.base or artifacts.current_version()
+    if base is None:
+        print("[MODEL] no --base given and artifacts/CURRENT is missing")
+        return 1
+    artifact = artifacts.load_artifact(artifacts.ARTIFACTS_DIR / base)
+    arrays = dict(artifact.arrays)
+
+    t0 = time.perf_counter()
+    filters, found = filter_arrays_for_ids(artifact.get("ids"), movie_data.find({}, PROJECTION, batch_size=5000))
+    arrays.update(filters)
+    unaligned = {name for name, entry in artifact.manifest["arrays"].items() if not entry.get("row_aligned", True)}
+    version = args.version or artifacts.new_version_name()
+    extra = {key: value for key, value in artifact.manifest.items()
+             if key not in ("format_version", "version", "created_at", "movies", "arrays")}
+    artifacts.write_artifact(artifacts.ARTIFACTS_DIR / version, arrays, version, {**extra, "base_version": base},
+                             unaligned=unaligned | set(FILTER_VOCABULARIES))
+    if not args.no_activate:
+        artifacts.set_current_version(version)
+    print(f"[MODEL] Filter columns for {found}/{len(filters['years'])} movies "
+          f"({len(filters['genre_names'])} genres, {len(filters['language_names']) - 1} languages) "
+          f"in {time.perf_counter() - t0:.1f}s, wrote artifact {version}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""Registry of loaded model versions, for swapping artifacts without restarts.
+
+A ``LoadedModel`` is one opened artifact version: its (memory-mapped)
+arrays plus the indexes built over them. It is never modified once
+published. The ``ModelRegistry`` holds the active one; every request takes
+it once through ``registry.use()`` and works on that snapshot, so a swap
+never mixes two versions inside one request. ``activate`` replaces the
+active model in one assignment; the previous one stays listed as retired
+until its last in-flight request finishes, after which nothing references
+it and its mappings are released.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+
+class LoadedModel:
+    """Arrays and indexes of one artifact version (see recommand.py)."""
+
+    def __init__(self, version: str, movie_ids, movie_titles, vector=None, neighbour_rows=None,
+                 neighbour_scores=None, ann_index=None, title_index=None, search_index=None,
+                 filter_index=None, features=None, load_seconds: Optional[float] = None):
+        self.version = version
+        self.movie_ids = movie_ids          # int64 (N,): TMDB id of each model row
+        self.movie_titles = movie_titles    # unicode (N,): title of each model row
+        self.vector = vector                # optional dense (N, N) similarity, possibly quantized
+        self.neighbour_rows = neighbour_rows
+        self.neighbour_scores = neighbour_scores
+        self.ann_index = ann_index          # IVFIndex when NEIGHBOUR_BACKEND=ivf
+        self.title_index = title_index      # TitleIndex over movie_ids / movie_titles
+        self.search_index = search_index    # TrigramSearchIndex over movie_titles
+        self.filter_index = filter_index    # FilterIndex, when the artifact has filter columns
+        self.features = features            # sparse features, for filtered ranking without a dense matrix
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self.in_flight = 0
+
+    def describe(self) -> dict:
+        return {
+            "version": self.version,
+            "movies": len(self.movie_ids),
+            "load_seconds": self.load_seconds,
+            "loaded_at": self.loaded_at,
+            "in_flight": self.in_flight,
+        }
+
+
+class ModelRegistry:
+    """The active ``LoadedModel`` plus the retired ones still serving requests."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active: Optional[LoadedModel] = None
+        self._retired: List[LoadedModel] = []
+        self.swaps = 0
+
+    @property
+    def version(self) -> Optional[str]:
+        active = self.active
+        return active.version if active is not None else None
+
+    def activate(self, model: LoadedModel) -> Optional[LoadedModel]:
+        """Make ``model`` the active version; returns the one it replaced."""
+        with self._lock:
+            previous, self.active = self.active, model
+            if previous is not None:
+                self._retired.append(previous)
+                self.swaps += 1
+            self._prune()
+        return previous
+
+    @contextmanager
+    def use(self) -> Iterator[LoadedModel]:
+        """The active model, pinned for the duration of the ``with`` block."""
+        with self._lock:
+            model = self.active
+            if model is None:
+                raise RuntimeError("no model version is active")
+            model.in_flight += 1
+        try:
+            yield model
+        finally:
+            with self._lock:
+                model.in_flight -= 1
+                self._prune()
+
+    def _prune(self) -> None:
+        # Drained versions are dropped here; the last reference goes with them.
+        self._retired = [model for model in self._retired if model.in_flight > 0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "active": self.active.describe() if self.active is not None else None,
+                "draining": [model.describe() for model in self._retired],
+                "swaps": self.swaps,
+            }
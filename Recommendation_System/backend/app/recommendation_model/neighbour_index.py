@@ -0,0 +1,77 @@
+"""Offline builder for the top-K neighbour index.
+
+The serving code only ever needs the first few neighbours of a movie, so
+instead of keeping the dense N x N similarity matrix (``vector.pkl``) in every
+worker we precompute, per movie, the row indices of its ``k`` most similar
+movies (self excluded) and their scores:
+
+    neighbour_rows.npy    int32   (N, k)   row indices into movie_df
+    neighbour_scores.npy  float16 (N, k)   similarity scores, descending
+
+Rows are ranked by descending score; ties are broken by ascending row index.
+
+Usage (from the backend directory):
+    python -m app.recommendation_model.neighbour_index [--k 200]
+"""
+import argparse
+import pickle
+import time
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+
+from app.recommendation_model.topk import top_k, top_k_block
+
+MODEL_DIR = Path(__file__).resolve().parent
+DEFAULT_K = 200
+
+
+def rank_row(row: np.ndarray, self_index: int, k: int) -> np.ndarray:
+    """Return the top ``k`` row indices of one similarity row, excluding self."""
+    return top_k(row, k, exclude=self_index)
+
+
+def build_neighbour_index(similarity, k: int = DEFAULT_K, block_size: int = 1024) -> Tuple[np.ndarray, np.ndarray]:
+    """Build ``(neighbour_rows, neighbour_scores)`` from a dense similarity matrix.
+
+    ``similarity`` may be any 2-D array-like indexable by row slices (a NumPy
+    array or a memory-mapped one); it is ranked ``block_size`` rows at a time.
+    """
+    n = similarity.shape[0]
+    k = min(k, n - 1)
+    rows = np.empty((n, k), dtype=np.int32)
+    scores = np.empty((n, k), dtype=np.float16)
+    for start in range(0, n, block_size):
+        block = np.asarray(similarity[start:start + block_size])
+        self_rows = np.arange(start, start + block.shape[0])
+        top = top_k_block(block, k, exclude=self_rows)
+        rows[start:start + block.shape[0]] = top
+        scores[start:start + block.shape[0]] = np.take_along_axis(block, top, axis=1)
+    return rows, scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=DEFAULT_K, help="neighbours kept per movie")
+    parser.add_argument("--vector", type=Path, default=MODEL_DIR / "vector.pkl", help="dense similarity pickle")
+    parser.add_argument("--out-dir", type=Path, default=MODEL_DIR, help="where to write the .npy files")
+    args = parser.parse_args()
+
+    with open(args.vector, "rb") as f:
+        similarity = pickle.load(f)
+
+    t0 = time.perf_counter()
+    rows, scores = build_neighbour_index(similarity, k=args.k)
+    elapsed = time.perf_counter() - t0
+
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    np.save(args.out_dir / "neighbour_rows.npy", rows)
+    np.save(args.out_dir / "neighbour_scores.npy", scores)
+    dense_bytes = np.asarray(similarity).nbytes
+    print(f"[MODEL] neighbour index built for {rows.shape[0]} movies (k={rows.shape[1]}) in {elapsed:.1f}s")
+    print(f"[MODEL] dense matrix {dense_bytes / 2**20:.1f} MiB -> index {(rows.nbytes + scores.nbytes) / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Quantized storage for the dense similarity matrix.
+
+``vector.pkl`` holds float64 scores, 8 bytes per pair. When the dense matrix
+is kept (``artifacts convert --keep-dense``) it can be stored smaller:
+
+    float16   similarity.npy        float16 (N, N)   2 bytes per pair
+    int8      similarity_q.npy      int8    (N, N)   1 byte per pair
+              similarity_scale.npy  float32 (N,)     per-row scale
+
+int8 rows are scaled by their own largest absolute off-diagonal value
+(``q = round(row / scale)``, ``scale = max|row| / 127``), so every row uses
+the full int8 range for the scores that get ranked; the self-similarity on
+the diagonal, which serving always excludes, is clipped.
+``QuantizedSimilarity`` dequantizes only the rows a request touches, so the
+serving code indexes it like the dense matrix and the full-precision matrix
+never exists in memory.
+
+The ``report`` command measures what the ranking loses: recall@6 / @12 of
+each quantized top list against the float64 one (self excluded, same tie
+rule as serving).
+
+Usage (from the backend directory):
+    python -m app.recommendation_model.quantize report [--vector vector.pkl] [--sample 2000]
+"""
+import argparse
+import pickle
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from app.recommendation_model.topk import top_k_block
+
+MODEL_DIR = Path(__file__).resolve().parent
+DTYPES = ("float64", "float32", "float16", "int8")
+INT8_MAX = 127
+
+
+def quantize_int8(similarity, block_size: int = 1024):
+    """Per-row scaled int8 copy of ``similarity``: returns ``(q, scale)``."""
+    n = similarity.shape[0]
+    q = np.empty(similarity.shape, dtype=np.int8)
+    scale = np.empty(n, dtype=np.float32)
+    for start in range(0, n, block_size):
+        block = np.array(similarity[start:start + block_size], dtype=np.float32)
+        diagonal = (np.arange(len(block)), np.arange(start, start + len(block)))
+        self_scores = block[diagonal]
+        block[diagonal] = 0
+        block_scale = np.abs(block).max(axis=1) / INT8_MAX
+        block_scale[block_scale == 0] = 1.0
+        block[diagonal] = self_scores
+        q[start:start + len(block)] = np.clip(np.rint(block / block_scale[:, None]), -INT8_MAX, INT8_MAX)
+        scale[start:start + len(block)] = block_scale
+    return q, scale
+
+
+def quantize_arrays(similarity, dtype: str) -> Dict[str, np.ndarray]:
+    """Artifact arrays storing ``similarity`` at ``dtype`` (see module docstring)."""
+    if dtype not in DTYPES:
+        raise ValueError(f"unsupported similarity dtype {dtype!r}, expected one of {DTYPES}")
+    if dtype == "int8":
+        q, scale = quantize_int8(similarity)
+        return {"similarity_q": q, "similarity_scale": scale}
+    return {"similarity": np.asarray(similarity).astype(dtype, copy=False)}
+
+
+class QuantizedSimilarity:
+    """Row access to an int8 similarity matrix, dequantized per request.
+
+    ``sim[i]`` / ``sim[rows]`` return float32 rows; only those rows are read
+    from the (usually memory-mapped) int8 array.
+    """
+
+    def __init__(self, q: np.ndarray, scale: np.ndarray):
+        self.q = q
+        self.scale = scale
+
+    @property
+    def shape(self):
+        return self.q.shape
+
+    @property
+    def nbytes(self) -> int:
+        return self.q.nbytes + self.scale.nbytes
+
+    def __len__(self) -> int:
+        return self.q.shape[0]
+
+    def __getitem__(self, rows) -> np.ndarray:
+        q = np.asarray(self.q[rows], dtype=np.float32)
+        scale = np.asarray(self.scale[rows], dtype=np.float32)
+        if q.ndim == 1:
+            return q * scale
+        return q * scale[..., None]
+
+
+def similarity_from_arrays(arrays: Dict[str, np.ndarray]):
+    """The dense similarity stored in ``arrays`` (any dtype), or ``None``."""
+    if arrays.get("similarity_q") is not None:
+        return QuantizedSimilarity(arrays["similarity_q"], arrays["similarity_scale"])
+    return arrays.get("similarity")
+
+
+# ---------------------------------------------------------------------------
+# Accuracy report
+# ---------------------------------------------------------------------------
+def recall_at(reference: np.ndarray, candidate: np.ndarray, k: int) -> float:
+    """Mean fraction of each reference top-``k`` row found in the candidate top-``k``."""
+    reference, candidate = reference[:, :k], candidate[:, :k]
+    hits = (reference[:, :, None] == candidate[:, None, :]).any(axis=2).sum(axis=1)
+    return float(hits.mean() / k)
+
+
+def recall_report(similarity, dtypes: Iterable[str] = ("float16", "int8"), ks: Iterable[int] = (6, 12),
+                  sample: Optional[int] = None, block_size: int = 512, seed: int = 0) -> Dict[str, dict]:
+    """Recall@k of each quantized ranking against the float64 ranking.
+
+    ``sample`` limits the seed rows checked (chosen at random); all rows are
+    always candidates. Returns ``{dtype: {"bytes": ..., "recall@k": ...}}``.
+    """
+    n = similarity.shape[0]
+    ks = sorted(ks)
+    depth = min(ks[-1], n - 1)
+    seeds = np.arange(n)
+    if sample is not None and sample < n:
+        seeds = np.sort(np.random.default_rng(seed).choice(n, size=sample, replace=False))
+
+    stored = {dtype: quantize_arrays(similarity, dtype) for dtype in dtypes}
+    views = {dtype: similarity_from_arrays(arrays) for dtype, arrays in stored.items()}
+    hits = {dtype: {k: 0.0 for k in ks} for dtype in dtypes}
+    for start in range(0, len(seeds), block_size):
+        rows = seeds[start:start + block_size]
+        reference = top_k_block(np.asarray(similarity[rows], dtype=np.float64), depth, exclude=rows)
+        for dtype, view in views.items():
+            candidate = top_k_block(np.asarray(view[rows], dtype=np.float32), depth, exclude=rows)
+            for k in ks:
+                hits[dtype][k] += recall_at(reference, candidate, k) * len(rows)
+
+    report = {}
+    for dtype in dtypes:
+        report[dtype] = {"bytes": sum(a.nbytes for a in stored[dtype].values())}
+        for k in ks:
+            report[dtype][f"recall@{k}"] = hits[dtype][k] / len(seeds)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    cmd = sub.add_parser("report", help="recall@6/@12 of quantized rankings vs float64")
+    cmd.add_argument("--vector", type=Path, default=MODEL_DIR / "vector.pkl", help="dense similarity pickle")
+    cmd.add_argument("--dtypes", nargs="+", default=["float16", "int8"], choices=DTYPES)
+    cmd.add_argument("--sample", type=int, default=None, help="number of seed movies to check (default: all)")
+    args = parser.parse_args()
+
+    with open(args.vector, "rb") as f:
+        similarity = np.asarray(pickle.load(f), dtype=np.float64)
+
+    t0 = time.perf_counter()
+    report = recall_report(similarity, args.dtypes, sample=args.sample)
+    print(f"[MODEL] {similarity.shape[0]} movies, float64 {similarity.nbytes / 2**20:.1f} MiB, "
+          f"checked in {time.perf_counter() - t0:.1f}s")
+    for dtype, row in report.items():
+        recalls = "  ".join(f"{name} {value:.4f}" for name, value in row.items() if name != "bytes")
+        print(f"[MODEL] {dtype:<8} {row['bytes'] / 2**20:8.1f} MiB  {recalls}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,72 @@
 import os
 import pickle
-import re
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
+from typing import Iterator, Optional
+
 import numpy as np
-import requests
 
+from app.cache.cache import MISSING, TTLCache
+from app.config.config import Settings
 from app.database.database import movie_data
+from app.recommendation_model import artifacts, downloader
+from app.recommendation_model.ann_index import IVFIndex
+from app.recommendation_model.build_model import load_features
+from app.recommendation_model.cold_start import PROJECTION as COLD_START_PROJECTION
+from app.recommendation_model.cold_start import ColdStartPool, candidates_from_documents
+from app.recommendation_model.filter_index import FilterIndex, MovieFilter
+from app.recommendation_model.model_registry import LoadedModel, ModelRegistry
+from app.recommendation_model.quantize import similarity_from_arrays
+from app.recommendation_model.search_index import GOOD_HIT_SCORE, TrigramSearchIndex
+from app.recommendation_model.title_index import TitleIndex
+from app.recommendation_model.topk import top_k, top_k_window, top_k_window_block
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-worker coordination
+    fcntl = None
+
+settings = Settings()  # type: ignore
 
 # ---------------------------------------------------------------------------
 # Model loading with optional remote download
 # ---------------------------------------------------------------------------
+# Preferred: a versioned, pickle-free artifact (see artifacts.py) opened with
+# np.load(mmap_mode="r"). Legacy fallback: movie_df.pkl + vector.pkl.
 MODEL_DIR = Path(__file__).resolve().parent
 MOVIE_DF_PATH = MODEL_DIR / "movie_df.pkl"
 VECTOR_PATH = MODEL_DIR / "vector.pkl"
+# Top-K neighbour index built offline by neighbour_index.py. When present the
+# dense similarity matrix is not loaded at all.
+NEIGHBOUR_ROWS_PATH = MODEL_DIR / "neighbour_rows.npy"
+NEIGHBOUR_SCORES_PATH = MODEL_DIR / "neighbour_scores.npy"
+
+
+def _download(url: str, path: Path, sha256: Optional[str] = None) -> None:
+    """Download ``url`` to ``path`` atomically, in parallel Range segments.
+
+    See downloader.py: an interrupted download leaves its ``.tmp`` behind and
+    the next call resumes it; ``sha256`` is checked before the file appears.
+    """
+    print(f"[MODEL] Downloading {path.name} from {url} ...")
+    try:
+        stats = downloader.download(
+            url, path, sha256=sha256, segments=settings.MODEL_DOWNLOAD_SEGMENTS,
+            timeout=(10, settings.MODEL_DOWNLOAD_TIMEOUT_SECONDS)
+        )
+    except Exception as exc:  # pragma: no cover - defensive
+        raise RuntimeError(f"Failed to download {path.name}: {exc}") from exc
+    details = [f"{stats['segments']} segment(s)"]
+    if stats["mib_per_second"]:
+        details.append(f"{stats['mib_per_second']:.1f} MiB/s")
+    if stats["resumed_bytes"]:
+        details.append(f"resumed {stats['resumed_bytes'] / 2**20:.1f} MiB")
+    print(f"[MODEL] {path.name}: {stats['bytes'] / 2**20:.1f} MiB in {stats['seconds']:.1f}s ({', '.join(details)})")
 
 
 def _ensure_file(path: Path, env_var: str) -> None:
@@ -32,118 +85,440 @@ def _ensure_file(path: Path, env_var: str) -> None:
             f"Missing model file: {path.name}. Either place it at {path} or set "
             f"the environment variable {env_var} to a direct download URL."
         )
+    _download(url, path)
 
-    path.parent.mkdir(parents=True, exist_ok=True)
-    print(f"[MODEL] Downloading {path.name} from {url} ...")
 
-    try:
-        with requests.get(url, stream=True, timeout=60) as r:
-            r.raise_for_status()
-            tmp_path = path.with_suffix(path.suffix + ".tmp")
-            with open(tmp_path, "wb") as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-            os.replace(tmp_path, path)
-    except Exception as exc:  # pragma: no cover - defensive
-        # Make sure we do not leave a partial file around
-        if path.exists():
-            try:
-                os.remove(path)
-            except OSError:
-                pass
-        raise RuntimeError(f"Failed to download {path.name}: {exc}") from exc
+def _published_artifact() -> Optional[Path]:
+    version = artifacts.current_version()
+    if version and (artifacts.ARTIFACTS_DIR / version / artifacts.MANIFEST_NAME).exists():
+        return artifacts.ARTIFACTS_DIR / version
+    return None
 
 
-# Attempt to ensure and load artifacts.
-# If this fails (e.g. missing env vars or download error), we log and keep
-# the app running so that auth and other endpoints still work.
-movie_df = None
-vector = None
+@contextmanager
+def _download_staging() -> Iterator[Path]:
+    """A staging directory no other worker writes to while it is held.
+
+    With flock, workers take turns on ``artifacts/download``, which survives
+    a failed attempt so the next one resumes it. Without flock each process
+    stages into its own temporary directory.
+    """
+    artifacts.ARTIFACTS_DIR.mkdir(parents=True, exist_ok=True)
+    if fcntl is None:
+        staging = Path(tempfile.mkdtemp(prefix="download-", dir=artifacts.ARTIFACTS_DIR))
+        try:
+            yield staging
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return
+    with open(artifacts.ARTIFACTS_DIR / "download.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield artifacts.ARTIFACTS_DIR / "download"
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
 
-try:
-    _ensure_file(MOVIE_DF_PATH, "MOVIE_DF_URL")
-    _ensure_file(VECTOR_PATH, "VECTOR_URL")
 
+def _ensure_artifact() -> Optional[Path]:
+    """Return the directory of the artifact version to serve, if any.
+
+    Uses ``artifacts/CURRENT`` when present. Otherwise, if ``MODEL_ARTIFACT_URL``
+    points at a published version directory, downloads its ``manifest.json``
+    and every array it lists into a staging directory, renames that into
+    place as the version directory, then marks that version current.
+    """
+    published = _published_artifact()
+    if published is not None:
+        return published
+
+    base_url = os.getenv("MODEL_ARTIFACT_URL")
+    if not base_url:
+        return None
+    base_url = base_url.rstrip("/")
+    with _download_staging() as staging:
+        # Another worker may have finished the download while this one waited.
+        published = _published_artifact()
+        if published is not None:
+            return published
+        _download(f"{base_url}/{artifacts.MANIFEST_NAME}", staging / artifacts.MANIFEST_NAME)
+        manifest = artifacts.read_manifest(staging)
+        target = artifacts.ARTIFACTS_DIR / manifest["version"]
+        if not (target / artifacts.MANIFEST_NAME).exists():
+            for entry in manifest["arrays"].values():
+                path = staging / entry["file"]
+                # Files left by an attempt at another version are fetched again.
+                if path.exists() and entry.get("sha256") and downloader.sha256_file(path) != entry["sha256"]:
+                    path.unlink()
+                if not path.exists():
+                    _download(f"{base_url}/{entry['file']}", path, entry.get("sha256"))
+            # A version directory without a manifest is an unfinished download.
+            shutil.rmtree(target, ignore_errors=True)
+            os.replace(staging, target)
+        else:
+            shutil.rmtree(staging, ignore_errors=True)
+        artifacts.set_current_version(manifest["version"])
+    return target
+
+
+def _load_legacy_pickles():
+    """Load movie_df.pkl (+ vector.pkl or the .npy neighbour index) into arrays."""
+    _ensure_file(MOVIE_DF_PATH, "MOVIE_DF_URL")
     with open(MOVIE_DF_PATH, "rb") as f:
-        movie_df = pickle.load(f)
+        arrays = artifacts.arrays_from_movie_df(pickle.load(f))
+
+    if NEIGHBOUR_ROWS_PATH.exists() and NEIGHBOUR_SCORES_PATH.exists():
+        arrays["neighbour_rows"] = np.load(NEIGHBOUR_ROWS_PATH, mmap_mode="r")
+        arrays["neighbour_scores"] = np.load(NEIGHBOUR_SCORES_PATH, mmap_mode="r")
+    else:
+        _ensure_file(VECTOR_PATH, "VECTOR_URL")
+        with open(VECTOR_PATH, "rb") as f:
+            arrays["similarity"] = np.asarray(pickle.load(f))
+    return arrays
+
+
+# Model state. Loading (which may download artifacts) runs on a background
+# thread started from the app lifespan (see ``start_model_loading``) so the
+# server accepts requests, e.g. auth and history, right away. Loaded versions
+# live in ``registry`` (see model_registry.py); until the first one is active
+# ``_ensure_model_ready`` answers with an error and the routes fall back.
+# ``reload_model`` loads another version next to the live one and swaps it in.
+MODEL_LOADING = "loading"
+MODEL_READY = "ready"
+MODEL_FAILED = "failed"
+
+model_state = MODEL_LOADING
+model_error = None      # why the last load or reload failed
+registry = ModelRegistry()
+
+_load_lock = threading.Lock()
+_load_thread = None
+_reload_lock = threading.Lock()
+
+
+def _artifact_dir_for(version: Optional[str]) -> Optional[Path]:
+    if version is None:
+        return _ensure_artifact()
+    path = artifacts.ARTIFACTS_DIR / version
+    if not (path / artifacts.MANIFEST_NAME).exists():
+        raise RuntimeError(f"artifact version {version!r} not found in {artifacts.ARTIFACTS_DIR}")
+    return path
+
+
+def _open_model(version: Optional[str] = None) -> LoadedModel:
+    """Open an artifact version (default: CURRENT, else the legacy pickles) and build its indexes."""
+    started = time.perf_counter()
+    artifact_dir = _artifact_dir_for(version)
+    if artifact_dir is not None:
+        artifact = artifacts.load_artifact(artifact_dir)
+        version = artifact.version
+        model_arrays = artifact.arrays
+    else:
+        print("[MODEL] No artifact found, falling back to legacy pickles")
+        version = "pickle"
+        model_arrays = _load_legacy_pickles()
+
+    vector = similarity_from_arrays(model_arrays)
+    neighbour_rows = model_arrays.get("neighbour_rows")
+    ann_index = None
+    if settings.NEIGHBOUR_BACKEND == "ivf":
+        if model_arrays.get("ann_centroids") is not None:
+            ann_index = IVFIndex.from_arrays(
+                model_arrays, n_probe=settings.ANN_N_PROBE, workers=settings.ANN_QUERY_WORKERS
+            )
+        else:
+            print("[MODEL] WARNING: NEIGHBOUR_BACKEND=ivf but the artifact has no IVF index, using exact neighbours")
+    elif settings.NEIGHBOUR_BACKEND != "exact":
+        print(f"[MODEL] WARNING: unknown NEIGHBOUR_BACKEND {settings.NEIGHBOUR_BACKEND!r}, using exact neighbours")
+    if vector is None and neighbour_rows is None and ann_index is None:
+        raise RuntimeError("model has neither a neighbour index nor a similarity matrix")
+
+    movie_ids = model_arrays["ids"]
+    movie_titles = model_arrays["titles"]
+    filter_index = FilterIndex.from_arrays(model_arrays)
+    features = None
+    if filter_index is not None and vector is None and model_arrays.get("feature_indptr") is not None:
+        features = ann_index.vectors if ann_index is not None else load_features(model_arrays)
+    return LoadedModel(
+        version, movie_ids, movie_titles,
+        vector=vector,
+        neighbour_rows=neighbour_rows,
+        neighbour_scores=model_arrays.get("neighbour_scores"),
+        ann_index=ann_index,
+        title_index=TitleIndex(movie_ids, movie_titles),
+        search_index=TrigramSearchIndex(movie_titles, model_arrays.get("popularity")),
+        filter_index=filter_index,
+        features=features,
+        load_seconds=time.perf_counter() - started,
+    )
+
+
+def _validate_model(model: LoadedModel) -> None:
+    """Smoke-test a freshly opened version before it serves traffic."""
+    n = len(model.movie_ids)
+    if n < 2:
+        raise RuntimeError(f"version {model.version} has {n} movies")
+    if len(np.unique(np.asarray(model.movie_ids))) != n:
+        raise RuntimeError(f"version {model.version} has duplicate movie ids")
+    rows = np.unique(np.linspace(0, n - 1, num=min(n, 16)).astype(np.int64))
+    if model.neighbour_rows is not None:
+        neighbours = np.asarray(model.neighbour_rows[rows])
+        if neighbours.min() < 0 or neighbours.max() >= n:
+            raise RuntimeError(f"version {model.version} has neighbour rows out of range")
+    for row in rows[:4]:
+        ranked, _ = _ranked_rows(model, int(row), 6)
+        if len(ranked) == 0 or int(row) in ranked.tolist():
+            raise RuntimeError(f"version {model.version} cannot rank neighbours of row {row}")
+        if model.title_index.resolve(str(model.movie_titles[row])) is None:
+            raise RuntimeError(f"version {model.version} cannot resolve its own titles")
+
+
+def load_model() -> bool:
+    """Load the recommendation model and make it the active version (blocking).
+
+    If this fails (e.g. missing env vars or download error), we log, record
+    the error and keep the app running so that auth and other endpoints
+    still work. Returns whether the model is ready.
+    """
+    global model_state, model_error
+    try:
+        model = _open_model()
+    except Exception as exc:  # pragma: no cover - defensive
+        print(f"[MODEL] WARNING: recommendation model not available: {exc}")
+        model_error = str(exc)
+        model_state = MODEL_FAILED
+        return False
+
+    registry.activate(model)
+    model_error = None
+    model_state = MODEL_READY
+    print(f"[MODEL] Recommendation artifacts loaded successfully (version {model.version}) "
+          f"in {model.load_seconds:.1f}s")
+    return True
+
+
+def reload_model(version: Optional[str] = None) -> dict:
+    """Load ``version`` (default: artifacts/CURRENT) next to the live model and swap it in.
+
+    The new version is opened and validated while the old one keeps serving;
+    only then does it become active. Requests already running finish on the
+    version they started with. Returns ``{"previous", "active", "swapped"}``;
+    raises if the new version cannot be opened or fails validation, leaving
+    the live model untouched.
+    """
+    global model_state, model_error
+    with _reload_lock:
+        if version is None and registry.version is not None and artifacts.current_version() == registry.version:
+            return {"previous": registry.version, "active": registry.version, "swapped": False}
+        try:
+            model = _open_model(version)
+            _validate_model(model)
+        except Exception as exc:
+            model_error = f"reload failed: {exc}"
+            print(f"[MODEL] WARNING: {model_error}")
+            raise
+        previous = registry.activate(model)
+        model_error = None
+        model_state = MODEL_READY
+    print(f"[MODEL] Swapped to version {model.version} (was {previous.version if previous else None}) "
+          f"after {model.load_seconds:.1f}s of loading")
+    return {"previous": previous.version if previous else None, "active": model.version, "swapped": True}
+
+
+def start_model_loading() -> threading.Thread:
+    """Start ``load_model`` on a daemon thread, once; returns that thread."""
+    global _load_thread
+    with _load_lock:
+        if _load_thread is None:
+            _load_thread = threading.Thread(target=load_model, name="model-loader", daemon=True)
+            _load_thread.start()
+    return _load_thread
+
+
+def _check_current(last: Optional[str]) -> Optional[str]:
+    """One watcher poll: reload if artifacts/CURRENT moved off ``last``.
+
+    Returns the CURRENT version seen, so a version that failed to load is
+    not retried until CURRENT changes again.
+    """
+    current = artifacts.current_version()
+    if current == last or model_state == MODEL_LOADING:
+        return last
+    if current and current != registry.version:
+        try:
+            reload_model(current)
+        except Exception:
+            pass  # already logged; keep serving the live version
+    return current
 
-    with open(VECTOR_PATH, "rb") as f:
-        vector = pickle.load(f)
 
-    print("[MODEL] Recommendation artifacts loaded successfully")
-except Exception as exc:  # pragma: no cover - defensive
-    print(f"[MODEL] WARNING: recommendation model not available: {exc}")
-    movie_df = None
-    vector = None
+def _watch_current(interval: float) -> None:
+    last = None
+    try:
+        last = artifacts.current_version()
+    except Exception as exc:
+        print(f"[MODEL] WARNING: model watcher cannot read CURRENT: {exc}")
+    while True:
+        time.sleep(interval)
+        try:
+            last = _check_current(last)
+        except Exception as exc:
+            # A bad CURRENT file or a full disk must not stop the watcher.
+            print(f"[MODEL] WARNING: model watcher poll failed: {exc}")
 
 
-def _find_mongo_doc_by_title(title: str):
-    """Locate a movie document in MongoDB by title (case-insensitive).
-    Tries exact match first, then contains.
+def start_model_watcher(interval: float) -> Optional[threading.Thread]:
+    """Reload whenever artifacts/CURRENT changes, polling every ``interval`` seconds.
+
+    Every worker runs its own watcher, so publishing a version (build_model,
+    ``artifacts convert``) reaches all of them. ``interval <= 0`` disables it.
     """
-    if not title:
-        return None
-    try:
-        exact = movie_data.find_one({'title': {'$regex': f'^{re.escape(title.strip())}$', '$options': 'i'}})
-        if exact:
-            return exact
-        partial = movie_data.find_one({'title': {'$regex': re.escape(title.strip()), '$options': 'i'}})
-        return partial
-    except Exception:
+    if interval <= 0:
         return None
+    thread = threading.Thread(target=_watch_current, args=(interval,), name="model-watcher", daemon=True)
+    thread.start()
+    return thread
+
 
+def active_version() -> Optional[str]:
+    return registry.version
 
-def _find_movie_index(title: str):
-    """Resolve dataframe row index for a given title using Mongo as source of truth.
+
+def model_status() -> dict:
+    active = registry.active
+    return {
+        "state": model_state,
+        "version": registry.version,
+        "movies": None if active is None else len(active.movie_ids),
+        "load_seconds": None if active is None else active.load_seconds,
+        "error": model_error,
+    }
+
+
+# Ranked similarity lists per seed row, keyed by (model_version, row index).
+RANKED_LIST_DEPTH = 60
+ranked_cache = TTLCache(
+    max_entries=settings.SIMILAR_CACHE_MAX_ENTRIES,
+    ttl=settings.SIMILAR_CACHE_TTL_SECONDS
+)
+
+
+def _find_movie_index(model: LoadedModel, title: str):
+    """Resolve the model row index for a given title.
     Strategy:
-    1) Find Mongo document by title (case-insensitive),
-    2) Map its TMDB id (doc['id']) to movie_df['id'] to get the exact row,
-    3) Fallback to dataframe title matching if needed.
+    1) Exact normalized-title lookup in ``title_index`` (O(1)),
+    2) Partial (word-start) match through the index's sorted suffix array.
+    A title the index cannot resolve is reported as not found without asking
+    Mongo, so a miss never costs a regex scan of ``all_movies``.
     """
-    # 1) Try Mongo first to obtain canonical TMDB id
-    doc = _find_mongo_doc_by_title(title)
-    if doc:
-        try:
-            doc_id = None
-            for k in ('id', 'tmdb_id', 'movieId', 'movie_id'):
-                if k in doc and doc[k] is not None:
-                    doc_id = doc[k]
-                    break
-            if doc_id is not None:
-                mask = movie_df['id'] == doc_id #type:ignore
-                if getattr(mask, 'any', lambda: False)():
-                    return movie_df.index[mask][0] #type:ignore
-        except Exception:
-            pass
-
-    # 2) Fallback to title matching in dataframe (case-insensitive)
     if not title:
         return None
-    t = title.strip().lower()
-    try:
-        mask = movie_df['title'].str.strip().str.lower() == t #type:ignore
-        if mask.any():
-            return movie_df.index[mask][0] #type:ignore
-    except Exception:
-        pass
-    try:
-        mask = movie_df['title'].str.lower().str.contains(np.str_(t), na=False) #type:ignore
-        if mask.any():
-            return movie_df.index[mask][0] #type:ignore
-    except Exception:
-        pass
-    return None
+    return model.title_index.resolve(title)
+
+
+def search_titles(query: str, limit: int = 20, min_score: float = GOOD_HIT_SCORE):
+    """Search the model catalogue locally for titles matching ``query``.
+
+    Returns a list of ``(tmdb_id, score)`` pairs, best first; empty when the
+    model is not loaded or nothing scores at least ``min_score``.
+    """
+    if model_state != MODEL_READY:
+        return []
+    with registry.use() as model:
+        hits = model.search_index.search(query, limit=limit, min_score=min_score)
+        return [(int(model.movie_ids[row]), score) for row, score in hits]
 
 
 def _top_indices_from_distances(distances, self_index: int, start: int, end: int):
     """Get a slice of top indices excluding the self index.
     start/end are 0-based in the sorted (descending) list that excludes self.
+    Uses argpartition and only sorts the ``end`` selected indices.
     """
-    order = np.argsort(distances)[::-1]
-    # Exclude self index explicitly
-    order = [i for i in order if i != self_index]
-    return order[start:end]
+    return top_k_window(distances, start, end, exclude=self_index)
+
+
+def _top_indices_batch(model: LoadedModel, rows, start: int, end: int):
+    """Batched ``_top_indices_from_distances`` for a list of row indices.
+
+    Gathers the dense similarity rows as one 2-D block and selects the
+    [start:end] window for each in a single vectorized pass.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    return top_k_window_block(model.vector[rows], start, end, exclude=rows)
+
+
+def _filter_mask(model: LoadedModel, filters: Optional[MovieFilter]):
+    """Boolean row mask of ``filters`` (``None`` when unfiltered).
+
+    Raises ``ValueError`` when the version has no filter columns or the
+    filter names an unknown genre.
+    """
+    if filters is None:
+        return None
+    if model.filter_index is None:
+        raise ValueError(f"model version {model.version} has no genre/year/language columns")
+    return model.filter_index.mask(filters)
+
+
+def _ranked_rows(model: LoadedModel, idx: int, depth: int, mask=None):
+    """Rows most similar to row ``idx``, at least ``depth`` deep when possible.
+
+    Returns ``(rows, complete)``; ``complete`` means the model cannot rank
+    any deeper than ``rows``. With the neighbour index the whole precomputed
+    row is the list; with the dense matrix or the IVF index the list is
+    ranked to ``depth``. Rows outside ``mask`` are dropped before ranking;
+    with only the neighbour index, the precomputed list is filtered and, when
+    too few of it match, the matching rows are scored against the sparse
+    features instead (a cost proportional to the number of matches).
+    """
+    if model.ann_index is not None:
+        query = model.ann_index.vectors_for_rows([idx])
+        rows, _ = model.ann_index.search(query, depth, exclude=[[idx]], mask=mask)[0]
+        return rows, len(rows) < depth
+    if model.neighbour_rows is not None and (
+        model.vector is None or (mask is None and depth <= model.neighbour_rows.shape[1])
+    ):
+        rows = np.asarray(model.neighbour_rows[idx])
+        if mask is None:
+            return rows, model.vector is None
+        rows = rows[mask[rows]]
+        if len(rows) >= depth or model.features is None:
+            return rows, model.features is None
+        candidates = np.flatnonzero(mask)
+        candidates = candidates[candidates != idx]
+        scores = np.asarray((model.features[candidates] @ model.features[idx].T).todense()).ravel()
+        rows = candidates[top_k_window(scores, 0, depth)]
+        return rows, len(rows) < depth
+    distances = model.vector[idx]
+    if mask is not None:
+        distances = np.where(mask, distances, -np.inf)
+    rows = _top_indices_from_distances(distances, idx, 0, depth)
+    if mask is not None:
+        rows = rows[mask[rows]]
+    return rows, len(rows) < depth
+
+
+def _ranked_ids(model: LoadedModel, idx: int, end: int, filters: Optional[MovieFilter] = None):
+    """TMDB ids of the movies most similar to row ``idx`` (self excluded).
+
+    Returns an array with at least ``end`` ids when the model can rank that
+    deep. Ranked lists are cached per (model version, row, filters) so paging
+    deeper into the same seed only costs a slice; lists are ranked to
+    ``RANKED_LIST_DEPTH`` (or twice the cached depth when paging past it).
+    """
+    key = (model.version, idx, filters)
+    cached = ranked_cache.get(key)
+    if cached is not MISSING:
+        ranked, complete = cached
+        if complete or len(ranked) >= end:
+            return ranked
+        depth = max(end, 2 * len(ranked))
+    else:
+        depth = max(end, RANKED_LIST_DEPTH)
+
+    rows, complete = _ranked_rows(model, idx, depth, _filter_mask(model, filters))
+    ranked = model.movie_ids[rows]
+    ranked_cache.set(key, (ranked, complete))
+    return ranked
 
 
 def _ensure_model_ready():
@@ -151,91 +526,253 @@ def _ensure_model_ready():
 
     Returns a dict error payload if the model is not available, otherwise None.
     """
-    if movie_df is None or vector is None:
-        return {"error": "Recommendation model not available. Please try again later."}
-    return None
+    if registry.active is not None:
+        return None
+    if model_state == MODEL_LOADING:
+        return {"error": "Recommendation model is still loading. Please try again shortly."}
+    return {"error": "Recommendation model not available. Please try again later."}
 
 
-def recommand_top_6(movie: str):
+def recommand_similar(movie: str, offset: int = 0, limit: int = 6, filters: Optional[MovieFilter] = None):
+    """TMDB ids ranked [offset:offset + limit] by similarity to ``movie``.
+
+    Only movies matching ``filters`` are ranked. Returns an error dict if the
+    model is unavailable or the movie unknown; raises ``ValueError`` for a
+    filter the model cannot apply.
+    """
     not_ready = _ensure_model_ready()
     if not_ready:
         return not_ready
 
-    # Prefer DataFrame presence; do not hard-fail on Mongo mismatch
-    idx = _find_movie_index(movie)
-    if idx is None:
-        # As a last resort, check Mongo and attempt again with its title field
-        doc = movie_data.find_one({'title': movie})
-        if doc:
-            idx = _find_movie_index(doc.get('title', ''))
-    if idx is None:
-        return {"error": "Movie not found"}
+    with registry.use() as model:
+        idx = _find_movie_index(model, movie)
+        if idx is None:
+            return {"error": "Movie not found"}
 
-    distances = vector[idx] #type:ignore
-    top_idx = _top_indices_from_distances(distances, idx, 0, 6)
-    return movie_df.iloc[top_idx]['id'].tolist()#type:ignore
+        end = offset + limit
+        return _ranked_ids(model, idx, end, filters)[offset:end].tolist()
 
 
-def recommand_top_7_to_12(movie: str):
+def _blend_scores(model: LoadedModel, rows, weights):
+    """Weighted sum of the similarity rows of ``rows`` as one (N,) score vector.
+
+    With the dense matrix this is a single ``weights @ block`` product over the
+    gathered (len(rows), N) block. With only the neighbour index, the seeds'
+    (len(rows), k) neighbour scores are scattered into N slots in one
+    ``np.bincount`` pass.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.float64)
+    if model.vector is not None:
+        return weights @ np.asarray(model.vector[rows], dtype=np.float64)
+    neighbours = np.asarray(model.neighbour_rows[rows])
+    scores = np.asarray(model.neighbour_scores[rows], dtype=np.float64) * weights[:, None]
+    return np.bincount(neighbours.ravel(), weights=scores.ravel(), minlength=len(model.movie_ids))
+
+
+def _top_blended(model: LoadedModel, rows, weights, limit: int, exclude_rows=None, mask=None):
+    """TMDB ids of the ``limit`` best blended scores within ``mask``, never returning ``exclude_rows``."""
+    excluded = np.asarray(rows if exclude_rows is None else exclude_rows, dtype=np.int64)
+    if model.ann_index is not None:
+        # sum_i w_i (e_i . e_j) == (sum_i w_i e_i) . e_j: one ANN query ranks the blend.
+        query = np.asarray(weights, dtype=np.float32) @ model.ann_index.vectors_for_rows(rows)
+        top, scores = model.ann_index.search(query, limit, exclude=[excluded], mask=mask)[0]
+        return model.movie_ids[top[scores > 0]].tolist()
+    if mask is not None and model.vector is None and model.features is not None:
+        # Exact blend over the matching rows only (see _ranked_rows).
+        candidates = np.setdiff1d(np.flatnonzero(mask), excluded)
+        query = model.features[np.asarray(rows, dtype=np.int64)].T @ np.asarray(weights, dtype=np.float64)
+        scores = np.asarray(model.features[candidates] @ query).ravel()
+        top = top_k(scores, min(limit, len(scores)))
+        return model.movie_ids[candidates[top[scores[top] > 0]]].tolist()
+    scores = _blend_scores(model, rows, weights)
+    if mask is not None:
+        scores[~mask] = -np.inf
+    scores[excluded] = -np.inf
+    top = top_k(scores, limit)
+    top = top[np.isfinite(scores[top]) & (scores[top] > 0)]
+    return model.movie_ids[top].tolist()
+
+
+def recommand_batch(seeds, limit: int = 12, filters: Optional[MovieFilter] = None):
+    """Recommend for several seeds at once.
+
+    ``seeds`` is a list of ``(title, tmdb_id, weight)`` tuples; ``tmdb_id`` wins
+    over ``title`` when both are given. Returns ``{"seeds": [...], "blended":
+    [...]}`` where each seed entry holds its own ranked TMDB ids (or an
+    error), and ``blended`` ranks the weighted sum of all resolved seeds'
+    similarity rows with the seeds themselves excluded. Every list only holds
+    movies matching ``filters``. Returns an error dict if the model is
+    unavailable.
+    """
+    not_ready = _ensure_model_ready()
+    if not_ready:
+        return not_ready
+
+    with registry.use() as model:
+        mask = _filter_mask(model, filters)
+        per_seed, rows, weights = [], [], []
+        for title, tmdb_id, weight in seeds:
+            idx = model.title_index.row_for_id(tmdb_id) if tmdb_id else None
+            if idx is None and title:
+                idx = _find_movie_index(model, title)
+            if idx is None:
+                per_seed.append({"error": "Movie not found"})
+                continue
+            rows.append(idx)
+            weights.append(weight)
+            per_seed.append({
+                "tmdb_id": int(model.movie_ids[idx]),
+                "movies": _ranked_ids(model, idx, limit, filters)[:limit].tolist()
+            })
+
+        blended = _top_blended(model, rows, weights, limit, mask=mask) if rows else []
+        return {"seeds": per_seed, "blended": blended}
+
+
+def recommand_for_history(history_ids, limit: int = 12):
+    """Personalized TMDB ids from a user's watch history.
+
+    History ids are mapped to model rows in one vectorized lookup, their
+    similarity rows are summed with weights growing linearly with recency
+    (oldest 0.5, newest 1.0), already watched movies are masked out and the
+    top ``limit`` are returned. Returns an error dict if the model is
+    unavailable or none of the history is known to the model.
+    """
+    not_ready = _ensure_model_ready()
+    if not_ready:
+        return not_ready
+
+    with registry.use() as model:
+        rows = model.title_index.rows_for_ids(history_ids)
+        if rows.size == 0:
+            return {"error": "No history movies known to the model"}
+        weights = 0.5 + 0.5 * np.arange(1, rows.size + 1) / rows.size
+        return _top_blended(model, rows, weights, limit)
+
+
+def browse_movies(filters: Optional[MovieFilter], offset: int = 0, limit: int = 24):
+    """TMDB ids of the movies matching ``filters``, most popular first.
+
+    Returns ``{"movies": [...], "total": matches}``, or an error dict if the
+    model is unavailable; raises ``ValueError`` for a filter it cannot apply.
+    """
     not_ready = _ensure_model_ready()
     if not_ready:
         return not_ready
 
-    idx = _find_movie_index(movie)
-    if idx is None:
-        doc = movie_data.find_one({'title': movie})
-        if doc:
-            idx = _find_movie_index(doc.get('title', ''))
-    if idx is None:
-        return {"error": "Movie not found"}
+    with registry.use() as model:
+        if model.filter_index is None:
+            raise ValueError(f"model version {model.version} has no genre/year/language columns")
+        rows, total = model.filter_index.browse(filters, offset, limit)
+        return {"movies": model.movie_ids[rows].tolist(), "total": total}
+
+
+def browse_options():
+    """Genres, languages and year range present in the active model, or an error dict."""
+    not_ready = _ensure_model_ready()
+    if not_ready:
+        return not_ready
+    with registry.use() as model:
+        if model.filter_index is None:
+            return {"error": f"model version {model.version} has no genre/year/language columns"}
+        return model.filter_index.describe()
+
+
+def recommand_top_6(movie: str):
+    return recommand_similar(movie, 0, 6)
+
+
+def recommand_top_7_to_12(movie: str):
+    return recommand_similar(movie, 6, 6)
+
+
+# ---------------------------------------------------------------------------
+# Cold start
+# ---------------------------------------------------------------------------
+COLD_START_SAMPLE_SIZE = 72
+# Retry sooner while the pool is empty or only holds the model fallback.
+COLD_START_RETRY_SECONDS = 60
+cold_start_pool = ColdStartPool()
 
-    distances = vector[idx]  #type:ignore
-    next_idx = _top_indices_from_distances(distances, idx, 6, 12)
-    return movie_df.iloc[next_idx]['id'].tolist()  #type:ignore
 
+def refresh_cold_start_pool() -> bool:
+    """Rebuild the cold-start pool from ``all_movies`` (see cold_start.py).
 
-def recommand_sample_30():
+    Runs off the request path. If Mongo is unavailable the previous pool is
+    kept; with no previous pool the active model's ids are used, uniformly
+    weighted. Returns whether the pool now holds catalogue candidates.
+    """
+    started = time.perf_counter()
+    try:
+        cursor = movie_data.find({}, COLD_START_PROJECTION, batch_size=5000)
+        ids, weights = candidates_from_documents(cursor, settings.COLD_START_POOL_SIZE)
+        if len(ids) == 0:
+            raise RuntimeError("all_movies returned no movie ids")
+        cold_start_pool.replace(ids, weights, "catalogue")
+    except Exception as exc:
+        cold_start_pool.failures += 1
+        cold_start_pool.last_error = str(exc)
+        if len(cold_start_pool) == 0 and registry.active is not None:
+            model = registry.active
+            cold_start_pool.replace(model.movie_ids, np.ones(len(model.movie_ids)), f"model {model.version}")
+        print(f"[COLD] WARNING: cold-start refresh failed ({exc}); "
+              f"serving {len(cold_start_pool)} candidates from {cold_start_pool.stats()['source']}")
+        return False
+    cold_start_pool.last_error = None
+    cold_start_pool.refresh_seconds = time.perf_counter() - started
+    print(f"[COLD] Cold-start pool refreshed: {len(cold_start_pool)} candidates "
+          f"in {cold_start_pool.refresh_seconds:.1f}s")
+    return True
+
+
+def _refresh_cold_start(interval: float) -> None:
+    while True:
+        ok = refresh_cold_start_pool()
+        if interval <= 0 and ok:
+            return
+        time.sleep(interval if ok and interval > 0 else COLD_START_RETRY_SECONDS)
+
+
+def start_cold_start_refresher(interval: float) -> threading.Thread:
+    """Fill the cold-start pool now and then every ``interval`` seconds.
+
+    ``interval <= 0`` fills it once (retrying until Mongo answers).
+    """
+    thread = threading.Thread(target=_refresh_cold_start, args=(interval,), name="cold-start-refresh", daemon=True)
+    thread.start()
+    return thread
+
+
+def _sample_model_ids(size: int):
+    if registry.active is None:
+        return []
+    with registry.use() as model:
+        movie_ids = model.movie_ids
+        rows = np.random.default_rng().choice(len(movie_ids), size=min(size, len(movie_ids)), replace=False)
+        return movie_ids[rows].tolist()
+
+
+def recommand_sample_30(seed: Optional[str] = None):
     """Return a list of TMDB movie IDs for cold-start.
 
     We fetch a relatively large random sample so the frontend can display
     dozens of movies across sections (home rows + "Other Movies").
 
     The priority is:
-    1) Random sample from MongoDB collection ``movie_data`` (if available),
-    2) Random sample from ``movie_df`` dataframe (if the offline model is loaded),
+    1) Weighted sample of the in-memory cold-start pool (never touches Mongo;
+       with a ``seed``, e.g. the user's email, the sample is stable until the
+       pool is refreshed),
+    2) Random sample of the active model's ids (until the pool is filled),
     3) Hard-coded list of popular TMDB IDs as a final, always-available fallback.
 
     This ensures the homepage can still show movies even if MongoDB and/or the
     recommendation artifacts are not available, as long as a valid TMDB API key
     is configured on the backend.
     """
-    ids = []
-    try:
-        # Random sample of movies from MongoDB (larger sample for more UI content)
-        sample_cursor = movie_data.aggregate([{"$sample": {"size": 72}}])
-        for doc in sample_cursor:
-            tmdb_id = None
-            # Try common id field names
-            for k in ("id", "tmdb_id", "movieId", "movie_id"):
-                if k in doc and doc[k] is not None:
-                    tmdb_id = doc[k]
-                    break
-            if tmdb_id is not None:
-                # Ensure it's an int if possible
-                try:
-                    tmdb_id = int(tmdb_id)
-                except (TypeError, ValueError):
-                    pass
-                ids.append(tmdb_id)
-        # Fallback: if we somehow fetched nothing, and the model is ready,
-        # use the dataframe-based sampling as a backup.
-        if not ids and movie_df is not None:
-            ids = movie_df.sample(72)['id'].values.tolist()
-    except Exception:
-        # As a last resort, if Mongo sampling fails but the model is ready,
-        # fall back to dataframe sampling.
-        if movie_df is not None:
-            ids = movie_df.sample(72)['id'].values.tolist()
+    ids = cold_start_pool.sample(COLD_START_SAMPLE_SIZE, seed)
+    if not ids:
+        ids = _sample_model_ids(COLD_START_SAMPLE_SIZE)
 
     # Final safety net: if we *still* have no IDs (e.g. no Mongo, no model),
     # use a small curated set of popular TMDB movie IDs so the UI always has
@@ -275,4 +812,4 @@ def recommand_sample_30():
         ]
 
     # Ensure we never return more than 72 IDs
-    return ids[:72]
+    return ids[:COLD_START_SAMPLE_SIZE]
@@ -0,0 +1,84 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.recommendation_model.title_index import normalize_title
+
+# Score below which a local hit is not considered "good" and callers should
+# fall back to the TMDB search API.
+GOOD_HIT_SCORE = 0.6
+
+
+def trigrams(text: str) -> List[str]:
+    """Distinct character trigrams of a normalized, space-padded string."""
+    padded = f"  {text} "
+    return list(dict.fromkeys(padded[i:i + 3] for i in range(len(padded) - 2)))
+
+
+class TrigramSearchIndex:
+    """Typo-tolerant title search over the model catalogue.
+
+    An inverted index maps every character trigram to the (sorted) rows whose
+    normalized title contains it. A query gathers the postings of its own
+    trigrams, counts shared trigrams per candidate row and scores candidates by
+
+        0.7 * coverage + 0.3 * dice (+0.15 if the title starts with the query)
+
+    where coverage is the fraction of query trigrams found in the title (good
+    for search-as-you-type prefixes) and dice the symmetric overlap (penalises
+    much longer titles). The score is then boosted by log-scaled popularity.
+    Misspellings still share most trigrams, which is what makes the index
+    tolerant to typos.
+    """
+
+    def __init__(self, titles: np.ndarray, popularity: Optional[np.ndarray] = None):
+        self._titles = [normalize_title(title) for title in titles.tolist()]
+        self.size = len(self._titles)
+        postings = {}
+        gram_counts = np.zeros(self.size, dtype=np.int32)
+        for row, title in enumerate(self._titles):
+            if not title:
+                continue
+            grams = trigrams(title)
+            gram_counts[row] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(row)
+        self._postings = {gram: np.array(rows, dtype=np.int32) for gram, rows in postings.items()}
+        self._gram_counts = gram_counts
+
+        if popularity is None:
+            self._boost = np.ones(self.size, dtype=np.float32)
+        else:
+            logs = np.log1p(np.clip(np.asarray(popularity, dtype=np.float64), 0, None))
+            top = logs.max() if logs.size and logs.max() > 0 else 1.0
+            self._boost = (1.0 + 0.25 * logs / top).astype(np.float32)
+
+    def search(self, query: str, limit: int = 20, min_score: float = 0.3) -> List[Tuple[int, float]]:
+        """Return up to ``limit`` ``(row, score)`` pairs, best first."""
+        query = normalize_title(query)
+        if not query or limit <= 0:
+            return []
+        grams = trigrams(query)
+        lists = [self._postings[gram] for gram in grams if gram in self._postings]
+        if not lists:
+            return []
+
+        rows, shared = np.unique(np.concatenate(lists), return_counts=True)
+        coverage = shared / len(grams)
+        dice = 2.0 * shared / (len(grams) + self._gram_counts[rows])
+        scores = 0.7 * coverage + 0.3 * dice
+        keep = scores >= min_score
+        rows, scores = rows[keep], scores[keep]
+        if rows.size == 0:
+            return []
+
+        # Prefix bonus and popularity only for a shortlist of the best matches.
+        shortlist = min(rows.size, limit * 5)
+        top = np.argpartition(-scores, shortlist - 1)[:shortlist]
+        results = []
+        for row, score in zip(rows[top].tolist(), scores[top].tolist()):
+            if self._titles[row].startswith(query):
+                score += 0.15
+            results.append((row, float(score * self._boost[row])))
+        results.sort(key=lambda item: (-item[1], item[0]))
+        return results[:limit]
@@ -0,0 +1,98 @@
+from bisect import bisect_left
+from typing import Optional
+
+import numpy as np
+
+# Above this TMDB id the id -> row lookup falls back to a dict instead of a
+# dense array indexed by id (4 bytes per possible id).
+MAX_DENSE_ID = 50_000_000
+
+
+def normalize_title(title) -> str:
+    """Case-fold and collapse whitespace so lookups ignore cosmetic differences."""
+    return " ".join(str(title).lower().split())
+
+
+class TitleIndex:
+    """In-memory lookups from titles and TMDB ids to model row indices.
+
+    Built once at model load:
+
+    - ``exact``: normalized title -> first row with that title (O(1));
+    - ``row_by_id``: TMDB id -> row, a dense int32 array indexed by id;
+    - a sorted array of every word-start suffix of every normalized title
+      ("the dark knight", "dark knight", "knight"), so a partial query is a
+      binary search for the range of suffixes it prefixes instead of a scan
+      over all titles.
+    """
+
+    def __init__(self, ids: np.ndarray, titles: np.ndarray):
+        self.size = len(ids)
+        self.exact = {}
+        suffixes, suffix_rows = [], []
+        for row, title in enumerate(titles.tolist()):
+            normalized = normalize_title(title)
+            if not normalized:
+                continue
+            self.exact.setdefault(normalized, row)
+            words = normalized.split(" ")
+            for i in range(len(words)):
+                suffixes.append(" ".join(words[i:]))
+                suffix_rows.append(row)
+        order = sorted(range(len(suffixes)), key=suffixes.__getitem__)
+        self._suffixes = [suffixes[i] for i in order]
+        self._suffix_rows = np.array([suffix_rows[i] for i in order], dtype=np.int64)
+
+        ids = np.asarray(ids, dtype=np.int64)
+        self._id_map = None
+        self.row_by_id = None
+        max_id = int(ids.max()) if len(ids) else -1
+        if 0 <= int(ids.min() if len(ids) else 0) and max_id <= MAX_DENSE_ID:
+            self.row_by_id = np.full(max_id + 1, -1, dtype=np.int32)
+            # Reverse so the first row wins for duplicated ids.
+            self.row_by_id[ids[::-1]] = np.arange(len(ids) - 1, -1, -1, dtype=np.int32)
+        else:
+            self._id_map = {}
+            for row, movie_id in enumerate(ids.tolist()):
+                self._id_map.setdefault(movie_id, row)
+
+    def row_for_id(self, movie_id) -> Optional[int]:
+        try:
+            movie_id = int(movie_id)
+        except (TypeError, ValueError):
+            return None
+        if self._id_map is not None:
+            return self._id_map.get(movie_id)
+        if 0 <= movie_id < len(self.row_by_id):  #type:ignore
+            row = int(self.row_by_id[movie_id])  #type:ignore
+            return row if row >= 0 else None
+        return None
+
+    def rows_for_ids(self, movie_ids) -> np.ndarray:
+        """Vectorized ``row_for_id``: rows of the given ids, unknown ids dropped."""
+        ids = np.asarray([i for i in movie_ids if isinstance(i, (int, np.integer))], dtype=np.int64)
+        if self._id_map is not None:
+            rows = [self._id_map.get(i) for i in ids.tolist()]
+            return np.array([r for r in rows if r is not None], dtype=np.int64)
+        ids = ids[(ids >= 0) & (ids < len(self.row_by_id))]  #type:ignore
+        rows = self.row_by_id[ids]  #type:ignore
+        return rows[rows >= 0].astype(np.int64)
+
+    def row_for_title(self, title: str) -> Optional[int]:
+        return self.exact.get(normalize_title(title))
+
+    def find_partial(self, query: str) -> Optional[int]:
+        """First row (lowest index) whose title contains ``query`` at a word start."""
+        query = normalize_title(query)
+        if not query:
+            return None
+        lo = bisect_left(self._suffixes, query)
+        hi = bisect_left(self._suffixes, query + "\uffff", lo)
+        if lo == hi:
+            return None
+        return int(self._suffix_rows[lo:hi].min())
+
+    def resolve(self, title: str) -> Optional[int]:
+        """Exact title match first, then partial match."""
+        row = self.row_for_title(title)
+        return row if row is not None else self.find_partial(title)
@@ -0,0 +1,71 @@
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+
+def _exact_row(row: np.ndarray, k: int) -> np.ndarray:
+    """Exact top-k of one row when ties straddle the k-th position."""
+    kth = np.partition(row, row.shape[0] - k)[row.shape[0] - k]
+    candidates = np.flatnonzero(row >= kth)
+    order = np.argsort(-row[candidates], kind="stable")[:k]
+    return candidates[order]
+
+
+def top_k_block(block: np.ndarray, k: int, exclude: Optional[Sequence[int]] = None) -> np.ndarray:
+    """Top-``k`` column indices of every row of a 2-D score block.
+
+    Each output row is ranked by descending score, ties broken by ascending
+    column index, so results match a full stable descending sort. Selection is
+    ``np.argpartition`` (O(N) per row) followed by a sort of only the selected
+    columns. ``exclude`` optionally gives, per row, one column to leave out
+    (the seed movie itself); it is handled by selecting ``k + 1`` and dropping
+    it, so the block is never copied to be masked.
+    """
+    block = np.asarray(block)
+    n = block.shape[1]
+    extra = 1 if exclude is not None else 0
+    take = min(k + extra, n)
+    if take <= 0:
+        return np.empty((block.shape[0], 0), dtype=np.int64)
+
+    if take < n:
+        part = np.argpartition(block, n - take, axis=1)[:, n - take:]
+    else:
+        part = np.broadcast_to(np.arange(n), (block.shape[0], n)).copy()
+    values = np.take_along_axis(block, part, axis=1)
+    # Sort the selected columns by (-score, column).
+    order = np.lexsort((part, -values), axis=1)
+    ranked = np.take_along_axis(part, order, axis=1)
+
+    if take < n:
+        # argpartition picks arbitrarily among values tied with the last
+        # selected one; redo those (rare) rows exactly.
+        kth = np.take_along_axis(values, order[:, -1:], axis=1)
+        ambiguous = np.flatnonzero(np.count_nonzero(block >= kth, axis=1) > take)
+        for r in ambiguous:
+            ranked[r] = _exact_row(np.asarray(block[r], dtype=np.float64), take)
+
+    if exclude is None:
+        return ranked
+    exclude = np.asarray(exclude).reshape(-1, 1)
+    keep = ranked != exclude
+    # Rows where the excluded column was not selected drop their last entry.
+    keep[keep.all(axis=1), -1] = False
+    return ranked[keep].reshape(block.shape[0], take - 1)
+
+
+def top_k(row: np.ndarray, k: int, exclude: Optional[int] = None) -> np.ndarray:
+    """Top-``k`` indices of a single score row; see ``top_k_block``."""
+    row = np.asarray(row)
+    return top_k_block(row.reshape(1, -1), k, None if exclude is None else [exclude])[0]
+
+
+def top_k_window(row: np.ndarray, start: int, end: int, exclude: Optional[int] = None) -> np.ndarray:
+    """Indices ranked ``[start:end]`` in a descending ranking of ``row``."""
+    return top_k(row, end, exclude)[start:end]
+
+
+def top_k_window_block(block: np.ndarray, start: int, end: int,
+                       exclude: Optional[Union[Sequence[int], np.ndarray]] = None) -> np.ndarray:
+    """Per-row indices ranked ``[start:end]`` for a 2-D block of score rows."""
+    return top_k_block(block, end, exclude)[:, start:end]
@@ -0,0 +1,40 @@
+import secrets
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
+from starlette.concurrency import run_in_threadpool
+from app.config.config import Settings
+from app.recommendation_model import recommand as recommendation_model
+from app.schemas.recommendation_schema import ModelReloadSchema
+
+settings = Settings() # type: ignore
+
+admin_router = APIRouter(prefix="/api/admin", tags=["Admin"])
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Admin endpoints (and /metrics) are disabled unless ADMIN_TOKEN is set, then require it."""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@admin_router.get("/model", dependencies=[Depends(require_admin_token)])
+def model_info():
+    """Active and draining model versions of this worker."""
+    return {**recommendation_model.model_status(), "registry": recommendation_model.registry.stats()}
+
+
+@admin_router.post("/model/reload", dependencies=[Depends(require_admin_token)])
+async def reload_model(req: Optional[ModelReloadSchema] = None):
+    """Load a model version next to the live one, validate it and swap it in.
+
+    Without a version, reloads whatever artifacts/CURRENT points at. Only
+    this worker swaps; the others follow through their CURRENT watcher.
+    """
+    version = req.version if req else None
+    try:
+        result = await run_in_threadpool(recommendation_model.reload_model, version)
+    except Exception as e:
+        raise HTTPException(status_code=409, detail=f"Model reload failed: {e}")
+    return {**result, "registry": recommendation_model.registry.stats()}
@@ -1,33 +1,35 @@
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
 from app.database.database import movie_history
 from app.schemas.history_schema import HistorySchema
 from app.routes.auth_route import get_current_user
-from app.routes.recommendation import fetch_movie_from_tmdb
-import time
-import requests
+from app.routes.recommendation import (
+    fetch_movie_from_tmdb,
+    fetch_multiple_movies,
+    invalidate_user_recommendations,
+    movie_fields
+)
 
 history_router = APIRouter(prefix="/api/user/history", tags=["History"])
 
 
-def safe_fetch_movie(movie_id, retries=3, delay=1):
-    """Fetch movie safely with retry & error handling."""
-    for attempt in range(retries):
-        try:
-            # ✅ Make sure fetch_movie_from_tmdb uses requests.get(..., timeout=10)
-            movie_data = fetch_movie_from_tmdb(movie_id)
-            if movie_data:
-                return movie_data
-        except requests.exceptions.RequestException as e:
-            print(f"⚠️ Attempt {attempt + 1} failed for movie {movie_id}: {e}")
-            time.sleep(delay)
-        except Exception as e:
-            print(f"❌ Unexpected error fetching movie {movie_id}: {e}")
-            return None
-    return None
+def safe_fetch_movie(movie_id):
+    """Fetch movie safely with error handling.
+
+    There is no retry loop here: fetch_movie_from_tmdb already retries in the
+    background, fails fast while the TMDB breaker is open and falls back to
+    stale cached details.
+    """
+    try:
+        return fetch_movie_from_tmdb(movie_id)
+    except Exception as e:
+        print(f"❌ Unexpected error fetching movie {movie_id}: {e}")
+        return None
 
 
 @history_router.get("/")
-def get_history(user=Depends(get_current_user)):
+def get_history(user=Depends(get_current_user), fields: Optional[tuple] = Depends(movie_fields)):
     """Fetch user's movie history with TMDB details (includes unavailable movies)."""
     current_user = movie_history.find_one({"email": user.email})
 
@@ -35,23 +37,14 @@ def get_history(user=Depends(get_current_user)):
         return {"message": "No history found for this user", "movies": []}
 
     movie_ids = current_user["movie_list"]
-    movies = []
-
-    for movie_id in movie_ids:
-        movie_data = safe_fetch_movie(movie_id)
-
-        if movie_data:
-            movies.append(movie_data)
-        else:
-            movies.append({
-                "id": movie_id,
-                "title": "Unavailable",
-                "overview": "Movie data could not be fetched from TMDB.",
-                "poster_path": None,
-                "status": "unavailable"
-            })
+    movies = fetch_multiple_movies(
+        movie_ids,
+        fetch=safe_fetch_movie,
+        unavailable_overview="Movie data could not be fetched from TMDB.",
+        fields=fields
+    )
 
-    return {"user": user.email, "movies": movies}
+    return ORJSONResponse({"user": user.email, "movies": movies})
 
 
 @history_router.post("/")
@@ -65,6 +58,7 @@ def create_history(req: HistorySchema, user=Depends(get_current_user)):
     if not current_user:
         # Create new record for user
         movie_history.insert_one({"email": email, "movie_list": [movie_id]})
+        invalidate_user_recommendations(email)
         return {"message": "Movie added to history."}
 
     # Avoid duplicates
@@ -75,6 +69,7 @@ def create_history(req: HistorySchema, user=Depends(get_current_user)):
         {"email": email},
         {"$push": {"movie_list": movie_id}}
     )
+    invalidate_user_recommendations(email)
 
     return {"message": "Movie added to history."}
 
@@ -96,5 +91,6 @@ def delete_history(movie_id: int, user=Depends(get_current_user)):
         {"email": email},
         {"$pull": {"movie_list": movie_id}}
     )
+    invalidate_user_recommendations(email)
     
     return {"message": "Movie removed from history."}
@@ -1,49 +1,245 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse
+import hashlib
+import math
+import orjson
 import requests
+import threading
 import time
-from typing import List, Optional
-from app.database.database import movie_data
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+from typing import Callable, List, Optional
+from app.database.database import movie_data, movie_history
+from app.database.movie_store import find_movie_details, save_movie_details
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
+from app.recommendation_model import recommand as recommendation_model
+from app.recommendation_model.filter_index import MovieFilter
 from app.recommendation_model.recommand import (
+    browse_movies,
+    browse_options,
+    recommand_batch,
+    recommand_for_history,
     recommand_sample_30,
-    recommand_top_6,
-    recommand_top_7_to_12
+    recommand_similar,
+    search_titles
 )
 from app.config.config import Settings
+from app.schemas.recommendation_schema import BatchRecommendationSchema
+from app.routes.auth_route import get_current_user
+from app.cache.cache import MISSING, TTLCache
+from app.cache.circuit_breaker import CircuitBreaker
+from app.cache.rate_limit import BackoffScheduler, TokenBucket, parse_retry_after
+from app.cache.single_flight import SingleFlight
 
 # Initialize settings
 settings = Settings() # type: ignore
 tmdb_api_key = settings.TMDBAPI_KEY
+tmdb_base_url = settings.TMDB_BASE_URL.rstrip("/")
 
 # Router setup
 recommendation_router = APIRouter(prefix="/api", tags=["Recommendation"])
 
 # Create a persistent session with connection pooling
 session = requests.Session()
+# Only connection failures are retried here, immediately. Status codes come
+# back to _tmdb_request so that a 429 pauses the shared token bucket instead
+# of urllib3 sleeping through Retry-After in the request thread.
 retry_strategy = Retry(
-    total=3,
-    backoff_factor=1,
-    status_forcelist=[429, 500, 502, 503, 504],
-    allowed_methods=["GET"]
+    total=2,
+    read=0,
+    status=0,
+    backoff_factor=0,
+    allowed_methods=["GET"],
+    respect_retry_after_header=False
 )
 adapter = HTTPAdapter(
     max_retries=retry_strategy,
     pool_connections=10,
-    pool_maxsize=20
+    pool_maxsize=max(20, settings.TMDB_MAX_CONCURRENCY)
 )
 session.mount("https://", adapter)
 session.mount("http://", adapter)
 
+# Shared worker pool used to hydrate lists of TMDB ids concurrently. It is
+# process-wide on purpose: the cap bounds the total number of in-flight TMDB
+# calls for this worker, not just the calls made by a single request.
+tmdb_executor = ThreadPoolExecutor(
+    max_workers=max(1, settings.TMDB_MAX_CONCURRENCY),
+    thread_name_prefix="tmdb"
+)
+
+# Per-worker cache of TMDB movie details, keyed by TMDB id. 404s are cached
+# as negative entries so dead ids are not re-requested on every page load.
+# Expired details are kept for TMDB_CACHE_STALE_SECONDS to be served when
+# TMDB cannot be reached.
+movie_cache = TTLCache(
+    max_entries=settings.TMDB_CACHE_MAX_ENTRIES,
+    ttl=settings.TMDB_CACHE_TTL_SECONDS,
+    max_bytes=settings.TMDB_CACHE_MAX_BYTES,
+    negative_ttl=settings.TMDB_CACHE_NEGATIVE_TTL_SECONDS,
+    stale_ttl=settings.TMDB_CACHE_STALE_SECONDS
+)
+
+# Per-user "For You" rankings, keyed by email. Entries hold
+# (model_version, ranked TMDB ids) and are dropped by the history routes
+# whenever the user's movie_list changes.
+USER_RECOMMENDATION_DEPTH = 50
+user_recommendation_cache = TTLCache(
+    max_entries=settings.USER_RECOMMENDATION_CACHE_MAX_ENTRIES,
+    ttl=settings.USER_RECOMMENDATION_CACHE_TTL_SECONDS
+)
+
+
+# Every TMDB call of this worker draws from one token bucket; with
+# TMDB_RATE_LIMIT_FILE set, all workers on the host share it.
+tmdb_limiter = TokenBucket(
+    settings.TMDB_RATE_LIMIT_PER_SECOND,
+    settings.TMDB_RATE_LIMIT_BURST,
+    shared_path=settings.TMDB_RATE_LIMIT_FILE
+)
+
+# Failed movie fetches are retried from here, off the request thread.
+tmdb_retries = BackoffScheduler(tmdb_executor)
+
+def _probe_tmdb() -> bool:
+    """Half-open probe: any answer below 500 means TMDB is back."""
+    response = session.get(f"{tmdb_base_url}/configuration", params={"api_key": tmdb_api_key}, timeout=5)
+    return response.status_code < 500
+
+
+# Once timeouts and 5xx pile up, TMDB calls fail fast (stale cache entries
+# are served instead) until a background probe gets through again.
+tmdb_breaker = CircuitBreaker(
+    _probe_tmdb,
+    failure_ratio=settings.TMDB_BREAKER_FAILURE_RATIO,
+    min_calls=settings.TMDB_BREAKER_MIN_CALLS,
+    window=settings.TMDB_BREAKER_WINDOW_SECONDS,
+    open_seconds=settings.TMDB_BREAKER_OPEN_SECONDS,
+    max_open_seconds=settings.TMDB_BREAKER_MAX_OPEN_SECONDS
+)
+
+# Concurrent requests for the same TMDB resource (one movie's details, a
+# search, a similar list, a discover page) share a single upstream call.
+tmdb_flights = SingleFlight()
+
+
+# Whole /top-rated and /search responses as (etag, encoded body), keyed by
+# their normalised parameters. TTLs are set per endpoint.
+response_cache = TTLCache(
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    ttl=settings.TOP_RATED_CACHE_TTL_SECONDS,
+    max_bytes=settings.RESPONSE_CACHE_MAX_BYTES,
+    sizeof=lambda entry: len(entry[1])
+)
+
+
+def invalidate_user_recommendations(email: str) -> None:
+    user_recommendation_cache.pop(email)
+
+
+class TMDBThrottled(requests.exceptions.RequestException):
+    """The outbound rate limit has no token free for this call right now."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"TMDB rate limit: next slot in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class TMDBUnavailable(requests.exceptions.RequestException):
+    """The TMDB circuit breaker is open; the call was not attempted."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"TMDB circuit breaker is open: next probe in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+# How long the current thread may wait for a rate-limit token: 0 on request
+# threads, TMDB_RATE_LIMIT_WORKER_WAIT_SECONDS inside hydration workers.
+_token_wait = threading.local()
+
+# Set by fetch_multiple_movies on the calling thread when it had to serve a
+# stale copy or a placeholder; _cache_response keeps such payloads briefly.
+_degraded = threading.local()
+
+
+def _tmdb_request(url: str, params: Optional[dict] = None) -> requests.Response:
+    """GET a TMDB url once a rate-limit token is available.
+
+    Raises ``TMDBUnavailable`` while ``tmdb_breaker`` is open and
+    ``TMDBThrottled`` when no token is free in time: request threads never
+    wait for one, hydration workers (see ``_fetch_concurrently``) up to
+    TMDB_RATE_LIMIT_WORKER_WAIT_SECONDS. A 429 (or a 503 with Retry-After) pauses the bucket for every
+    caller. Timeouts, connection errors and 5xx responses count as breaker
+    failures.
+    """
+    if not tmdb_breaker.allow():
+        raise TMDBUnavailable(tmdb_breaker.stats()["next_probe_in_seconds"] or 0.0)
+    granted, wait = tmdb_limiter.acquire(getattr(_token_wait, "seconds", 0.0))
+    if not granted:
+        raise TMDBThrottled(wait)
+    try:
+        response = session.get(url, params=params, timeout=10)
+    except requests.exceptions.RequestException as exc:
+        tmdb_breaker.record(False, type(exc).__name__)
+        raise
+    if response.status_code >= 500:
+        tmdb_breaker.record(False, f"HTTP {response.status_code}")
+    elif response.status_code != 429:
+        tmdb_breaker.record(True)
+    if response.status_code in (429, 503):
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is None and response.status_code == 429:
+            retry_after = 1.0
+        if retry_after:
+            retry_after = min(retry_after, settings.TMDB_RETRY_AFTER_MAX_SECONDS)
+            print(f"[TMDB] {response.status_code} from TMDB, pausing outbound calls for {retry_after:.1f}s")
+            tmdb_limiter.pause(retry_after)
+    return response
+
+
+def _retry_later_response(exc) -> HTTPException:
+    """503 for a request TMDB cannot serve right now: no rate-limit token
+    (``TMDBThrottled``) or an open breaker (``TMDBUnavailable``)."""
+    if isinstance(exc, TMDBUnavailable):
+        detail = "TMDB is unavailable, try again shortly"
+    else:
+        detail = "TMDB rate limit reached, try again shortly"
+    return HTTPException(status_code=503, detail=detail,
+                         headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))})
+
+
+def _tmdb_get(url: str, params: dict):
+    """GET a TMDB endpoint, coalesced with identical in-flight calls.
+
+    Returns ``(status_code, body)`` where ``body`` is the decoded JSON on a
+    200 and ``None`` otherwise. The body may be shared with other callers,
+    so treat it as read-only. Request exceptions propagate to every caller.
+    """
+    key = (url, tuple(sorted((k, str(v)) for k, v in params.items() if k != "api_key")))
+
+    def call():
+        response = _tmdb_request(url, params)
+        return response.status_code, response.json() if response.status_code == 200 else None
+
+    return tmdb_flights.do(key, call)
+
+
 def _tmdb_search_movie_id_by_name(name: str) -> Optional[int]:
     """Find a TMDB movie ID for a given title using the Search API.
 
-    Returns the most popular match or None if not found / API failure.
+    The local title search index is tried first; TMDB is only queried when
+    it has no good hit. Returns the best (TMDB: most popular) match or None
+    if not found / API failure.
     """
     if not name or not name.strip():
         return None
 
-    search_url = "https://api.themoviedb.org/3/search/movie"
+    local_hits = search_titles(name, limit=1)
+    if local_hits:
+        return local_hits[0][0]
+
+    search_url = f"{tmdb_base_url}/search/movie"
     params = {
         "api_key": tmdb_api_key,
         "query": name.strip(),
@@ -52,17 +248,15 @@ def _tmdb_search_movie_id_by_name(name: str) -> Optional[int]:
         "language": "en-US",
     }
     try:
-        resp = session.get(search_url, params=params, timeout=10)
-        if resp.status_code != 200:
-            print(f"[TMDB] search_movie_id_by_name error {resp.status_code} for {name}")
+        status_code, data = _tmdb_get(search_url, params)
+        if status_code != 200:
+            print(f"[TMDB] search_movie_id_by_name error {status_code} for {name}")
             return None
-        data = resp.json()
         results = data.get("results", [])
         if not results:
             return None
         # Choose the most popular result as the best match
-        results.sort(key=lambda x: x.get("popularity", 0), reverse=True)
-        return results[0].get("id")
+        return max(results, key=lambda x: x.get("popularity", 0)).get("id")
     except requests.exceptions.RequestException as exc:
         print(f"[TMDB] search_movie_id_by_name request failed for {name}: {exc}")
         return None
@@ -82,18 +276,17 @@ def _tmdb_similar_movies_by_name(name: str, start: int, end: int) -> List[dict]:
     if not movie_id:
         return []
 
-    similar_url = f"https://api.themoviedb.org/3/movie/{movie_id}/similar"
+    similar_url = f"{tmdb_base_url}/movie/{movie_id}/similar"
     params = {
         "api_key": tmdb_api_key,
         "page": 1,
         "language": "en-US",
     }
     try:
-        resp = session.get(similar_url, params=params, timeout=10)
-        if resp.status_code != 200:
-            print(f"[TMDB] similar_movies error {resp.status_code} for id={movie_id} ({name})")
+        status_code, data = _tmdb_get(similar_url, params)
+        if status_code != 200:
+            print(f"[TMDB] similar_movies error {status_code} for id={movie_id} ({name})")
             return []
-        data = resp.json()
         results = data.get("results", [])
         return results[start:end]
     except requests.exceptions.RequestException as exc:
@@ -105,160 +298,543 @@ def _tmdb_similar_movies_by_name(name: str, start: int, end: int) -> List[dict]:
 
 
 # Helper function with improved error handling
-def fetch_movie_from_tmdb(movie_id: int, retries: int = 3, delay: float = 0.5):
+def fetch_movie_from_tmdb(movie_id: int, retries: int = 3, delay: float = 0.5, use_cache: bool = True):
     """
-    Fetch movie details from TMDB API with retry logic and exponential backoff.
-    
+    Fetch movie details from TMDB API.
+
     Args:
         movie_id: TMDB movie ID
-        retries: Number of retry attempts
-        delay: Initial delay between retries (exponential backoff applied)
-    
+        retries: Number of attempts in total
+        delay: Delay before the first retry (exponential backoff applied)
+        use_cache: Serve from ``movie_cache`` when possible
+
     Returns:
         Movie data dict or None if failed
+
+    Only one attempt runs in the calling thread. When it fails with a
+    retryable error, None is returned at once and the remaining attempts run
+    in the background after their backoff (or the server's Retry-After), so
+    a later request finds the movie in the cache. While such a retry is
+    pending, the id is not requested again.
+
+    Anything returned that was not already in ``movie_cache`` came from
+    TMDB itself, so it is safe to write back to the store; the stale-cache
+    fallback for outages lives in ``fetch_multiple_movies``.
+
+    Successful responses and 404s are always written back to ``movie_cache``.
+    Concurrent misses for the same id wait for a single TMDB fetch.
     """
-    tmdb_url = f"https://api.themoviedb.org/3/movie/{movie_id}?api_key={tmdb_api_key}"
-    
-    for attempt in range(retries):
-        try:
-            response = session.get(tmdb_url, timeout=10)
-            if response.status_code == 200:
-                return response.json()
-            elif response.status_code == 404:
-                print(f"Movie {movie_id} not found in TMDB (404)")
-                return None
-            else:
-                print(f"TMDB responded with {response.status_code} for movie {movie_id}")
-                if attempt < retries - 1:
-                    time.sleep(delay * (2 ** attempt))  # Exponential backoff
-        except requests.exceptions.Timeout:
-            print(f"Timeout on attempt {attempt+1} for movie {movie_id}")
-            if attempt < retries - 1:
-                time.sleep(delay * (2 ** attempt))
-        except requests.exceptions.ConnectionError as e:
-            print(f"Connection error on attempt {attempt+1} for movie {movie_id}: {e}")
-            if attempt < retries - 1:
-                time.sleep(delay * (2 ** attempt))
-        except requests.exceptions.RequestException as e:
-            print(f"Request failed on attempt {attempt+1} for movie {movie_id}: {e}")
-            if attempt < retries - 1:
-                time.sleep(delay * (2 ** attempt))
-    
-    print(f"Failed to fetch movie {movie_id} after {retries} retries.")
+    if use_cache:
+        cached = movie_cache.get(movie_id)
+        if cached is not MISSING:
+            return cached
+
+    key = ("movie", movie_id)
+    if tmdb_retries.pending(key):
+        return None
+    return tmdb_flights.do(key, lambda: _fetch_movie_attempt(movie_id, 0, retries, delay))
+
+
+def _fetch_movie_attempt(movie_id: int, attempt: int, retries: int, delay: float):
+    """One TMDB attempt; a retryable failure schedules the next one and returns None."""
+    retry_after = None
+    try:
+        response = _tmdb_request(f"{tmdb_base_url}/movie/{movie_id}", {"api_key": tmdb_api_key})
+        if response.status_code == 200:
+            movie = response.json()
+            movie_cache.set(movie_id, movie)
+            return movie
+        elif response.status_code == 404:
+            print(f"Movie {movie_id} not found in TMDB (404)")
+            movie_cache.set_negative(movie_id)
+            return None
+        print(f"TMDB responded with {response.status_code} for movie {movie_id}")
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+    except TMDBUnavailable:
+        # The breaker's probe finds out when TMDB is back; no retry needed.
+        return None
+    except TMDBThrottled as e:
+        print(f"Rate limited on attempt {attempt+1} for movie {movie_id}: {e}")
+        retry_after = e.retry_after
+    except requests.exceptions.Timeout:
+        print(f"Timeout on attempt {attempt+1} for movie {movie_id}")
+    except requests.exceptions.ConnectionError as e:
+        print(f"Connection error on attempt {attempt+1} for movie {movie_id}: {e}")
+    except requests.exceptions.RequestException as e:
+        print(f"Request failed on attempt {attempt+1} for movie {movie_id}: {e}")
+
+    if attempt < retries - 1:
+        backoff = max(delay * (2 ** attempt), min(retry_after or 0.0, settings.TMDB_RETRY_AFTER_MAX_SECONDS))
+        tmdb_retries.schedule(
+            ("movie", movie_id), backoff,
+            lambda: _fetch_movie_attempt(movie_id, attempt + 1, retries, delay)
+        )
+    else:
+        print(f"Failed to fetch movie {movie_id} after {retries} attempts.")
     return None
 
 
-def fetch_multiple_movies(movie_ids: list, rate_limit_delay: float = 0.1):
-    movie_details = []
-    
-    for i, movie_id in enumerate(movie_ids):
-        # Add delay between requests (except for the first one)
-        if i > 0:
-            time.sleep(rate_limit_delay)
-        
-        movie_data = fetch_movie_from_tmdb(movie_id)
-        
-        if movie_data:
-            movie_details.append(movie_data)
+def unavailable_movie(movie_id, overview: str = "Could not fetch movie details from TMDB."):
+    """Placeholder returned in place of a movie whose details could not be fetched."""
+    return {
+        "id": movie_id,
+        "title": "Unavailable",
+        "overview": overview,
+        "poster_path": None,
+        "status": "unavailable"
+    }
+
+
+# ``fields=`` presets. "card" is what the movie cards render; "status" marks
+# the "Unavailable" placeholders and TMDB list results (search, discover,
+# similar) carry genre_ids instead of genres.
+FIELD_PRESETS = {
+    "card": ("id", "title", "poster_path", "vote_average", "genres", "genre_ids", "overview", "status"),
+}
+
+
+def parse_fields(fields: Optional[str]) -> Optional[tuple]:
+    """Field names selected by a ``fields=`` value (presets expanded, ``id``
+    always included), or None for the full TMDB JSON."""
+    if not fields or fields.strip() in ("full", "*"):
+        return None
+    names = ["id"]
+    for name in fields.split(","):
+        name = name.strip()
+        if name:
+            names.extend(FIELD_PRESETS.get(name, (name,)))
+    return tuple(dict.fromkeys(names))
+
+
+def project_movie(movie: dict, fields: Optional[tuple]) -> dict:
+    if fields is None:
+        return movie
+    return {name: movie[name] for name in fields if name in movie}
+
+
+def movie_fields(
+    fields: Optional[str] = Query(None, description='comma separated movie fields, or "card"; default: all'),
+) -> Optional[tuple]:
+    """Optional projection of the movie dicts, shared by the movie list routes."""
+    return parse_fields(fields)
+
+
+def _fetch_concurrently(movie_ids: list, fetch: Callable[[int], Optional[dict]], limit: int) -> dict:
+    """Run ``fetch`` for each id on ``tmdb_executor``, at most ``limit`` at a time.
+
+    Returns a dict mapping each id to its result (None on failure).
+    """
+    def _safe_fetch(movie_id):
+        # Off the request thread, so a page larger than the token burst
+        # waits a little for tokens instead of showing placeholders.
+        _token_wait.seconds = settings.TMDB_RATE_LIMIT_WORKER_WAIT_SECONDS
+        try:
+            return fetch(movie_id)
+        except Exception as exc:
+            print(f"Unexpected error fetching movie {movie_id}: {exc}")
+            return None
+        finally:
+            _token_wait.seconds = 0.0
+
+    results = {}
+    queue = iter(movie_ids)
+    pending = {}
+
+    def _submit_next():
+        movie_id = next(queue, MISSING)
+        if movie_id is not MISSING:
+            pending[tmdb_executor.submit(_safe_fetch, movie_id)] = movie_id
+
+    # Sliding window: keep at most `limit` ids of this request in flight so one
+    # large page cannot monopolise the shared pool.
+    for _ in range(limit):
+        _submit_next()
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            results[pending.pop(future)] = future.result()
+            _submit_next()
+    return results
+
+
+# After a store failure, skip the store until this monotonic time so an
+# unreachable Mongo does not add its server selection timeout to every page.
+_store_retry_at = 0.0
+
+
+def _store_available() -> bool:
+    return settings.MOVIE_STORE_ENABLED and time.monotonic() >= _store_retry_at
+
+
+def _store_failed(exc: Exception) -> None:
+    global _store_retry_at
+    print(f"[STORE] movie details store unavailable: {exc}")
+    _store_retry_at = time.monotonic() + 60
+
+
+def _load_from_store(movie_ids: list) -> None:
+    """Warm ``movie_cache`` from the Mongo metadata store with one ``$in`` query.
+
+    Stale documents are still served and refreshed from TMDB in the background.
+    """
+    if not movie_ids or not _store_available():
+        return
+    try:
+        stored, stale = find_movie_details(
+            movie_ids, timedelta(seconds=settings.MOVIE_STORE_MAX_AGE_SECONDS)
+        )
+    except Exception as exc:
+        _store_failed(exc)
+        return
+    for movie_id, movie in stored.items():
+        movie_cache.set(movie_id, movie)
+    if stale:
+        tmdb_executor.submit(_refresh_stored_movies, stale)
+
+
+def _save_to_store(movies: list) -> None:
+    if not movies or not _store_available():
+        return
+    try:
+        save_movie_details(movies)
+    except Exception as exc:
+        _store_failed(exc)
+
+
+def _refresh_stored_movies(movie_ids: list) -> None:
+    """Background refresh of stale stored details, bypassing the cache.
+
+    Ids TMDB does not answer for stay stale in the store (and are retried on
+    a later load); their outdated copy must not be saved back as fresh.
+    """
+    movies = [fetch_movie_from_tmdb(movie_id, use_cache=False) for movie_id in movie_ids]
+    _save_to_store([movie for movie in movies if movie])
+
+
+def fetch_multiple_movies(
+    movie_ids: list,
+    fetch: Callable[[int], Optional[dict]] = fetch_movie_from_tmdb,
+    unavailable_overview: str = "Could not fetch movie details from TMDB.",
+    max_concurrency: Optional[int] = None,
+    fields: Optional[tuple] = None,
+):
+    """Hydrate a list of TMDB ids into movie dicts.
+
+    Lookups go through three tiers: the in-process ``movie_cache``, then the
+    Mongo metadata store (one bulk ``$in`` query for all cache misses), then
+    TMDB itself. The per-id ``fetch`` calls for ids found in neither are
+    fanned out over the shared ``tmdb_executor`` (at most ``max_concurrency``
+    of them in flight for this call) and written back to the store in a
+    single ``bulk_write`` (only onto movies the catalogue already has). The result keeps the order of ``movie_ids`` and has
+    one entry per id; ids that could not be fetched are served from an
+    expired ``movie_cache`` entry when there is one, else get an
+    "Unavailable" placeholder. With ``fields`` (see ``parse_fields``) only those keys are
+    returned; the caches always hold the full details.
+    """
+    if not movie_ids:
+        return []
+
+    unique_ids = list(dict.fromkeys(movie_ids))
+    _load_from_store([movie_id for movie_id in unique_ids if movie_id not in movie_cache])
+
+    results = {}
+    remote_ids = []
+    for movie_id in unique_ids:
+        if movie_id in movie_cache:
+            results[movie_id] = fetch(movie_id)
         else:
-            # Placeholder for missing movies
-            movie_details.append({
-                "id": movie_id,
-                "title": "Unavailable",
-                "overview": "Could not fetch movie details from TMDB.",
-                "poster_path": None,
-                "status": "unavailable"
-            })
-    
-    return movie_details
+            remote_ids.append(movie_id)
+
+    if remote_ids:
+        limit = settings.TMDB_MAX_CONCURRENCY if max_concurrency is None else max_concurrency
+        limit = max(1, min(limit, len(remote_ids)))
+        fetched = _fetch_concurrently(remote_ids, fetch, limit)
+        _save_to_store([movie for movie in fetched.values() if movie])
+        for movie_id, movie in fetched.items():
+            if movie is None and movie_id not in movie_cache:
+                # TMDB failed or the breaker is open (a 404 is cached as a
+                # negative entry): an expired copy beats an "Unavailable"
+                # card. It is served only, never written back.
+                _degraded.served = True
+                stale, _ = movie_cache.get_stale(movie_id)
+                if stale is not MISSING:
+                    fetched[movie_id] = stale
+        results.update(fetched)
+
+    movies = {
+        movie_id: project_movie(results.get(movie_id) or unavailable_movie(movie_id, unavailable_overview), fields)
+        for movie_id in unique_ids
+    }
+    return [movies[movie_id] for movie_id in movie_ids]
 
 
 #  Cold start route (random 30 movies)
 @recommendation_router.get("/cold-sample")
-def get_random_sample():
-    """Get 30 random movie recommendations for cold start."""
+def get_random_sample(seed: Optional[str] = None, fields: Optional[tuple] = Depends(movie_fields)):
+    """Get random movie recommendations for cold start.
+
+    Pass the same ``seed`` (e.g. from the home and genres pages) to get the
+    same sample until the cold-start pool is refreshed.
+    """
     try:
-        movie_ids = recommand_sample_30()
-        movie_details = fetch_multiple_movies(movie_ids, rate_limit_delay=0.15)
+        movie_ids = recommand_sample_30(seed)
+        movie_details = fetch_multiple_movies(movie_ids, fields=fields)
         
         if not movie_details:
             raise HTTPException(status_code=404, detail="No movies found in TMDB response")
         
-        return {"movies": movie_details}
+        return ORJSONResponse({"movies": movie_details})
     except Exception as e:
         print(f"Error in get_random_sample: {e}")
         raise HTTPException(status_code=500, detail="Internal server error while fetching recommendations")
 
 
-# Top 6 similar movies
-@recommendation_router.get("/top_6")
-def get_top_6(name: str):
-    """Get top 6 similar movies based on movie name."""
+def movie_filter(
+    genre: Optional[str] = Query(None, description="genre name or TMDB genre id; comma separated for several"),
+    year_from: Optional[int] = Query(None, ge=1800, le=3000),
+    year_to: Optional[int] = Query(None, ge=1800, le=3000),
+    lang: Optional[str] = Query(None, min_length=2, max_length=3, description="ISO 639-1 original language"),
+) -> Optional[MovieFilter]:
+    """Optional genre/year/language filter shared by the browse and similarity routes."""
+    return MovieFilter.parse(genre, year_from, year_to, lang)
+
+
+def _similar_movies(name: str, offset: int, limit: int, label: str, filters: Optional[MovieFilter] = None,
+                    fields: Optional[tuple] = None):
+    """Hydrated movies ranked [offset:offset + limit] by similarity to ``name``.
+
+    Falls back to the TMDB "similar" API when the local model cannot answer
+    (unfiltered requests only: TMDB cannot apply the filters).
+    """
     try:
-        movie_list = recommand_top_6(name)  
-        
+        try:
+            movie_list = recommand_similar(name, offset, limit, filters)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        if isinstance(movie_list, dict) and "error" in movie_list and filters is not None:
+            raise HTTPException(status_code=404, detail=movie_list["error"])
         # If the local recommendation model returns an error, fall back to TMDB
         # "similar" API so the endpoint still works.
         if isinstance(movie_list, dict) and "error" in movie_list:
-            print(f"[RECO] top_6 model error for '{name}': {movie_list['error']}. Falling back to TMDB similar API.")
-            fallback_movies = _tmdb_similar_movies_by_name(name, 0, 6)
+            print(f"[RECO] {label} model error for '{name}': {movie_list['error']}. Falling back to TMDB similar API.")
+            fallback_movies = _tmdb_similar_movies_by_name(name, offset, offset + limit)
             if not fallback_movies:
                 raise HTTPException(status_code=404, detail=movie_list["error"])
-            return {"movies": fallback_movies}
+            return {"movies": [project_movie(movie, fields) for movie in fallback_movies]}
         
-        movie_details = fetch_multiple_movies(movie_list, rate_limit_delay=0.1)#type:ignore
+        movie_details = fetch_multiple_movies(movie_list, fields=fields)#type:ignore
         
+        if not movie_details and filters is not None:
+            return {"movies": []}
         if not movie_details:
             # As a secondary fallback, try TMDB similar
-            fallback_movies = _tmdb_similar_movies_by_name(name, 0, 6)
+            fallback_movies = _tmdb_similar_movies_by_name(name, offset, offset + limit)
             if not fallback_movies:
                 raise HTTPException(status_code=404, detail="No recommended movies found")
-            return {"movies": fallback_movies}
+            return {"movies": [project_movie(movie, fields) for movie in fallback_movies]}
         
         return {"movies": movie_details}
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error in get_top_6: {e}")
+        print(f"Error in {label}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error while fetching recommendations")
 
 
+# Similar movies, paginated
+@recommendation_router.get("/similar")
+def get_similar(name: str, offset: int = Query(0, ge=0), limit: int = Query(6, ge=1, le=50),
+                filters: Optional[MovieFilter] = Depends(movie_filter),
+                fields: Optional[tuple] = Depends(movie_fields)):
+    """Get movies ranked [offset, offset + limit) in similarity to a movie name."""
+    result = _similar_movies(name, offset, limit, "similar", filters, fields)
+    return ORJSONResponse({**result, "offset": offset, "limit": limit})
+
+
+# Top 6 similar movies
+@recommendation_router.get("/top_6")
+def get_top_6(name: str, filters: Optional[MovieFilter] = Depends(movie_filter),
+              fields: Optional[tuple] = Depends(movie_fields)):
+    """Get top 6 similar movies based on movie name."""
+    return ORJSONResponse(_similar_movies(name, 0, 6, "top_6", filters, fields))
+
+
 # 🎥 Movies ranked 7–12
 @recommendation_router.get("/top_6_to_12")
-def get_top_6_to_12(name: str):
+def get_top_6_to_12(name: str, filters: Optional[MovieFilter] = Depends(movie_filter),
+                    fields: Optional[tuple] = Depends(movie_fields)):
     """Get movies ranked 7-12 in similarity based on movie name."""
+    return ORJSONResponse(_similar_movies(name, 6, 6, "top_6_to_12", filters, fields))
+
+# Several seeds in one call
+@recommendation_router.post("/recommend/batch")
+def recommend_batch(req: BatchRecommendationSchema, fields: Optional[tuple] = Depends(movie_fields)):
+    """Per-seed and blended recommendations for a list of weighted seeds.
+
+    Seeds are titles or TMDB ids. Every recommended id across all lists is
+    hydrated in a single ``fetch_multiple_movies`` call.
+    """
     try:
-        movie_list = recommand_top_7_to_12(name)
-        
-        # "similar" API so the endpoint still works.
-        if isinstance(movie_list, dict) and "error" in movie_list:
-            print(f"[RECO] top_6_to_12 model error for '{name}': {movie_list['error']}. Falling back to TMDB similar API.")
-            fallback_movies = _tmdb_similar_movies_by_name(name, 6, 12)
-            if not fallback_movies:
-                raise HTTPException(status_code=404, detail=movie_list["error"])
-            return {"movies": fallback_movies}
-        
-        movie_details = fetch_multiple_movies(movie_list, rate_limit_delay=0.1)#type:ignore
-        
-        if not movie_details:
-            # As a secondary fallback, try TMDB similar
-            fallback_movies = _tmdb_similar_movies_by_name(name, 6, 12)
-            if not fallback_movies:
-                raise HTTPException(status_code=404, detail="No recommended movies found")
-            return {"movies": fallback_movies}
-        
-        return {"movies": movie_details}
+        try:
+            result = recommand_batch(
+                [(seed.title, seed.tmdb_id, seed.weight) for seed in req.seeds],
+                limit=req.limit,
+                filters=MovieFilter.parse(req.genre, req.year_from, req.year_to, req.lang)
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if "error" in result:
+            raise HTTPException(status_code=503, detail=result["error"])
+
+        all_ids = [movie_id for seed in result["seeds"] for movie_id in seed.get("movies", [])]
+        all_ids += result["blended"]
+        details = {
+            movie["id"]: movie
+            for movie in fetch_multiple_movies(list(dict.fromkeys(all_ids)), fields=fields)
+        }
+
+        seeds = []
+        for request_seed, seed in zip(req.seeds, result["seeds"]):
+            entry = request_seed.model_dump()
+            if "error" in seed:
+                entry["error"] = seed["error"]
+            else:
+                entry["tmdb_id"] = seed["tmdb_id"]
+                entry["movies"] = [details[movie_id] for movie_id in seed["movies"]]
+            seeds.append(entry)
+        return ORJSONResponse({
+            "seeds": seeds,
+            "blended": [details[movie_id] for movie_id in result["blended"]]
+        })
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error in get_top_6_to_12: {e}")
+        print(f"Error in recommend_batch: {e}")
         raise HTTPException(status_code=500, detail="Internal server error while fetching recommendations")
 
-@recommendation_router.get("/top-rated")
-def top_rated(min_rating: float = 7.0, min_votes: int = 1000, page: int = 1):
-    """Get top-rated movies from TMDB using the Discover API."""
+
+# Catalogue browsing by genre / year / language
+@recommendation_router.get("/browse")
+def browse(offset: int = Query(0, ge=0), limit: int = Query(24, ge=1, le=100),
+           filters: Optional[MovieFilter] = Depends(movie_filter), fields: Optional[tuple] = Depends(movie_fields)):
+    """Movies matching the filters, most popular first, with the total match count."""
+    try:
+        try:
+            result = browse_movies(filters, offset, limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if "error" in result:
+            raise HTTPException(status_code=503, detail=result["error"])
+        return ORJSONResponse({
+            "movies": fetch_multiple_movies(result["movies"], fields=fields),
+            "total": result["total"],
+            "offset": offset,
+            "limit": limit
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in browse: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error while browsing movies")
+
+
+@recommendation_router.get("/browse/filters")
+def browse_filters():
+    """Genres (with counts), languages and the year range that /browse can filter on."""
+    result = browse_options()
+    if "error" in result:
+        raise HTTPException(status_code=503, detail=result["error"])
+    return result
+
+
+# Personalized feed from the user's watch history
+@recommendation_router.get("/user/recommendations")
+def user_recommendations(limit: int = Query(12, ge=1, le=USER_RECOMMENDATION_DEPTH), user=Depends(get_current_user),
+                         fields: Optional[tuple] = Depends(movie_fields)):
+    """Recommendations computed from the current user's movie history.
+
+    Falls back to the cold-start sample when the user has no history the
+    model knows about.
+    """
+    try:
+        cached = user_recommendation_cache.get(user.email)
+        if cached is not MISSING and cached[0] == recommendation_model.active_version():
+            ranked = cached[1]
+        else:
+            current_user = movie_history.find_one({"email": user.email})
+            history_ids = (current_user or {}).get("movie_list", [])
+            ranked = recommand_for_history(history_ids, USER_RECOMMENDATION_DEPTH) if history_ids else None
+            if isinstance(ranked, dict):
+                print(f"[RECO] user recommendations for {user.email}: {ranked['error']}")
+                ranked = None
+            if ranked is not None:
+                user_recommendation_cache.set(user.email, (recommendation_model.active_version(), ranked))
+
+        if not ranked:
+            movies, source = fetch_multiple_movies(recommand_sample_30(user.email)[:limit], fields=fields), "cold-start"
+        else:
+            movies, source = fetch_multiple_movies(ranked[:limit], fields=fields), "history"
+        return ORJSONResponse({"movies": movies, "source": source})
+    except Exception as e:
+        print(f"Error in user_recommendations: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error while fetching recommendations")
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def _cache_response(key: tuple, ttl: float, build: Callable[[], dict]):
+    """Build, encode and cache a response as (etag, body, max_age).
+
+    Payloads holding stale copies or placeholders are only kept for
+    DEGRADED_RESPONSE_CACHE_TTL_SECONDS, so they heal once TMDB is back.
+    """
+    _degraded.served = False
     try:
-        discover_url = "https://api.themoviedb.org/3/discover/movie"
+        body = orjson.dumps(build())
+        if _degraded.served:
+            ttl = min(ttl, settings.DEGRADED_RESPONSE_CACHE_TTL_SECONDS)
+            print(f"[CACHE] degraded response for {key[0]} cached for {ttl:.0f}s")
+    finally:
+        _degraded.served = False
+    entry = (f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"', body, ttl)
+    response_cache.set(key, entry, ttl=ttl)
+    return entry
+
+
+def _cached_response(request: Request, key: tuple, ttl: float, build: Callable[[], dict]) -> Response:
+    """Serve ``build()`` through ``response_cache`` as a conditional GET.
+
+    Concurrent misses for a key share one ``build``; errors it raises are
+    not cached. Responses carry an ``ETag`` and ``Cache-Control`` so browsers
+    and the CDN revalidate, and a matching ``If-None-Match`` gets a 304.
+    """
+    entry = response_cache.get(key)
+    if entry is MISSING:
+        entry = tmdb_flights.do(("response",) + key, lambda: _cache_response(key, ttl, build))
+    etag, body, max_age = entry
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={int(max_age)}"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+TOP_RATED_MIN_RATING = 7.0
+TOP_RATED_MIN_VOTES = 1000
+
+
+def _top_rated_key(min_rating: float, min_votes: int, page: int, fields: Optional[tuple] = None) -> tuple:
+    return ("top-rated", float(min_rating), int(min_votes), int(page), fields)
+
+
+def _top_rated_payload(min_rating: float, min_votes: int, page: int, fields: Optional[tuple] = None) -> dict:
+    try:
+        discover_url = f"{tmdb_base_url}/discover/movie"
         params = {
             "api_key": tmdb_api_key,
             "sort_by": "vote_average.desc",
@@ -269,14 +845,17 @@ def top_rated(min_rating: float = 7.0, min_votes: int = 1000, page: int = 1):
             "language": "en-US",
             "page": page
         }
-        response = session.get(discover_url, params=params, timeout=10)
-        if response.status_code == 200:
-            data = response.json()
+        status_code, data = _tmdb_get(discover_url, params)
+        if status_code == 200:
             movies = data.get("results", [])
-            return {"movies": movies}
+            return {"movies": [project_movie(movie, fields) for movie in movies]}
         else:
-            print(f"TMDB Discover error: {response.status_code}")
-            raise HTTPException(status_code=response.status_code, detail="TMDB API error")
+            print(f"TMDB Discover error: {status_code}")
+            raise HTTPException(status_code=status_code, detail="TMDB API error")
+    except HTTPException:
+        raise
+    except (TMDBThrottled, TMDBUnavailable) as e:
+        raise _retry_later_response(e)
     except requests.exceptions.RequestException as e:
         print(f"Top-rated request error: {e}")
         raise HTTPException(status_code=500, detail="Top-rated request failed")
@@ -284,14 +863,69 @@ def top_rated(min_rating: float = 7.0, min_votes: int = 1000, page: int = 1):
         print(f"Unexpected top-rated error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error while fetching top-rated")
 
+
+def prewarm_top_rated(pages: int) -> None:
+    """Fill ``response_cache`` with the first ``pages`` default /top-rated
+    pages, in full and as cards."""
+    for page in range(1, pages + 1):
+        try:
+            payload = _top_rated_payload(TOP_RATED_MIN_RATING, TOP_RATED_MIN_VOTES, page)
+        except HTTPException as exc:
+            print(f"[CACHE] prewarming top-rated page {page} failed: {exc.detail}")
+            return
+        for fields in (None, parse_fields("card")):
+            _cache_response(
+                _top_rated_key(TOP_RATED_MIN_RATING, TOP_RATED_MIN_VOTES, page, fields),
+                settings.TOP_RATED_CACHE_TTL_SECONDS,
+                lambda: {"movies": [project_movie(movie, fields) for movie in payload["movies"]]}
+            )
+    print(f"[CACHE] prewarmed {pages} top-rated pages")
+
+
+@recommendation_router.get("/top-rated")
+def top_rated(request: Request, min_rating: float = TOP_RATED_MIN_RATING, min_votes: int = TOP_RATED_MIN_VOTES,
+              page: int = 1, fields: Optional[tuple] = Depends(movie_fields)):
+    """Get top-rated movies from TMDB using the Discover API (cached per page)."""
+    return _cached_response(
+        request, _top_rated_key(min_rating, min_votes, page, fields), settings.TOP_RATED_CACHE_TTL_SECONDS,
+        lambda: _top_rated_payload(min_rating, min_votes, page, fields)
+    )
+
 @recommendation_router.get("/search")
-def search_movies(query: str):
-    """Search movies by title using TMDB API."""
+def search_movies(request: Request, query: str, limit: int = 20, fields: Optional[tuple] = Depends(movie_fields)):
+    """Search movies by title.
+
+    The local trigram index over the model catalogue answers first; the TMDB
+    search API is only consulted when it has no good hit. Responses are
+    cached per case- and whitespace-normalised query (which is the ``query``
+    echoed back) and limit.
+    """
+    if not query or len(query.strip()) < 2:
+        raise HTTPException(status_code=400, detail="Search query must be at least 2 characters")
+    query = " ".join(query.split()).casefold()
+    limit = max(1, min(limit, 50))
+    return _cached_response(
+        request, ("search", query, limit, fields), settings.SEARCH_CACHE_TTL_SECONDS,
+        lambda: _search_payload(query, limit, fields)
+    )
+
+
+def _search_payload(query: str, limit: int, fields: Optional[tuple] = None) -> dict:
     try:
-        if not query or len(query.strip()) < 2:
-            raise HTTPException(status_code=400, detail="Search query must be at least 2 characters")
+        local_hits = search_titles(query, limit=limit)
+        if local_hits:
+            # Placeholders are dropped before projecting: ``fields`` may leave out "status".
+            movies = fetch_multiple_movies([movie_id for movie_id, _ in local_hits])
+            movies = [project_movie(movie, fields) for movie in movies if movie.get("status") != "unavailable"]
+            if movies:
+                return {
+                    "movies": movies,
+                    "total_results": len(movies),
+                    "query": query,
+                    "source": "local"
+                }
         
-        search_url = f"https://api.themoviedb.org/3/search/movie"
+        search_url = f"{tmdb_base_url}/search/movie"
         params = {
             'api_key': tmdb_api_key,
             'query': query.strip(),
@@ -299,25 +933,29 @@ def search_movies(query: str):
             'include_adult': False
         }
         
-        response = session.get(search_url, params=params, timeout=10)
+        status_code, data = _tmdb_get(search_url, params)
         
-        if response.status_code == 200:
-            data = response.json()
+        if status_code == 200:
             movies = data.get('results', [])
             
             # Sort by popularity and limit results
-            movies.sort(key=lambda x: x.get('popularity', 0), reverse=True)
-            movies = movies[:20]  # Limit to 20 results
+            movies = sorted(movies, key=lambda x: x.get('popularity', 0), reverse=True)[:limit]
+            movies = [project_movie(movie, fields) for movie in movies]
             
             return {
                 "movies": movies, 
                 "total_results": data.get('total_results', 0),
-                "query": query
+                "query": query,
+                "source": "tmdb"
             }
         else:
-            print(f"⚠️ TMDB API error: {response.status_code}")
-            raise HTTPException(status_code=response.status_code, detail="TMDB API error")
+            print(f"⚠️ TMDB API error: {status_code}")
+            raise HTTPException(status_code=status_code, detail="TMDB API error")
             
+    except HTTPException:
+        raise
+    except (TMDBThrottled, TMDBUnavailable) as e:
+        raise _retry_later_response(e)
     except requests.exceptions.RequestException as e:
         print(f"Search request error: {e}")
         raise HTTPException(status_code=500, detail="Search request failed")
@@ -0,0 +1,28 @@
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Optional
+
+
+class RecommendationSeed(BaseModel):
+    title: Optional[str] = None
+    tmdb_id: Optional[int] = None
+    weight: float = Field(default=1.0, gt=0)
+
+    @model_validator(mode='after')
+    def check_reference(self):
+        if not self.tmdb_id and not (self.title and self.title.strip()):
+            raise ValueError('each seed needs a title or a tmdb_id')
+        return self
+
+
+class BatchRecommendationSchema(BaseModel):
+    seeds: List[RecommendationSeed] = Field(min_length=1, max_length=50)
+    limit: int = Field(default=12, ge=1, le=50)
+    # Optional filter applied to every list (see /api/browse).
+    genre: Optional[str] = None
+    year_from: Optional[int] = Field(default=None, ge=1800, le=3000)
+    year_to: Optional[int] = Field(default=None, ge=1800, le=3000)
+    lang: Optional[str] = Field(default=None, min_length=2, max_length=3)
+
+
+class ModelReloadSchema(BaseModel):
+    version: Optional[str] = None
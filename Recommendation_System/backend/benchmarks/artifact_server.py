@@ -0,0 +1,116 @@
+"""
+Local stand-in for the static host serving model artifacts.
+
+Serves the files of a directory with ``Range`` / ``If-Range`` support, an
+optional per-connection bandwidth cap (like a CDN edge) and an optional
+fault: the first ``drop_requests`` responses are cut off after
+``drop_after`` bytes, to exercise resuming.
+"""
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class ArtifactServer:
+    """Threaded HTTP server for the files in ``root``; use as a context manager."""
+
+    def __init__(self, root: Path, bytes_per_second: float = 0, ranges: bool = True,
+                 drop_after: int = 0, drop_requests: int = 0, port: int = 0):
+        self.root = Path(root)
+        self.bytes_per_second = bytes_per_second
+        self.ranges = ranges
+        self.drop_after = drop_after
+        self.drop_requests = drop_requests
+        self.requests = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                    drop = server.drop_requests > 0
+                    if drop:
+                        server.drop_requests -= 1
+                path = server.root / self.path.lstrip("/")
+                if not path.is_file():
+                    self.send_error(404)
+                    return
+                size = path.stat().st_size
+                etag = f'"{int(path.stat().st_mtime)}-{size}"'
+                start, end = 0, size - 1
+                match = RANGE_RE.match(self.headers.get("Range", ""))
+                if_range = self.headers.get("If-Range")
+                partial = server.ranges and match is not None and (if_range is None or if_range == etag)
+                if partial:
+                    if match.group(1):
+                        start = int(match.group(1))
+                        end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+                    else:
+                        start = max(0, size - int(match.group(2)))
+                self.send_response(206 if partial else 200)
+                self.send_header("Content-Length", str(end - start + 1))
+                self.send_header("ETag", etag)
+                if server.ranges:
+                    self.send_header("Accept-Ranges", "bytes")
+                if partial:
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+                self.end_headers()
+                self._send(path, start, end - start + 1, server.drop_after if drop else 0)
+
+            def _send(self, path, offset, length, limit):
+                sent, chunk = 0, 256 * 1024
+                started = time.perf_counter()
+                with open(path, "rb") as f:
+                    f.seek(offset)
+                    while sent < length:
+                        if limit and sent >= limit:
+                            self.close_connection = True
+                            return
+                        data = f.read(min(chunk, length - sent))
+                        try:
+                            self.wfile.write(data)
+                        except (BrokenPipeError, ConnectionResetError):
+                            return
+                        sent += len(data)
+                        with server._lock:
+                            server.bytes_sent += len(data)
+                        if server.bytes_per_second:
+                            ahead = sent / server.bytes_per_second - (time.perf_counter() - started)
+                            if ahead > 0:
+                                time.sleep(ahead)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def write_random_file(path: Path, size: int) -> None:
+    with open(path, "wb") as f:
+        remaining = size
+        while remaining:
+            block = os.urandom(min(remaining, 1 << 20))
+            f.write(block)
+            remaining -= len(block)
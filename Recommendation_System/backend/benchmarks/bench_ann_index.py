@@ -0,0 +1,90 @@
+"""
+Benchmark the IVF neighbour backend against brute force.
+
+Generates a synthetic catalogue of clustered, L2-normalised vectors (movies
+sharing genres/keywords sit close together), builds the IVF index and
+reports build time, memory, per-query latency and recall@6/@12 against an
+exact scan of every vector, for a few ``n_probe`` settings.
+
+Run from the backend directory:
+    python -m benchmarks.bench_ann_index [--vectors 1000000] [--dim 64] [--workers 4]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.recommendation_model.ann_index import IVFIndex, brute_force, normalize
+
+
+def synthetic_vectors(n: int, dim: int, topics: int = 2000, noise: float = 0.6, seed: int = 0,
+                      block_size: int = 1 << 16) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centres = normalize(rng.standard_normal((topics, dim)))
+    out = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, block_size):
+        size = min(block_size, n - start)
+        # Each movie mixes a main topic with a weaker second one.
+        main, second = rng.integers(0, topics, size), rng.integers(0, topics, size)
+        block = centres[main] + 0.3 * centres[second] + noise * rng.standard_normal((size, dim)) / np.sqrt(dim)
+        out[start:start + size] = normalize(block)
+    return out
+
+
+def recall(reference: np.ndarray, found, k: int) -> float:
+    hits = [len(np.intersect1d(ref[:k], rows[:k])) for ref, (rows, _) in zip(reference, found)]
+    return float(np.mean(hits) / k)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--lists", type=int, default=None, help="IVF lists (default: sqrt(N))")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=1, help="build and query threads")
+    parser.add_argument("--probes", type=int, nargs="+", default=[4, 16, 64])
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    vectors = synthetic_vectors(args.vectors, args.dim)
+    print(f"{args.vectors} vectors x {args.dim} dims generated in {time.perf_counter() - t0:.1f}s")
+
+    t0 = time.perf_counter()
+    index = IVFIndex.build(vectors, args.lists, workers=args.workers)
+    build = time.perf_counter() - t0
+    sizes = np.diff(index.offsets)
+    print(f"IVF build ({len(index.centroids)} lists, {args.workers} workers): {build:.1f}s, "
+          f"list size median {int(np.median(sizes))} max {int(sizes.max())}")
+
+    rng = np.random.default_rng(1)
+    seeds = rng.choice(args.vectors, size=args.queries, replace=False)
+    queries = vectors[seeds]
+    exclude = [[s] for s in seeds]
+
+    t0 = time.perf_counter()
+    reference = brute_force(vectors, queries, 12, exclude=exclude)
+    exact_ms = (time.perf_counter() - t0) / args.queries * 1e3
+    # One query at a time, as the API sees them.
+    t0 = time.perf_counter()
+    for s in seeds[:20]:
+        brute_force(vectors, vectors[[s]], 12, exclude=[[s]])
+    single_ms = (time.perf_counter() - t0) / 20 * 1e3
+
+    print()
+    print(f"{'backend':<20} {'memory MiB':>11} {'ms/query':>9} {'recall@6':>9} {'recall@12':>10}")
+    print(f"{'all-pairs float64':<20} {args.vectors ** 2 * 8 / 2**20:>11.0f} {'-':>9} {'1.000':>9} {'1.000':>10}")
+    print(f"{'brute force':<20} {vectors.nbytes / 2**20:>11.1f} {single_ms:>9.2f} {'1.000':>9} {'1.000':>10}"
+          f"   (batched: {exact_ms:.2f} ms/query)")
+    for n_probe in args.probes:
+        t0 = time.perf_counter()
+        for s in seeds:
+            index.search(vectors[s], 12, exclude=[[s]], n_probe=n_probe)
+        ms = (time.perf_counter() - t0) / args.queries * 1e3
+        found = index.search(queries, 12, exclude=exclude, n_probe=n_probe)
+        print(f"{f'ivf n_probe={n_probe}':<20} {(vectors.nbytes + index.nbytes) / 2**20:>11.1f} {ms:>9.2f} "
+              f"{recall(reference, found, 6):>9.3f} {recall(reference, found, 12):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Benchmark /cold-sample with the in-memory cold-start pool against ``$sample``.
+
+Seeds a synthetic ``all_movies``-shaped catalogue (Zipf-like popularity,
+noisy ratings) and reports:
+
+* pool refresh time (candidate selection plus alias table) for the catalogue,
+* id-selection throughput: ``ColdStartPool.sample`` (unseeded and seeded)
+  and, when a MongoDB is reachable, the previous ``$sample`` aggregation on
+  a scratch collection holding the same catalogue,
+* /api/cold-sample requests per second through the app (TMDB stub, warm
+  movie cache, so the id selection is what differs),
+* how closely single draws follow the weights.
+
+Run from the backend directory:
+    python -m benchmarks.bench_cold_start [--movies 50000] [--mongo-url mongodb://localhost:27017]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from app.recommendation_model.cold_start import ColdStartPool, candidates_from_documents
+from benchmarks.tmdb_stub import TMDBStub
+
+SAMPLE_SIZE = 72
+
+
+def synthetic_catalogue(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    popularity = rng.pareto(1.2, n) * 5
+    votes = (rng.pareto(1.0, n) * 50).astype(int)
+    rating = np.clip(rng.normal(6.3, 1.1, n), 0, 10).round(1)
+    return [
+        {"id": 1000 + i, "title": f"Movie {i}", "popularity": float(popularity[i]),
+         "vote_average": float(rating[i]), "vote_count": int(votes[i])}
+        for i in range(n)
+    ]
+
+
+def legacy_sample(collection):
+    """The pre-pool implementation, kept here as the baseline."""
+    ids = []
+    for doc in collection.aggregate([{"$sample": {"size": SAMPLE_SIZE}}]):
+        for k in ("id", "tmdb_id", "movieId", "movie_id"):
+            if k in doc and doc[k] is not None:
+                ids.append(int(doc[k]))
+                break
+    return ids
+
+
+def per_second(fn, seconds: float = 2.0) -> float:
+    calls, started = 0, time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        fn()
+        calls += 1
+    return calls / (time.perf_counter() - started)
+
+
+def _configure_env(base_url: str, mongo_url: str, movies: int):
+    os.environ.setdefault("DATABASE_URL", mongo_url)
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    os.environ.setdefault("TMDBAPI_KEY", "benchmark")
+    os.environ["TMDB_BASE_URL"] = base_url
+    os.environ["MOVIE_STORE_ENABLED"] = "false"
+    os.environ["TMDB_CACHE_MAX_ENTRIES"] = str(movies)
+    os.environ["TMDB_CACHE_MAX_BYTES"] = str(4 << 30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--movies", type=int, default=50_000)
+    parser.add_argument("--pool-size", type=int, default=5000)
+    parser.add_argument("--mongo-url", default=None, help="MongoDB for the $sample baseline (skipped if unset)")
+    args = parser.parse_args()
+
+    docs = synthetic_catalogue(args.movies)
+    pool = ColdStartPool()
+    t0 = time.perf_counter()
+    ids, weights = candidates_from_documents(docs, args.pool_size)
+    pool.replace(ids, weights, "catalogue")
+    print(f"{args.movies} movies -> pool of {len(pool)} in {(time.perf_counter() - t0) * 1e3:.0f} ms")
+
+    collection = None
+    if not args.mongo_url:
+        print("$sample baseline skipped: pass --mongo-url")
+    else:
+        from pymongo import MongoClient
+        try:
+            client = MongoClient(args.mongo_url, serverSelectionTimeoutMS=2000)
+            collection = client["movie_user_bench"]["all_movies"]
+            collection.drop()
+            collection.insert_many([dict(d) for d in docs])
+        except Exception as exc:
+            print(f"$sample baseline skipped: {exc}")
+            collection = None
+
+    print()
+    print(f"{'id selection':<28}{'calls/s':>10}{'us/call':>10}")
+    rows = [("pool", lambda: pool.sample(SAMPLE_SIZE)),
+            ("pool, seeded per user", lambda: pool.sample(SAMPLE_SIZE, "user@example.com"))]
+    if collection is not None:
+        rows.insert(0, ("$sample (previous)", lambda: legacy_sample(collection)))
+    for name, fn in rows:
+        rate = per_second(fn)
+        print(f"{name:<28}{rate:>10.0f}{1e6 / rate:>10.1f}")
+
+    # Single alias draws against the normalised weights (total variation distance).
+    snapshot, draws = pool.snapshot, 2_000_000
+    rng = np.random.default_rng(1)
+    columns = rng.integers(0, len(snapshot.ids), draws)
+    rows = np.where(rng.random(draws) < snapshot.prob[columns], columns, snapshot.alias[columns])
+    observed = np.bincount(rows, minlength=len(snapshot.ids)) / draws
+    tvd = 0.5 * np.abs(observed - snapshot.weights / snapshot.weights.sum()).sum()
+    print(f"\n{draws} single draws vs weights: total variation distance {tvd:.4f}")
+    heavy = snapshot.ids[np.argsort(-snapshot.weights)[:SAMPLE_SIZE]]
+    hits = np.mean([len(np.intersect1d(pool.sample(SAMPLE_SIZE), heavy)) for _ in range(200)])
+    print(f"a sample of {SAMPLE_SIZE} holds on average {hits:.1f} of the {SAMPLE_SIZE} heaviest candidates "
+          f"(uniform: {SAMPLE_SIZE * SAMPLE_SIZE / len(pool):.1f})")
+
+    with TMDBStub(latency=0.0) as stub:
+        _configure_env(stub.base_url, args.mongo_url or "mongodb://127.0.0.1:1", args.movies)
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from app.routes import recommendation
+
+        app = FastAPI()
+        app.include_router(recommendation.recommendation_router)
+        recommendation.recommendation_model.cold_start_pool = pool
+        # Warm the movie cache for every id either sampler can return.
+        warm = [d["id"] for d in docs] if collection is not None else ids.tolist()
+        recommendation.fetch_multiple_movies(warm)
+
+        samplers = [("pool", recommendation.recommand_sample_30)]
+        if collection is not None:
+            samplers.insert(0, ("$sample (previous)", lambda seed=None: legacy_sample(collection)))
+        print()
+        print(f"{'/api/cold-sample':<28}{'req/s':>10}{'ms/req':>10}")
+        with TestClient(app) as client:
+            for name, sampler in samplers:
+                recommendation.recommand_sample_30 = sampler
+                assert client.get("/api/cold-sample").status_code == 200
+                rate = per_second(lambda: client.get("/api/cold-sample"))
+                print(f"{name:<28}{rate:>10.0f}{1e3 / rate:>10.2f}")
+        print(f"\nstub served {stub.total_hits} requests")
+
+    if collection is not None:
+        collection.drop()
+
+
+if __name__ == "__main__":
+    main()
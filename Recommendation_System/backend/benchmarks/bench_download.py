@@ -0,0 +1,101 @@
+"""
+Benchmark the artifact downloader against a local, bandwidth-capped server.
+
+Serves a random file from a temporary directory (per-connection cap, like a
+CDN edge) and reports throughput for:
+
+* the previous downloader: one stream, 8 KiB chunks,
+* ``downloader.download`` with 1 and N Range segments,
+* an interrupted download (the connection drops part way and retries are
+  exhausted) followed by a resumed one,
+
+and checks that a wrong SHA-256 is rejected before the file appears.
+
+Run from the backend directory:
+    python -m benchmarks.bench_download [--mib 64] [--mibps 16] [--segments 4]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import requests
+
+from app.recommendation_model import downloader
+from benchmarks.artifact_server import ArtifactServer, write_random_file
+
+
+def legacy_download(url: str, path: Path) -> float:
+    """The pre-downloader implementation, kept here as the baseline."""
+    t0 = time.perf_counter()
+    with requests.get(url, stream=True, timeout=60) as r:
+        r.raise_for_status()
+        with open(path, "wb") as f:
+            for chunk in r.iter_content(chunk_size=8192):
+                if chunk:
+                    f.write(chunk)
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mib", type=int, default=64, help="artifact size")
+    parser.add_argument("--mibps", type=float, default=16, help="per-connection bandwidth cap (0: none)")
+    parser.add_argument("--segments", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / "srv").mkdir()
+        source = tmp / "srv" / "similarity.npy"
+        write_random_file(source, args.mib << 20)
+        digest = downloader.sha256_file(source)
+        size_mib = args.mib
+
+        with ArtifactServer(tmp / "srv", bytes_per_second=args.mibps * 2**20) as server:
+            url = f"{server.base_url}/similarity.npy"
+            print(f"{size_mib} MiB artifact, {args.mibps:g} MiB/s per connection")
+            print(f"{'downloader':<28}{'seconds':>9}{'MiB/s':>9}")
+
+            seconds = legacy_download(url, tmp / "legacy.npy")
+            print(f"{'single stream, 8 KiB':<28}{seconds:>9.2f}{size_mib / seconds:>9.1f}")
+
+            for segments in sorted({1, args.segments}):
+                out = tmp / f"seg{segments}.npy"
+                stats = downloader.download(url, out, sha256=digest, segments=segments)
+                print(f"{f'{segments} segment(s), 1 MiB chunks':<28}{stats['seconds']:>9.2f}"
+                      f"{stats['mib_per_second']:>9.1f}")
+
+            # Drop every connection of the first attempt after a quarter of its range.
+            server.drop_after = (args.mib << 20) // (4 * args.segments)
+            server.drop_requests = args.segments
+            out = tmp / "resumed.npy"
+            t0 = time.perf_counter()
+            try:
+                downloader.download(url, out, sha256=digest, segments=args.segments, retries=0)
+                raise AssertionError("the interrupted download should have failed")
+            except requests.RequestException:
+                pass
+            interrupted = time.perf_counter() - t0
+            partial = Path(str(out) + ".tmp")
+            assert partial.exists() and not out.exists(), "partial file must be kept, final file must not exist"
+            stats = downloader.download(url, out, sha256=digest, segments=args.segments)
+            print(f"{'interrupted attempt':<28}{interrupted:>9.2f}{'-':>9}")
+            print(f"{'resumed attempt':<28}{stats['seconds']:>9.2f}{stats['mib_per_second']:>9.1f}"
+                  f"   ({stats['resumed_bytes'] / 2**20:.1f} MiB reused)")
+            assert downloader.sha256_file(out) == digest
+
+            try:
+                downloader.download(url, tmp / "bad.npy", sha256="0" * 64, segments=args.segments)
+                raise AssertionError("a wrong checksum must be rejected")
+            except downloader.ChecksumError:
+                assert not (tmp / "bad.npy").exists() and not (tmp / "bad.npy.tmp").exists()
+            print("checksum mismatch rejected, nothing left behind")
+
+        with ArtifactServer(tmp / "srv", ranges=False) as server:
+            stats = downloader.download(f"{server.base_url}/similarity.npy", tmp / "noranges.npy", sha256=digest)
+            print(f"server without Range support: {stats['segments']} stream, {stats['seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
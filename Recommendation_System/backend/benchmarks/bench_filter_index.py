@@ -0,0 +1,125 @@
+"""
+Benchmark genre/year/language filtering at catalogue scale.
+
+Generates filter columns for a synthetic catalogue (1-3 of 19 genres per
+movie, years 1920-2025, a skewed language mix) and reports:
+
+* ``FilterIndex`` construction and the cost of a mask, cold and cached,
+* a /browse page (most popular matches first),
+* ranking one dense similarity row to top-12 with and without a mask,
+* the IVF backend with and without a mask (per-query latency and recall
+  against an exact scan of the matching rows).
+
+Run from the backend directory:
+    python -m benchmarks.bench_filter_index [--movies 1000000] [--ivf-vectors 200000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.recommendation_model.ann_index import IVFIndex, brute_force
+from app.recommendation_model.filter_index import (
+    FILTER_VOCABULARIES, TMDB_GENRES, FilterColumns, FilterIndex, MovieFilter
+)
+from app.recommendation_model.topk import top_k_window
+from benchmarks.bench_ann_index import synthetic_vectors
+
+FILTERS = {
+    "genre=Drama": MovieFilter.parse("Drama"),
+    "genre=Horror&lang=ja": MovieFilter.parse("Horror", lang="ja"),
+    "Sci-Fi+Action, 2010-": MovieFilter.parse("Sci-Fi,Action", year_from=2010),
+    "Western, 1950-1969, it": MovieFilter.parse("Western", 1950, 1969, "it"),
+}
+
+
+def synthetic_filter_arrays(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    genres = list(TMDB_GENRES.values())
+    genre_p = np.linspace(3, 0.2, len(genres))
+    genre_p /= genre_p.sum()
+    languages = ["en", "fr", "ja", "es", "de", "it", "ko", "hi"]
+    language_p = np.array([0.6, 0.1, 0.07, 0.07, 0.05, 0.04, 0.04, 0.03])
+    columns = FilterColumns(genres, [""] + languages)
+    counts = rng.integers(1, 4, n)
+    picks = rng.choice(len(genres), size=(n, 3), p=genre_p)
+    bits = np.zeros(n, dtype=np.uint32)
+    for j in range(3):
+        bits |= np.where(counts > j, np.uint32(1) << picks[:, j].astype(np.uint32), np.uint32(0))
+    arrays = columns.to_arrays()
+    arrays["genre_bits"] = bits
+    arrays["years"] = rng.integers(1920, 2026, n).astype(np.int16)
+    arrays["language_codes"] = (1 + rng.choice(len(languages), size=n, p=language_p)).astype(np.uint16)
+    arrays["popularity"] = rng.pareto(1.2, n).astype(np.float32)
+    return arrays
+
+
+def recall(reference, found, k: int) -> float:
+    """Like bench_ann_index.recall, out of the matches that exist when fewer than ``k`` do."""
+    hits = [len(np.intersect1d(ref[:k], rows[:k])) for ref, (rows, _) in zip(reference, found)]
+    return float(np.sum(hits) / sum(len(ref[:k]) for ref in reference))
+
+
+def per_call_ms(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--movies", type=int, default=1_000_000)
+    parser.add_argument("--ivf-vectors", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    arrays = synthetic_filter_arrays(args.movies)
+    t0 = time.perf_counter()
+    index = FilterIndex.from_arrays(arrays)
+    print(f"FilterIndex over {args.movies} movies built in {(time.perf_counter() - t0) * 1e3:.0f} ms "
+          f"({sum(b.nbytes for b in index.genre_bitsets.values()) / 2**20:.1f} MiB of genre bitsets)")
+
+    rng = np.random.default_rng(1)
+    row_scores = rng.random(args.movies).astype(np.float32)
+    print()
+    print(f"{'filter':<24}{'matches':>9}{'mask ms':>9}{'cached':>9}{'browse':>9}{'top-12 ms':>11}")
+    print(f"{'(none)':<24}{args.movies:>9}{'-':>9}{'-':>9}"
+          f"{per_call_ms(lambda: index.browse(None, 0, 24), 20):>9.2f}"
+          f"{per_call_ms(lambda: top_k_window(row_scores, 0, 12, exclude=0), 20):>11.2f}")
+    for name, spec in FILTERS.items():
+        t0 = time.perf_counter()
+        mask = index.mask(spec)
+        cold = (time.perf_counter() - t0) * 1e3
+        cached = per_call_ms(lambda: index.mask(spec), 20)
+        browse = per_call_ms(lambda: index.browse(spec, 0, 24), 20)
+        ranked = per_call_ms(lambda: top_k_window(np.where(index.mask(spec), row_scores, -np.inf), 0, 12,
+                                                  exclude=0), 20)
+        print(f"{name:<24}{int(mask.sum()):>9}{cold:>9.2f}{cached:>9.3f}{browse:>9.2f}{ranked:>11.2f}")
+
+    n = args.ivf_vectors
+    vectors = synthetic_vectors(n, 64)
+    ivf = IVFIndex.build(vectors)
+    small = FilterIndex.from_arrays({name: array if name in FILTER_VOCABULARIES else array[:n]
+                                     for name, array in arrays.items()})
+    seeds = rng.choice(n, size=args.queries, replace=False)
+    exclude = [[s] for s in seeds]
+    print()
+    print(f"IVF over {n} vectors, {len(ivf.centroids)} lists, n_probe {ivf.n_probe}")
+    print(f"{'filter':<24}{'matches':>9}{'ms/query':>10}{'recall@12':>11}")
+    for name, spec in [("(none)", None)] + list(FILTERS.items()):
+        mask = None if spec is None else small.mask(spec)
+        ms = per_call_ms(lambda: [ivf.search(vectors[s], 12, exclude=[[s]], mask=mask) for s in seeds[:20]], 1) / 20
+        found = ivf.search(vectors[seeds], 12, exclude=exclude, mask=mask)
+        if mask is None:
+            reference = brute_force(vectors, vectors[seeds], 12, exclude=exclude)
+        else:
+            rows = np.flatnonzero(mask)
+            reference = rows[brute_force(vectors[rows], vectors[seeds], 12,
+                                         exclude=[np.flatnonzero(rows == s) for s in seeds])]
+        matches = n if mask is None else int(mask.sum())
+        print(f"{name:<24}{matches:>9}{ms:>10.2f}{recall(reference, found, 12):>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark TMDB hydration against a local TMDB stub.
+
+Compares the previous strictly sequential loop (one id at a time with a
+``time.sleep`` between calls) with ``fetch_multiple_movies`` for the list
+sizes served by /top_6, /top_6_to_12, the history route and /cold-sample,
+both with a cold and a warm movie cache.
+
+Run from the backend directory:
+    python -m benchmarks.bench_hydration [--latency 0.08] [--concurrency 8]
+"""
+import argparse
+import os
+import time
+
+from benchmarks.tmdb_stub import TMDBStub
+
+SIZES = {
+    "/top_6": 6,
+    "/top_6_to_12": 6,
+    "/api/user/history/": 25,
+    "/cold-sample": 72,
+}
+
+
+def _configure_env(base_url: str, concurrency: int):
+    os.environ.setdefault("DATABASE_URL", "mongodb://127.0.0.1:1")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    os.environ.setdefault("TMDBAPI_KEY", "benchmark")
+    os.environ["TMDB_BASE_URL"] = base_url
+    os.environ["TMDB_MAX_CONCURRENCY"] = str(concurrency)
+    # Measure the TMDB tier on its own; the Mongo store would short-circuit it.
+    os.environ["MOVIE_STORE_ENABLED"] = "false"
+
+
+def sequential_fetch(fetch, movie_ids, rate_limit_delay):
+    """The pre-concurrency implementation, kept here as the baseline."""
+    movies = []
+    for i, movie_id in enumerate(movie_ids):
+        if i > 0:
+            time.sleep(rate_limit_delay)
+        movies.append(fetch(movie_id))
+    return movies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.08, help="stub latency per call (s)")
+    parser.add_argument("--concurrency", type=int, default=8, help="TMDB_MAX_CONCURRENCY")
+    args = parser.parse_args()
+
+    # Every third id is missing so the placeholder path is exercised too.
+    missing = set(range(3, 10_000, 3))
+    with TMDBStub(latency=args.latency, missing_ids=missing) as stub:
+        _configure_env(stub.base_url, args.concurrency)
+        from app.routes import recommendation
+
+        print("=" * 64)
+        print(f"TMDB hydration benchmark (stub latency {args.latency * 1000:.0f} ms, "
+              f"concurrency {args.concurrency})")
+        print("=" * 64)
+        print(f"{'endpoint':<22}{'ids':>5}{'sequential':>12}{'concurrent':>12}{'warm':>10}{'speedup':>9}")
+        for endpoint, size in SIZES.items():
+            ids = list(range(1, size + 1))
+            delay = 0.15 if endpoint == "/cold-sample" else 0.1
+
+            recommendation.movie_cache.clear()
+            t0 = time.perf_counter()
+            before = sequential_fetch(recommendation.fetch_movie_from_tmdb, ids, delay)
+            sequential = time.perf_counter() - t0
+
+            recommendation.movie_cache.clear()
+            t0 = time.perf_counter()
+            after = recommendation.fetch_multiple_movies(ids)
+            concurrent = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            recommendation.fetch_multiple_movies(ids)
+            warm = time.perf_counter() - t0
+
+            assert [m["id"] for m in after] == ids, "order not preserved"
+            assert all(
+                (b is None) == (a.get("status") == "unavailable") for b, a in zip(before, after)
+            ), "placeholder semantics changed"
+            print(f"{endpoint:<22}{size:>5}{sequential:>11.2f}s{concurrent:>11.2f}s{warm * 1000:>8.1f}ms"
+                  f"{sequential / concurrent:>8.1f}x")
+        print(f"\nstub served {stub.total_hits} requests")
+        print(f"movie cache: {recommendation.movie_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
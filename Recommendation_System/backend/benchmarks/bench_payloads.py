@@ -0,0 +1,93 @@
+"""
+Report payload size and serialization time per movie-list endpoint.
+
+Builds each endpoint's response from TMDB-shaped movies (see tmdb_stub) with
+the endpoint's usual list length, and compares:
+
+* the full TMDB JSON against the ``fields=card`` projection, raw and gzipped
+  (as GZipMiddleware sends it),
+* the previous serialization path (``jsonable_encoder`` + ``JSONResponse``)
+  against ``ORJSONResponse``.
+
+Run from the backend directory:
+    python -m benchmarks.bench_payloads [--repeat 200]
+"""
+import argparse
+import gzip
+import os
+import time
+
+os.environ.setdefault("DATABASE_URL", "mongodb://127.0.0.1:1")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("TMDBAPI_KEY", "benchmark")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app.config.config import Settings
+from app.routes.recommendation import parse_fields, project_movie
+from benchmarks.tmdb_stub import fake_movie
+
+settings = Settings()  # type: ignore
+
+# endpoint -> (movies in the response, wrapper around the movie list)
+ENDPOINTS = {
+    "/api/cold-sample": (72, lambda movies: {"movies": movies}),
+    "/api/browse": (24, lambda movies: {"movies": movies, "total": 5000, "offset": 0, "limit": 24}),
+    "/api/similar": (12, lambda movies: {"movies": movies, "offset": 0, "limit": 12}),
+    "/api/top_6": (6, lambda movies: {"movies": movies}),
+    "/api/user/recommendations": (12, lambda movies: {"movies": movies, "source": "history"}),
+    "/api/user/history": (50, lambda movies: {"user": "user@example.com", "movies": movies}),
+    "/api/recommend/batch": (48, lambda movies: {
+        "seeds": [{"title": f"Seed {i}", "weight": 1.0, "movies": movies[i * 12:(i + 1) * 12]} for i in range(3)],
+        "blended": movies[36:]}),
+}
+
+
+def per_call_us(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def wire_bytes(body: bytes) -> int:
+    if len(body) < settings.GZIP_MINIMUM_SIZE:
+        return len(body)
+    return len(gzip.compress(body, compresslevel=settings.GZIP_COMPRESS_LEVEL))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    card = parse_fields("card")
+    print(f"{'endpoint':<28}{'full B':>9}{'card B':>9}{'full gz':>9}{'card gz':>9}"
+          f"{'saved':>8}{'old us':>9}{'orjson':>9}{'card':>9}{'speedup':>9}")
+    for name, (count, wrap) in ENDPOINTS.items():
+        movies = [fake_movie(603 + i) for i in range(count)]
+        full = wrap(movies)
+        compact = wrap([project_movie(movie, card) for movie in movies])
+
+        old_body = JSONResponse(jsonable_encoder(full)).body
+        full_body = ORJSONResponse(full).body
+        card_body = ORJSONResponse(compact).body
+        assert len(full_body) <= len(old_body)
+
+        old = per_call_us(lambda: JSONResponse(jsonable_encoder(full)).body, args.repeat)
+        new = per_call_us(lambda: ORJSONResponse(full).body, args.repeat)
+        carded = per_call_us(lambda: ORJSONResponse(wrap([project_movie(m, card) for m in movies])).body,
+                             args.repeat)
+        saved = 1 - wire_bytes(card_body) / len(old_body)
+        print(f"{name:<28}{len(old_body):>9}{len(card_body):>9}{wire_bytes(old_body):>9}{wire_bytes(card_body):>9}"
+              f"{saved:>8.0%}{old:>9.0f}{new:>9.0f}{carded:>9.0f}{old / carded:>8.1f}x")
+    print("\nB: JSON bytes; gz: bytes on the wire (gzip above "
+          f"{settings.GZIP_MINIMUM_SIZE} B); saved: card+gzip vs the previous uncompressed full response.")
+    print("old us: jsonable_encoder + JSONResponse; orjson: ORJSONResponse; card: projection + ORJSONResponse")
+    print("Stub movies repeat more than real TMDB JSON, so real gzip ratios are lower.")
+
+
+if __name__ == "__main__":
+    main()
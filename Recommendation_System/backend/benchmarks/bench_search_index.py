@@ -0,0 +1,81 @@
+"""
+Benchmark local title search (p50/p99 query latency).
+
+Uses the titles of the current model artifact when one is installed,
+otherwise a synthetic catalogue. Queries are drawn from catalogue titles and
+turned into prefixes (search-as-you-type) and single-typo variants.
+
+Run from the backend directory:
+    python -m benchmarks.bench_search_index [--movies 50000] [--queries 2000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.recommendation_model import artifacts
+from app.recommendation_model.search_index import TrigramSearchIndex
+
+WORDS = ("the dark knight love war star man city night return of king blue lost "
+         "last first house dead life time world story girl boy black red wild").split()
+
+
+def catalogue(size: int, rng):
+    version = artifacts.current_version()
+    if version:
+        artifact = artifacts.load_artifact(artifacts.ARTIFACTS_DIR / version)
+        if len(artifact.get("titles")) >= 1000:
+            return artifact.get("titles"), artifact.get("popularity"), f"artifact {version}"
+    titles = np.array([
+        " ".join(rng.choice(WORDS, rng.integers(1, 5))) + f" {i}" for i in range(size)
+    ])
+    return titles, rng.pareto(1.5, size).astype(np.float32), "synthetic"
+
+
+def make_queries(titles, count, rng):
+    queries = []
+    for row in rng.integers(0, len(titles), count):
+        title = str(titles[row]).lower()
+        if rng.random() < 0.5:
+            queries.append(title[:max(2, int(len(title) * rng.uniform(0.3, 1.0)))])
+        else:
+            pos = int(rng.integers(0, len(title)))
+            queries.append(title[:pos] + "x" + title[pos + 1:])
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--movies", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    titles, popularity, source = catalogue(args.movies, rng)
+    t0 = time.perf_counter()
+    index = TrigramSearchIndex(titles, popularity)
+    build = time.perf_counter() - t0
+
+    queries = make_queries(titles, args.queries, rng)
+    latencies = []
+    hits = 0
+    for query in queries:
+        t0 = time.perf_counter()
+        results = index.search(query, limit=args.limit)
+        latencies.append(time.perf_counter() - t0)
+        hits += bool(results)
+    latencies = np.array(latencies) * 1000
+
+    print("=" * 64)
+    print(f"Local title search ({source}, {len(titles)} titles, limit {args.limit})")
+    print("=" * 64)
+    print(f"index build : {build:8.2f} s")
+    print(f"p50 latency : {np.percentile(latencies, 50):8.3f} ms")
+    print(f"p99 latency : {np.percentile(latencies, 99):8.3f} ms")
+    print(f"max latency : {latencies.max():8.3f} ms")
+    print(f"queries with a hit: {hits}/{len(queries)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Local stand-in for the TMDB v3 API used by the benchmarks.
+
+Serves the handful of endpoints the backend calls (movie details, search,
+similar, discover) with a configurable artificial latency, so the hydration
+code can be measured without network access or an API key.
+"""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+MOVIE_RE = re.compile(r"^/3/movie/(\d+)$")
+SIMILAR_RE = re.compile(r"^/3/movie/(\d+)/similar$")
+
+
+def fake_movie(movie_id: int) -> dict:
+    """Build a TMDB-shaped movie payload for an id."""
+    return {
+        "id": movie_id,
+        "title": f"Movie {movie_id}",
+        "overview": "An overview long enough to look like a real one. " * 4,
+        "poster_path": f"/poster_{movie_id}.jpg",
+        "backdrop_path": f"/backdrop_{movie_id}.jpg",
+        "vote_average": round(5 + (movie_id % 50) / 10, 1),
+        "vote_count": 1000 + movie_id % 5000,
+        "popularity": float(movie_id % 977),
+        "release_date": "2010-07-16",
+        "original_language": "en",
+        "genres": [{"id": 28, "name": "Action"}, {"id": 878, "name": "Science Fiction"}],
+        "production_companies": [
+            {"id": i, "name": f"Studio {i}", "logo_path": None, "origin_country": "US"}
+            for i in range(4)
+        ],
+        "spoken_languages": [{"english_name": "English", "iso_639_1": "en", "name": "English"}],
+        "belongs_to_collection": None,
+        "runtime": 120,
+        "status": "Released",
+    }
+
+
+class TMDBStub:
+    """Threaded HTTP server answering like TMDB after ``latency`` seconds.
+
+    Ids listed in ``missing_ids`` answer 404. Ids listed in ``throttled_ids``
+    answer 429 with ``Retry-After: retry_after`` the first time they are
+    requested. ``hits`` counts requests per path.
+    """
+
+    def __init__(self, latency: float = 0.05, missing_ids=(), port: int = 0, throttled_ids=(),
+                 retry_after: float = 1):
+        self.latency = latency
+        self.missing_ids = set(missing_ids)
+        self.throttled_ids = set(throttled_ids)
+        self.retry_after = retry_after
+        self.hits = {}
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stub._handle(self)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/3"
+
+    @property
+    def total_hits(self) -> int:
+        with self._lock:
+            return sum(self.hits.values())
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _reply(self, handler, status: int, payload: dict, headers=None):
+        body = json.dumps(payload).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def _handle(self, handler):
+        url = urlparse(handler.path)
+        with self._lock:
+            self.hits[url.path] = self.hits.get(url.path, 0) + 1
+        time.sleep(self.latency)
+
+        match = MOVIE_RE.match(url.path)
+        if match:
+            movie_id = int(match.group(1))
+            if movie_id in self.missing_ids:
+                return self._reply(handler, 404, {"status_code": 34, "success": False})
+            with self._lock:
+                throttled = movie_id in self.throttled_ids
+                self.throttled_ids.discard(movie_id)
+            if throttled:
+                return self._reply(handler, 429, {"status_code": 25, "success": False},
+                                   {"Retry-After": str(self.retry_after)})
+            return self._reply(handler, 200, fake_movie(movie_id))
+
+        match = SIMILAR_RE.match(url.path)
+        if match:
+            base = int(match.group(1))
+            results = [fake_movie(base + i) for i in range(1, 21)]
+            return self._reply(handler, 200, {"page": 1, "results": results})
+
+        if url.path in ("/3/search/movie", "/3/discover/movie"):
+            query = parse_qs(url.query)
+            page = int(query.get("page", ["1"])[0])
+            results = [fake_movie(page * 100 + i) for i in range(20)]
+            return self._reply(handler, 200, {"page": page, "results": results, "total_results": 20})
+
+        self._reply(handler, 404, {"status_code": 34, "success": False})
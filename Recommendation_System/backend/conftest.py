@@ -0,0 +1,9 @@
+"""
+Settings the app modules read at import time, for test runs without a ``.env``.
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "mongodb://127.0.0.1:1")
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("TMDBAPI_KEY", "test")
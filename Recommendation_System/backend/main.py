@@ -1,17 +1,40 @@
+from contextlib import asynccontextmanager
 from app import DATABASE_URL
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Request
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from app.config.config import Settings
-Settings=Settings()#type:ignore
 from app.routes.auth_route import auth_router
-from app.routes.recommendation import recommendation_router
+from app.routes.recommendation import (
+    recommendation_router, movie_cache, prewarm_top_rated, response_cache, tmdb_breaker, tmdb_executor,
+    tmdb_flights, tmdb_limiter, tmdb_retries, user_recommendation_cache
+)
 from app.routes.history import history_router
+from app.routes.admin import admin_router, require_admin_token
+from app.recommendation_model import recommand as recommendation_model
+from app.recommendation_model.recommand import ranked_cache
+Settings=Settings()#type:ignore
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the model in the background so auth/history serve immediately.
+    recommendation_model.start_model_loading()
+    recommendation_model.start_model_watcher(Settings.MODEL_WATCH_INTERVAL_SECONDS)
+    recommendation_model.start_cold_start_refresher(Settings.COLD_START_REFRESH_SECONDS)
+    if Settings.TOP_RATED_PREWARM_PAGES > 0:
+        tmdb_executor.submit(prewarm_top_rated, Settings.TOP_RATED_PREWARM_PAGES)
+    yield
+
 
 app=FastAPI(
     title='choose your own adventure game',
     version='0.1.0',
     docs_url='/docs',
-    redoc_url='/redoc'
+    redoc_url='/redoc',
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 app.add_middleware(
     CORSMiddleware,
@@ -20,13 +43,58 @@ app.add_middleware(
     allow_methods=['*'],
     allow_credentials=True
 )
+# Movie lists compress well; tiny responses are not worth the CPU.
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=Settings.GZIP_MINIMUM_SIZE,
+    compresslevel=Settings.GZIP_COMPRESS_LEVEL
+)
 app.include_router(router=auth_router)
 app.include_router(router=recommendation_router)
 app.include_router(router=history_router)
+app.include_router(router=admin_router)
+
+@app.middleware('http')
+async def model_version_header(request: Request, call_next):
+    response = await call_next(request)
+    version = recommendation_model.active_version()
+    if version is not None:
+        response.headers['X-Model-Version'] = version
+    return response
 
 @app.get('/')
 def main():
     return {'message':'connection estabilished'}
 
+@app.get('/health/live')
+def health_live():
+    """The process is up and serving requests."""
+    return {'status': 'alive'}
+
+@app.get('/health/ready')
+def health_ready():
+    """200 once the recommendation model is loaded, 503 while loading or after a failure."""
+    status = recommendation_model.model_status()
+    if status['state'] != recommendation_model.MODEL_READY:
+        return JSONResponse(status_code=503, content=status)
+    return status
+
+@app.get('/metrics', dependencies=[Depends(require_admin_token)])
+def metrics():
+    """Per-worker counters used to size caches and watch upstream health (needs ADMIN_TOKEN)."""
+    return {
+        'model': recommendation_model.model_status(),
+        'model_registry': recommendation_model.registry.stats(),
+        'cold_start_pool': recommendation_model.cold_start_pool.stats(),
+        'tmdb_movie_cache': movie_cache.stats(),
+        'tmdb_single_flight': tmdb_flights.stats(),
+        'tmdb_breaker': tmdb_breaker.stats(),
+        'tmdb_rate_limit': tmdb_limiter.stats(),
+        'tmdb_retries': tmdb_retries.stats(),
+        'similar_ranked_cache': ranked_cache.stats(),
+        'user_recommendation_cache': user_recommendation_cache.stats(),
+        'response_cache': response_cache.stats(),
+    }
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,82 @@
+"""
+IVF approximate neighbours against brute_force on a small clustered corpus.
+"""
+import numpy as np
+import pytest
+from scipy import sparse
+
+from app.recommendation_model.ann_index import IVFIndex, brute_force, random_projection
+
+N = 3000
+VOCABULARY = 300
+TOPICS = 20
+K = 10
+N_LISTS = 55
+
+
+@pytest.fixture(scope="module")
+def features():
+    # Tag sets drawn mostly from one topic each, L2-normalised like TF-IDF rows.
+    rng = np.random.default_rng(15)
+    topics = rng.integers(0, TOPICS, N)
+    words = np.where(rng.random((N, 8)) < 0.8,
+                     topics[:, None] * 15 + rng.integers(0, 15, (N, 8)), rng.integers(0, VOCABULARY, (N, 8)))
+    matrix = sparse.csr_matrix((np.ones(words.size, dtype=np.float32), (np.repeat(np.arange(N), 8), words.ravel())),
+                               shape=(N, VOCABULARY))
+    matrix.sum_duplicates()
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    return sparse.diags(1 / norms).dot(matrix).tocsr().astype(np.float32)
+
+
+@pytest.fixture(scope="module")
+def index(features):
+    return IVFIndex.build(features, n_lists=N_LISTS, n_probe=4, workers=2)
+
+
+def _recall(features, index, queries, n_probe, mask=None):
+    """Share of the returned rows scoring at least the exact k-th best score (ties count)."""
+    vectors = index.vectors_for_rows(queries)
+    exclude = [[row] for row in queries]
+    reference = brute_force(features if mask is None else features.multiply(mask[:, None]).tocsr(),
+                            vectors, K, exclude=exclude)
+    exact = np.asarray(features @ vectors.T).T
+    hits = []
+    for i, (rows, scores) in enumerate(index.search(vectors, K, exclude=exclude, n_probe=n_probe, mask=mask)):
+        assert len(rows) == K and queries[i] not in rows
+        assert np.allclose(scores, exact[i, rows], atol=1e-5)
+        hits.append(np.mean(scores >= exact[i, reference[i, -1]] - 1e-6))
+    return float(np.mean(hits))
+
+
+def test_lists_partition_the_catalogue(index):
+    assert len(index.centroids) == N_LISTS and index.offsets[-1] == N
+    assert sorted(index.rows.tolist()) == list(range(N))
+    assert np.allclose(np.linalg.norm(index.centroids, axis=1), 1.0)
+
+
+def test_recall_floor(features, index):
+    queries = np.arange(0, N, 15)
+    recalls = [_recall(features, index, queries, n_probe) for n_probe in (1, 2, 4, N_LISTS)]
+    assert recalls == sorted(recalls)
+    assert recalls[2] >= 0.95
+    assert recalls[-1] == 1.0  # every list probed: exact
+
+
+def test_filtered_recall_floor(features, index):
+    mask = np.zeros(N, dtype=bool)
+    mask[::3] = True
+    queries = np.arange(0, N, 30)
+    assert _recall(features, index, queries, 4, mask=mask) >= 0.95
+    for rows, _ in index.search(index.vectors_for_rows(queries), K, mask=mask):
+        assert mask[rows].all()
+
+
+def test_round_trip_through_artifact_arrays(features, index):
+    embeddings = random_projection(features, 64)
+    assert embeddings.shape == (N, 64) and np.allclose(np.linalg.norm(embeddings, axis=1), 1.0, atol=1e-5)
+    built = IVFIndex.build(embeddings, n_lists=N_LISTS)
+    reopened = IVFIndex.from_arrays({"embeddings": embeddings, **built.to_arrays()}, n_probe=N_LISTS)
+    queries = embeddings[:20]
+    expected = brute_force(embeddings, queries, K)
+    for i, (rows, _) in enumerate(reopened.search(queries, K)):
+        assert set(rows) == set(expected[i])
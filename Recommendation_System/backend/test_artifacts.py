@@ -0,0 +1,108 @@
+"""
+Pickle-free artifacts: convert/verify round trip from the legacy pickles and memory-mapped loading.
+"""
+import json
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.recommendation_model import artifacts
+from app.recommendation_model.neighbour_index import rank_row
+from app.recommendation_model.quantize import QuantizedSimilarity, similarity_from_arrays
+
+N = 120
+K = 10
+
+
+@pytest.fixture
+def pickles(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifacts, "ARTIFACTS_DIR", tmp_path / "artifacts")
+    monkeypatch.setattr(artifacts, "CURRENT_FILE", tmp_path / "artifacts" / "CURRENT")
+    rng = np.random.default_rng(5)
+    movie_df = pd.DataFrame({
+        "id": rng.choice(np.arange(1, 10**6), size=N, replace=False),
+        "title": [f"Movie {i}" for i in range(N)],
+        "genres": [["Drama"] if i % 2 else ["Comedy", "Drama"] for i in range(N)],
+        "release_date": [f"{1960 + i % 60}-01-01" for i in range(N)],
+        "original_language": ["en" if i % 3 else "fr" for i in range(N)],
+        "popularity": rng.random(N) * 100,
+    })
+    vectors = rng.random((N, 16)) ** 3
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    vector = vectors @ vectors.T
+    movie_df_path, vector_path = tmp_path / "movie_df.pkl", tmp_path / "vector.pkl"
+    movie_df_path.write_bytes(pickle.dumps(movie_df))
+    vector_path.write_bytes(pickle.dumps(vector))
+    return movie_df_path, vector_path, movie_df, vector
+
+
+def test_convert_then_verify(pickles):
+    movie_df_path, vector_path, movie_df, vector = pickles
+    manifest = artifacts.convert(movie_df_path, vector_path, k=K, keep_dense=False, version="v1")
+    assert artifacts.current_version() == "v1" and manifest["movies"] == N
+    assert {"ids", "titles", "popularity", "neighbour_rows", "neighbour_scores"} <= set(manifest["arrays"])
+    assert "similarity" not in manifest["arrays"]
+    assert artifacts.verify(movie_df_path, vector_path, None, top=K) == 0
+
+    artifact = artifacts.load_artifact(artifacts.ARTIFACTS_DIR / "v1")
+    assert (artifact.get("ids") == movie_df["id"].to_numpy()).all()
+    for row in (0, 17, N - 1):
+        expected = rank_row(vector[row], row, K)
+        assert (artifact.get("neighbour_rows")[row] == expected).all()
+        assert np.allclose(artifact.get("neighbour_scores")[row], vector[row, expected], atol=1e-3)
+
+
+def test_verify_catches_a_wrong_neighbour_list(pickles):
+    movie_df_path, vector_path, _, _ = pickles
+    artifacts.convert(movie_df_path, vector_path, k=K, keep_dense=False, version="v1")
+    rows_path = artifacts.ARTIFACTS_DIR / "v1" / "neighbour_rows.npy"
+    rows = np.load(rows_path)
+    rows[3, [0, 1]] = rows[3, [1, 0]]
+    np.save(rows_path, rows)
+    assert artifacts.verify(movie_df_path, vector_path, "v1", top=K) == 1
+
+
+@pytest.mark.parametrize("dtype", ["float64", "float16", "int8"])
+def test_keep_dense(pickles, dtype):
+    movie_df_path, vector_path, _, vector = pickles
+    manifest = artifacts.convert(movie_df_path, vector_path, k=K, keep_dense=True, version=dtype,
+                                 similarity_dtype=dtype)
+    assert manifest["similarity_dtype"] == dtype
+    similarity = similarity_from_arrays(artifacts.load_artifact(artifacts.ARTIFACTS_DIR / dtype).arrays)
+    assert similarity.shape == (N, N)
+    assert isinstance(similarity, QuantizedSimilarity) == (dtype == "int8")
+    # int8 clips the self-similarity on the diagonal, which is never ranked.
+    error = np.abs(np.asarray(similarity[5], dtype=np.float64) - vector[5])
+    assert np.delete(error, 5).max() < 0.01
+
+
+def test_arrays_are_memory_mapped_read_only(pickles):
+    movie_df_path, vector_path, _, _ = pickles
+    artifacts.convert(movie_df_path, vector_path, k=K, keep_dense=False, version="v1")
+    mapped = artifacts.load_artifact(artifacts.ARTIFACTS_DIR / "v1")
+    for array in mapped.arrays.values():
+        assert isinstance(array, np.memmap) and not array.flags.writeable
+    with pytest.raises(ValueError):
+        mapped.get("neighbour_rows")[0, 0] = 1
+    loaded = artifacts.load_artifact(artifacts.ARTIFACTS_DIR / "v1", mmap=False)
+    assert not isinstance(loaded.get("ids"), np.memmap)
+    assert (loaded.get("neighbour_rows") == mapped.get("neighbour_rows")).all()
+
+
+def test_manifest_mismatches_are_rejected(tmp_path):
+    arrays = {"ids": np.arange(4), "titles": np.array(list("abcd")), "popularity": np.ones(4)}
+    artifacts.write_artifact(tmp_path, arrays, "v1")
+    manifest = json.loads((tmp_path / artifacts.MANIFEST_NAME).read_text())
+
+    np.save(tmp_path / "popularity.npy", np.ones(5))
+    with pytest.raises(ValueError, match="does not match its manifest entry"):
+        artifacts.load_artifact(tmp_path)
+    np.save(tmp_path / "popularity.npy", np.ones(4))
+
+    (tmp_path / artifacts.MANIFEST_NAME).write_text(json.dumps({**manifest, "format_version": 99}))
+    with pytest.raises(ValueError, match="unsupported artifact format"):
+        artifacts.load_artifact(tmp_path)
+    with pytest.raises(ValueError, match="missing required arrays"):
+        artifacts.write_artifact(tmp_path / "bad", {"ids": np.arange(3)}, "bad")
@@ -0,0 +1,79 @@
+"""
+Multi-seed recommendations: per-seed lists and the weighted blend, dense and neighbour-index models.
+"""
+import numpy as np
+import pytest
+
+from app.cache.cache import TTLCache
+from app.recommendation_model import recommand
+from app.recommendation_model.model_registry import LoadedModel, ModelRegistry
+from app.recommendation_model.title_index import TitleIndex
+
+N = 30
+IDS = np.arange(700, 700 + N, dtype=np.int64)
+TITLES = np.array([f"Seed Movie {i:02d}" for i in range(N)])
+
+
+def _similarity():
+    rng = np.random.default_rng(4)
+    similarity = rng.random((N, N))
+    similarity = (similarity + similarity.T) / 2
+    np.fill_diagonal(similarity, 1.0)
+    return similarity
+
+
+def _model(similarity, backend):
+    if backend == "dense":
+        return LoadedModel("dense", IDS, TITLES, vector=similarity, title_index=TitleIndex(IDS, TITLES))
+    # Full-depth neighbour lists blend to exactly the dense scores.
+    rows = np.array([[r for r in np.argsort(-similarity[i], kind="stable") if r != i] for i in range(N)])
+    return LoadedModel("neighbours", IDS, TITLES, neighbour_rows=rows,
+                       neighbour_scores=np.take_along_axis(similarity, rows, axis=1),
+                       title_index=TitleIndex(IDS, TITLES))
+
+
+def _expected_blend(similarity, rows, weights, limit):
+    scores = np.asarray(weights, dtype=np.float64) @ similarity[rows]
+    scores[rows] = -np.inf
+    return IDS[np.argsort(-scores, kind="stable")[:limit]].tolist()
+
+
+@pytest.fixture(params=["dense", "neighbours"])
+def similarity(request, monkeypatch):
+    similarity = _similarity()
+    registry = ModelRegistry()
+    registry.activate(_model(similarity, request.param))
+    monkeypatch.setattr(recommand, "registry", registry)
+    monkeypatch.setattr(recommand, "ranked_cache", TTLCache(max_entries=100))
+    return similarity
+
+
+def test_blend_follows_the_weights_and_excludes_seeds(similarity):
+    result = recommand.recommand_batch([("Seed Movie 02", None, 1.0), (None, int(IDS[7]), 3.0)], limit=10)
+    assert [seed["tmdb_id"] for seed in result["seeds"]] == [IDS[2], IDS[7]]
+    assert result["blended"] == _expected_blend(similarity, [2, 7], [1.0, 3.0], 10)
+    assert not {IDS[2], IDS[7]} & set(result["blended"])
+
+    # Scaling every weight keeps the ranking; a zero weight leaves only the other seed.
+    scaled = recommand.recommand_batch([("Seed Movie 02", None, 2.0), (None, int(IDS[7]), 6.0)], limit=10)
+    assert scaled["blended"] == result["blended"]
+    alone = recommand.recommand_batch([("Seed Movie 02", None, 1.0), (None, int(IDS[7]), 0.0)], limit=10)
+    ranked = recommand.recommand_similar("Seed Movie 02", 0, 11)
+    assert alone["blended"] == [movie_id for movie_id in ranked if movie_id != IDS[7]][:10]
+
+
+def test_per_seed_lists_match_the_single_seed_ranking(similarity):
+    result = recommand.recommand_batch([("Seed Movie 05", None, 1.0), ("Seed Movie 11", None, 1.0)], limit=6)
+    assert result["seeds"][0]["movies"] == recommand.recommand_similar("Seed Movie 05", 0, 6)
+    assert result["seeds"][1]["movies"] == recommand.recommand_similar("Seed Movie 11", 0, 6)
+
+
+def test_tmdb_id_wins_and_unknown_seeds_are_reported(similarity):
+    result = recommand.recommand_batch(
+        [("Seed Movie 01", int(IDS[4]), 1.0), ("No such movie", None, 1.0), (None, 1, 1.0)], limit=5
+    )
+    assert result["seeds"][0]["tmdb_id"] == IDS[4]
+    assert result["seeds"][1:] == [{"error": "Movie not found"}] * 2
+    # Unknown seeds do not take part in the blend.
+    assert result["blended"] == _expected_blend(similarity, [4], [1.0], 5)
+    assert recommand.recommand_batch([("No such movie", None, 1.0)])["blended"] == []
@@ -0,0 +1,97 @@
+"""
+Sparse TF-IDF build, pooled neighbour ranking and incremental updates on a small corpus.
+"""
+import numpy as np
+import pytest
+
+from app.recommendation_model import artifacts, build_model
+from app.recommendation_model.build_model import (FEATURE_ARRAYS, block_memory_mib, build_features,
+                                                  compute_neighbours, incremental_update, load_features,
+                                                  product_rows)
+from app.recommendation_model.filter_index import FILTER_VOCABULARIES
+from app.recommendation_model.topk import top_k_block
+
+K = 12
+WORDS = [f"w{i}" for i in range(80)]
+
+
+def _docs(first_id, count, seed):
+    rng = np.random.default_rng(seed)
+    # Skewed word frequencies give a mix of close, distant and tied neighbours.
+    p = 1.0 / np.arange(1, len(WORDS) + 1)
+    return [{
+        "id": first_id + i,
+        "title": f"Movie {first_id + i}",
+        "tags": " ".join(rng.choice(WORDS, size=rng.integers(3, 9), p=p / p.sum())),
+        "genres": ["Drama"] if i % 3 else ["Comedy"],
+        "release_date": f"{1970 + i % 50}-01-01",
+        "original_language": "en",
+    } for i in range(count)]
+
+
+@pytest.fixture(scope="module")
+def catalogue():
+    return build_features([_docs(1, 150, seed=1), _docs(151, 150, seed=2)], max_features=60)
+
+
+def test_tfidf_features(catalogue):
+    arrays, features, vocabulary, idf = catalogue
+    assert features.shape == (300, 60) == (len(arrays["ids"]), len(vocabulary))
+    assert np.allclose(np.sqrt(features.multiply(features).sum(axis=1)), 1.0)
+    assert arrays["ids"].tolist() == list(range(1, 301))
+    # Rarer terms weigh more.
+    df = np.bincount(features.indices, minlength=len(vocabulary))
+    assert np.all(np.diff(idf[np.argsort(df, kind="stable")]) <= 1e-6)
+
+
+def test_pooled_blocks_match_a_dense_ranking(catalogue):
+    _, features, _, _ = catalogue
+    rows, scores = compute_neighbours(features, K, block_size=32, workers=2)
+    serial = compute_neighbours(features, K, block_size=300, workers=1)
+    assert (rows == serial[0]).all() and (scores == serial[1]).all()
+
+    dense = (features @ features.T).toarray()
+    expected = top_k_block(dense, K, exclude=np.arange(len(dense)))
+    assert (scores == np.take_along_axis(dense, expected, axis=1).astype(np.float16)).all()
+    assert (rows == expected).all()
+
+
+def test_large_catalogues_multiply_fewer_rows_at_a_time(catalogue, monkeypatch):
+    _, features, _, _ = catalogue
+    expected = compute_neighbours(features, K, block_size=64, workers=1)
+    assert product_rows(300, 256) == 256
+    assert product_rows(1_000_000, 256) == 8 and product_rows(10**8, 256) == 1
+    assert block_memory_mib(1_000_000, 256) == pytest.approx(8 * 1_000_000 * 20 / 2**20)
+
+    # Three rows per product, all ranked dense.
+    monkeypatch.setattr(build_model, "DENSE_BLOCK_MAX_BYTES", 8 * 300 * 3)
+    monkeypatch.setattr(build_model, "DENSE_BLOCK_DENSITY", 0.0)
+    assert product_rows(300, 64) == 3
+    rows, scores = compute_neighbours(features, K, block_size=64, workers=1)
+    assert (rows == expected[0]).all() and (scores == expected[1]).all()
+
+
+def test_incremental_update_matches_a_full_rebuild(catalogue, tmp_path):
+    arrays, features, vocabulary, idf = catalogue
+    arrays = dict(arrays)
+    arrays["neighbour_rows"], arrays["neighbour_scores"] = compute_neighbours(features, K, block_size=64, workers=2)
+    arrays.update({"feature_indptr": features.indptr, "feature_indices": features.indices,
+                   "feature_data": features.data, "vocabulary": vocabulary, "idf": idf})
+    artifacts.write_artifact(tmp_path / "v1", arrays, "v1", {"k": K}, unaligned=FEATURE_ARRAYS + FILTER_VOCABULARIES)
+    base = artifacts.load_artifact(tmp_path / "v1")
+
+    # 40 new movies, plus documents the base already has (skipped).
+    batches = [_docs(301, 25, seed=3), _docs(326, 15, seed=4) + _docs(1, 5, seed=1)]
+    updated, added, patched = incremental_update(base, batches, block_size=16, workers=2)
+    assert added == 40 and 0 < patched < 300
+    assert updated["ids"].tolist() == list(range(1, 341))
+    assert len(updated["years"]) == len(updated["genre_bits"]) == 340
+
+    # Full rebuild over the same (not re-fitted) features.
+    combined = load_features(updated)
+    assert (combined[:300] != features).nnz == 0
+    rows, scores = compute_neighbours(combined, K, block_size=64, workers=1)
+    assert (updated["neighbour_scores"] == scores).all()
+    assert (updated["neighbour_rows"] == rows).all()
+
+    assert incremental_update(base, [_docs(1, 300, seed=1)]) is None
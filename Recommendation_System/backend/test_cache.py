@@ -0,0 +1,102 @@
+"""
+TTLCache: LRU order, byte budget, negative and stale entries, counters.
+"""
+from app.cache.cache import MISSING, TTLCache, json_size
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_order():
+    cache = TTLCache(max_entries=3)
+    for key in "abc":
+        cache.set(key, key.upper())
+    assert cache.get("a") == "A"  # "b" is now the least recently used
+    cache.set("d", "D")
+    assert "b" not in cache and list(cache._data) == ["c", "a", "d"]
+    # Overwriting refreshes recency too.
+    cache.set("c", "C2")
+    cache.set("e", "E")
+    assert list(cache._data) == ["d", "c", "e"]
+    assert cache.stats()["evictions"] == 2
+
+
+def test_byte_budget():
+    cache = TTLCache(max_entries=100, max_bytes=10, sizeof=len)
+    cache.set("a", "xxxx")
+    cache.set("b", "yyyy")
+    assert cache.stats()["bytes"] == 8
+    cache.set("c", "zzzz")  # 12 bytes: "a" goes
+    assert "a" not in cache and cache.stats()["bytes"] == 8
+    cache.set("b", "y")
+    assert cache.stats()["bytes"] == 5
+    # A value larger than the whole budget is not cached and evicts nothing.
+    cache.set("huge", "w" * 11)
+    assert "huge" not in cache and len(cache) == 2
+    cache.pop("c")
+    assert cache.stats()["bytes"] == 1
+    cache.clear()
+    assert cache.stats()["bytes"] == 0 and len(cache) == 0
+
+
+def test_default_sizeof_is_the_json_length():
+    movie = {"id": 1, "title": "Heat"}
+    cache = TTLCache(max_bytes=1000)
+    cache.set(1, movie)
+    assert cache.stats()["bytes"] == json_size(movie) == len('{"id":1,"title":"Heat"}')
+
+
+def test_negative_entries():
+    clock = Clock()
+    cache = TTLCache(ttl=100, negative_ttl=5, max_bytes=1000, clock=clock)
+    cache.set_negative(404)
+    assert 404 in cache and cache.get(404) is None
+    assert cache.stats()["bytes"] == 0
+    clock.now = 5
+    assert cache.get(404) is MISSING
+    stats = cache.stats()
+    assert (stats["negative_hits"], stats["misses"], stats["expirations"]) == (1, 1, 1)
+
+
+def test_get_stale():
+    clock = Clock()
+    cache = TTLCache(ttl=10, stale_ttl=20, clock=clock)
+    cache.set("k", "v")
+    assert cache.get_stale("k") == ("v", False)
+    clock.now = 15
+    assert cache.get("k") is MISSING  # expired for ``get`` ...
+    assert cache.get_stale("k") == ("v", True)  # ... but still served as stale
+    clock.now = 30
+    assert cache.get_stale("k") == (MISSING, False)
+    assert cache.get_stale("never") == (MISSING, False)
+    stats = cache.stats()
+    assert (stats["stale_hits"], stats["expirations"], stats["entries"]) == (1, 1, 0)
+
+
+def test_per_entry_ttl():
+    clock = Clock()
+    cache = TTLCache(ttl=100, clock=clock)
+    cache.set("short", 1, ttl=1)
+    cache.set("long", 2)
+    clock.now = 1
+    assert cache.get("short") is MISSING and cache.get("long") == 2
+
+
+def test_hit_and_miss_counters():
+    cache = TTLCache()
+    cache.set("a", 1)
+    cache.set_negative("b")
+    cache.get("a")
+    cache.get("a")
+    cache.get("b")
+    cache.get("c")
+    assert "a" in cache and "c" not in cache  # not counted
+    stats = cache.stats()
+    assert (stats["hits"], stats["negative_hits"], stats["misses"]) == (2, 1, 1)
+    assert stats["hit_ratio"] == 0.75
+    assert TTLCache().stats()["hit_ratio"] == 0.0
@@ -0,0 +1,103 @@
+"""
+TMDB circuit breaker: fail fast while TMDB is down, serve stale details,
+close again once a background probe passes.
+"""
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.cache.cache import MISSING, TTLCache
+from app.cache.circuit_breaker import CLOSED, OPEN, CircuitBreaker
+from app.cache.rate_limit import BackoffScheduler, TokenBucket
+from app.cache.single_flight import SingleFlight
+from app.routes import recommendation
+from benchmarks.tmdb_stub import TMDBStub
+
+
+def _wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_opens_on_failure_ratio_and_closes_after_probe():
+    probe_results = [False, True]
+    breaker = CircuitBreaker(lambda: probe_results.pop(0), min_calls=4, open_seconds=0.05)
+    for ok in (True, False, True):
+        breaker.record(ok)
+    assert breaker.allow()
+    breaker.record(False, "HTTP 502")
+    assert breaker.state == OPEN and not breaker.allow()
+
+    # First probe fails: open again, for twice as long.
+    assert _wait_for(lambda: breaker.stats()["probes"] == 1 and breaker.state == OPEN)
+    assert breaker.stats()["opens"] == 2
+    assert _wait_for(lambda: breaker.state == CLOSED)
+    assert breaker.allow()
+    stats = breaker.stats()
+    assert stats["probes"] == 2 and stats["rejected"] == 1 and stats["window_calls"] == 0
+
+
+def test_stale_entries():
+    now = [0.0]
+    cache = TTLCache(ttl=10, stale_ttl=100, clock=lambda: now[0])
+    cache.set("a", {"id": 1})
+    now[0] = 50
+    assert cache.get("a") is MISSING and "a" not in cache
+    assert cache.get_stale("a") == ({"id": 1}, True)
+    cache.set("b", {"id": 2})
+    assert cache.get_stale("b") == ({"id": 2}, False)
+    now[0] = 111
+    assert cache.get_stale("a") == (MISSING, False)
+    assert cache.stats()["stale_hits"] == 1 and len(cache) == 1
+
+
+def test_outage_serves_stale_and_fails_fast(monkeypatch):
+    breaker = CircuitBreaker(lambda: False, min_calls=2, open_seconds=60)
+    cache = TTLCache(ttl=0.05, stale_ttl=60)
+    monkeypatch.setattr(recommendation.settings, "MOVIE_STORE_ENABLED", False)
+    monkeypatch.setattr(recommendation, "tmdb_breaker", breaker)
+    monkeypatch.setattr(recommendation, "movie_cache", cache)
+    monkeypatch.setattr(recommendation, "tmdb_limiter", TokenBucket(rate=1000, burst=100))
+    monkeypatch.setattr(recommendation, "tmdb_flights", SingleFlight())
+    monkeypatch.setattr(recommendation, "tmdb_retries", BackoffScheduler(recommendation.tmdb_executor))
+    saved = []
+    monkeypatch.setattr(recommendation, "_save_to_store", saved.extend)
+
+    stub = TMDBStub(latency=0.0).start()
+    monkeypatch.setattr(recommendation, "tmdb_base_url", stub.base_url)
+    assert recommendation.fetch_movie_from_tmdb(501)["id"] == 501
+    stub.stop()
+    time.sleep(0.06)
+
+    # TMDB is gone: a single fetch only ever returns TMDB data, and the
+    # failures trip the breaker.
+    assert recommendation.fetch_movie_from_tmdb(501, retries=1) is None
+    assert recommendation.fetch_movie_from_tmdb(502, retries=1) is None
+    assert breaker.state == OPEN
+
+    started = time.perf_counter()
+    movies = recommendation.fetch_multiple_movies([501, 503, 504])
+    assert time.perf_counter() - started < 0.1
+    # Lists serve the expired copy, which is not written back to the store.
+    assert movies[0]["id"] == 501 and "production_companies" in movies[0]
+    assert saved == []
+    assert [movie["status"] for movie in movies[1:]] == ["unavailable", "unavailable"]
+    assert breaker.stats()["rejected"] >= 3
+    assert recommendation.tmdb_retries.stats()["pending"] == 0
+
+
+def test_open_breaker_is_503_with_retry_after(monkeypatch):
+    breaker = CircuitBreaker(lambda: False, open_seconds=42)
+    monkeypatch.setattr(recommendation, "tmdb_breaker", breaker)
+    monkeypatch.setattr(recommendation, "search_titles", lambda query, limit: [])
+    breaker._open(breaker._clock())
+
+    for build in (lambda: recommendation._top_rated_payload(7.0, 1000, 1),
+                  lambda: recommendation._search_payload("nothing local", 5)):
+        with pytest.raises(HTTPException) as raised:
+            build()
+        assert raised.value.status_code == 503
+        assert 41 <= int(raised.value.headers["Retry-After"]) <= 42
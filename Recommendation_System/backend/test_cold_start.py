@@ -0,0 +1,102 @@
+"""
+Cold-start pool: alias-table sampling, seeded samples and the catalogue refresh.
+"""
+import numpy as np
+import pytest
+
+from app.recommendation_model import cold_start, recommand
+from app.recommendation_model.cold_start import ColdStartPool, PoolSnapshot, alias_table
+from app.recommendation_model.model_registry import LoadedModel, ModelRegistry
+
+
+def _pool(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    pool = ColdStartPool()
+    pool.replace(np.arange(1000, 1000 + n), rng.gamma(0.5, size=n) + 1e-3, "test")
+    return pool
+
+
+@pytest.mark.parametrize("weights", [[1.0], [1, 1, 1, 1], [5, 1, 0.5, 0.01, 3], np.arange(1, 200) ** 2])
+def test_alias_table_encodes_the_weights(weights):
+    weights = np.asarray(weights, dtype=np.float64)
+    prob, alias = alias_table(weights)
+    n = len(weights)
+    # Column i keeps itself with prob[i] and hands 1 - prob[i] to alias[i].
+    implied = prob.copy()
+    np.add.at(implied, alias, 1.0 - prob)
+    assert np.allclose(implied / n, weights / weights.sum())
+
+
+def test_samples_follow_the_weights():
+    snapshot = PoolSnapshot(np.arange(5), np.array([8.0, 4.0, 2.0, 1.0, 1.0]), "test", 1)
+    rng = np.random.default_rng(1)
+    counts = np.bincount([snapshot.sample(1, rng)[0] for _ in range(20000)], minlength=5)
+    assert np.abs(counts / counts.sum() - snapshot.weights / snapshot.weights.sum()).max() < 0.02
+
+
+def test_samples_are_distinct():
+    pool = _pool(n=100)
+    assert len(set(pool.sample(72))) == 72
+    assert sorted(pool.sample(500)) == list(range(1000, 1100))
+
+
+def test_seeded_samples_are_stable_until_refresh():
+    pool = _pool()
+    first = pool.sample(72, seed="ana@example.com")
+    assert pool.sample(72, seed="ana@example.com") == first
+    assert _pool().sample(72, seed="ana@example.com") == first  # same pool in another worker
+    assert pool.sample(72, seed="bo@example.com") != first
+    pool.replace(pool.snapshot.ids, pool.snapshot.weights, "test")
+    assert pool.sample(72, seed="ana@example.com") != first
+
+
+def test_recommand_sample_30(monkeypatch):
+    monkeypatch.setattr(recommand, "cold_start_pool", _pool())
+    sample = recommand.recommand_sample_30("ana@example.com")
+    assert len(sample) == recommand.COLD_START_SAMPLE_SIZE == len(set(sample))
+    assert recommand.recommand_sample_30("ana@example.com") == sample
+    assert recommand.recommand_sample_30() != sample
+
+    monkeypatch.setattr(recommand, "cold_start_pool", ColdStartPool())
+    monkeypatch.setattr(recommand, "registry", ModelRegistry())
+    assert 603 in recommand.recommand_sample_30("ana@example.com")  # curated fallback
+
+
+class _Collection:
+    def __init__(self, docs=None, error=None):
+        self.docs, self.error, self.calls = docs or [], error, []
+
+    def find(self, query, projection=None, **kwargs):
+        self.calls.append((query, projection))
+        if self.error:
+            raise self.error
+        return iter(self.docs)
+
+
+def test_refresh_reads_only_the_projected_fields(monkeypatch):
+    docs = [{"id": 1, "popularity": 50, "vote_average": 8, "vote_count": 2000},
+            {"tmdb_id": 2, "tmdb_details": {"popularity": 5, "vote_average": 6, "vote_count": 10}},
+            {"movieId": 3}]
+    collection = _Collection(docs)
+    pool = ColdStartPool()
+    monkeypatch.setattr(recommand, "movie_data", collection)
+    monkeypatch.setattr(recommand, "cold_start_pool", pool)
+
+    assert recommand.refresh_cold_start_pool()
+    assert collection.calls == [({}, cold_start.PROJECTION)]
+    assert pool.stats()["source"] == "catalogue"
+    weights = dict(zip(pool.snapshot.ids.tolist(), pool.snapshot.weights.tolist()))
+    assert sorted(weights) == [1, 2, 3] and weights[1] > weights[2] > 0 and weights[3] > 0
+
+
+def test_refresh_falls_back_to_the_model(monkeypatch):
+    registry = ModelRegistry()
+    registry.activate(LoadedModel("test", np.array([7, 8, 9]), np.array(["a", "b", "c"])))
+    pool = ColdStartPool()
+    monkeypatch.setattr(recommand, "movie_data", _Collection(error=RuntimeError("mongo down")))
+    monkeypatch.setattr(recommand, "cold_start_pool", pool)
+    monkeypatch.setattr(recommand, "registry", registry)
+
+    assert not recommand.refresh_cold_start_pool()
+    assert pool.stats()["source"] == "model test" and pool.failures == 1
+    assert sorted(pool.sample(10)) == [7, 8, 9]
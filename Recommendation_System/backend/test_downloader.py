@@ -0,0 +1,149 @@
+"""
+Segmented, resumable model artifact downloads against a local HTTP server.
+"""
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+import requests
+
+from app.recommendation_model import artifacts, downloader, recommand
+from app.recommendation_model.downloader import ChecksumError, download, sha256_file
+from benchmarks.artifact_server import ArtifactServer, write_random_file
+
+SIZE = 2 * 1024 * 1024 + 123
+# Reads smaller than what the server sends before dropping, so the cut-off
+# responses leave whole chunks on disk.
+CHUNK = 64 * 1024
+
+
+@pytest.fixture
+def artifact(tmp_path, monkeypatch):
+    # Small segments so a 2 MiB file is split like a large one.
+    monkeypatch.setattr(downloader, "MIN_SEGMENT_SIZE", 256 * 1024)
+    root = tmp_path / "served"
+    root.mkdir()
+    write_random_file(root / "vectors.npy", SIZE)
+    return root / "vectors.npy"
+
+
+def _paths(target):
+    return target.with_suffix(".npy.tmp"), target.with_suffix(".npy.tmp.parts")
+
+
+def test_segmented_range_download(artifact, tmp_path):
+    target = tmp_path / "out" / "vectors.npy"
+    with ArtifactServer(artifact.parent) as server:
+        stats = download(f"{server.base_url}/vectors.npy", target, sha256=sha256_file(artifact), segments=4)
+
+    assert stats["segments"] == 4 and stats["bytes"] == SIZE and stats["resumed_bytes"] == 0
+    assert server.requests == 1 + 4  # probe + one request per segment
+    assert target.read_bytes() == artifact.read_bytes()
+    assert not any(p.exists() for p in _paths(target))
+
+
+def test_resume_after_interrupted_segments(artifact, tmp_path):
+    target = tmp_path / "vectors.npy"
+    tmp, parts = _paths(target)
+    with ArtifactServer(artifact.parent, drop_after=300 * 1024, drop_requests=100) as server:
+        with pytest.raises(requests.RequestException):
+            download(f"{server.base_url}/vectors.npy", target, segments=2, retries=0, chunk_size=CHUNK)
+        assert tmp.exists() and parts.exists() and not target.exists()
+        state = json.loads(parts.read_text())
+        done = sum(segment[2] for segment in state["segments"])
+        assert 0 < done < SIZE
+
+        server.drop_requests = 0
+        sent_before = server.bytes_sent
+        stats = download(f"{server.base_url}/vectors.npy", target, sha256=sha256_file(artifact), segments=2)
+
+    assert stats["resumed_bytes"] == done
+    assert server.bytes_sent - sent_before == SIZE - done + 1  # + the probe byte
+    assert target.read_bytes() == artifact.read_bytes()
+    assert not tmp.exists() and not parts.exists()
+
+
+def test_changed_file_is_not_resumed(artifact, tmp_path):
+    target = tmp_path / "vectors.npy"
+    with ArtifactServer(artifact.parent, drop_after=300 * 1024, drop_requests=100) as server:
+        url = f"{server.base_url}/vectors.npy"
+        with pytest.raises(requests.RequestException):
+            download(url, target, segments=2, retries=0, chunk_size=CHUNK)
+        old_validator = json.loads(_paths(target)[1].read_text())["validator"]
+
+        # A new version of the artifact: new content, new ETag.
+        write_random_file(artifact, SIZE)
+        stat = artifact.stat()
+        os.utime(artifact, (stat.st_atime, stat.st_mtime + 10))
+        server.drop_requests = 0
+
+        # If-Range with the old validator: the server answers 200 with the
+        # whole new file, which a segment must refuse.
+        progress = downloader._Progress(_paths(target)[1], SIZE, old_validator, [[0, SIZE - 1, 0]])
+        with pytest.raises(RuntimeError, match="ignored the range request"):
+            downloader._fetch_segment(requests.Session(), url, _paths(target)[0], progress.segments[0],
+                                      progress, 1 << 20, 10, retries=0)
+
+        stats = download(url, target, sha256=sha256_file(artifact), segments=2)
+
+    assert stats["resumed_bytes"] == 0
+    assert target.read_bytes() == artifact.read_bytes()
+
+
+def test_single_stream_without_range_support(artifact, tmp_path):
+    target = tmp_path / "vectors.npy"
+    with ArtifactServer(artifact.parent, ranges=False) as server:
+        stats = download(f"{server.base_url}/vectors.npy", target, sha256=sha256_file(artifact), segments=4)
+
+    assert stats["segments"] == 1 and stats["bytes"] == SIZE
+    assert server.requests == 2  # probe (answered in full) + the stream
+    assert target.read_bytes() == artifact.read_bytes()
+
+
+@pytest.mark.parametrize("ranges", [True, False])
+def test_checksum_error_discards_partial_files(artifact, tmp_path, ranges):
+    target = tmp_path / "vectors.npy"
+    with ArtifactServer(artifact.parent, ranges=ranges) as server:
+        with pytest.raises(ChecksumError):
+            download(f"{server.base_url}/vectors.npy", target, sha256="0" * 64, segments=4)
+
+    assert not target.exists()
+    assert not any(p.exists() for p in _paths(target))
+
+
+def test_preallocated_tmp_without_parts_is_not_resumed(artifact, tmp_path):
+    target = tmp_path / "vectors.npy"
+    tmp, parts = _paths(target)
+    # What a worker killed between preallocating and saving progress leaves.
+    with open(tmp, "wb") as f:
+        f.truncate(SIZE)
+    with ArtifactServer(artifact.parent) as server:
+        stats = download(f"{server.base_url}/vectors.npy", target, sha256=sha256_file(artifact), segments=2)
+
+    assert stats["resumed_bytes"] == 0
+    assert target.read_bytes() == artifact.read_bytes()
+    assert not tmp.exists() and not parts.exists()
+
+
+def test_workers_share_one_artifact_download(tmp_path, monkeypatch):
+    published = tmp_path / "published"
+    arrays = {"ids": np.arange(50, dtype=np.int64), "titles": np.array([f"Movie {i}" for i in range(50)])}
+    artifacts.write_artifact(published, arrays, "v7")
+    local = tmp_path / "artifacts"
+    monkeypatch.setattr(artifacts, "ARTIFACTS_DIR", local)
+    monkeypatch.setattr(artifacts, "CURRENT_FILE", local / "CURRENT")
+
+    with ArtifactServer(published) as server:
+        monkeypatch.setenv("MODEL_ARTIFACT_URL", server.base_url)
+        # Each thread opens the lock file itself, like a separate worker would.
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            targets = list(pool.map(lambda _: recommand._ensure_artifact(), range(4)))
+
+    assert targets == [local / "v7"] * 4
+    assert artifacts.current_version() == "v7"
+    assert (artifacts.load_artifact(local / "v7").arrays["ids"] == arrays["ids"]).all()
+    assert sorted(p.name for p in local.iterdir()) == ["CURRENT", "download.lock", "v7"]
+    # manifest + two arrays, each probed and then fetched, by a single worker
+    assert server.requests == 3 * 2
@@ -0,0 +1,119 @@
+"""
+Genre / year / language filters and browse pages against a plain pandas filter.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.recommendation_model import artifacts, filter_index, recommand
+from app.recommendation_model.filter_index import FilterIndex, MovieFilter
+from app.recommendation_model.model_registry import LoadedModel, ModelRegistry
+
+GENRES = ["Action", "Comedy", "Drama", "Science Fiction", "Horror", "Romance"]
+LANGUAGES = ["en", "fr", "ja", "ko", ""]
+FILTERS = [
+    dict(genre="Drama"),
+    dict(genre="Action,Science Fiction"),
+    dict(genre="scifi", year_from=1990),
+    dict(year_from=1980, year_to=1999),
+    dict(year_to=1975),
+    dict(lang="fr"),
+    dict(genre="Comedy", year_from=2000, lang="en"),
+    dict(genre="Romance,Horror", year_to=2010, lang="ja"),
+    dict(genre="Western"),   # a TMDB genre no movie has
+    dict(lang="xx"),         # a language no movie has
+]
+
+
+@pytest.fixture(scope="module")
+def movies():
+    rng = np.random.default_rng(20)
+    n = 3000
+    years = rng.integers(1950, 2025, size=n)
+    return pd.DataFrame({
+        "id": np.arange(100, 100 + n),
+        "title": [f"Movie {i}" for i in range(n)],
+        "genres": [sorted(rng.choice(GENRES, size=rng.integers(0, 4), replace=False).tolist()) for _ in range(n)],
+        # Some movies have no release date, hence no year.
+        "release_date": [f"{y}-05-01" if rng.random() > 0.05 else "" for y in years],
+        "original_language": rng.choice(LANGUAGES, size=n, p=[0.5, 0.2, 0.15, 0.1, 0.05]),
+        # Few distinct values, so the popularity order has many ties.
+        "popularity": rng.integers(0, 50, size=n).astype(float),
+    })
+
+
+@pytest.fixture(scope="module")
+def index(movies):
+    return FilterIndex.from_arrays(artifacts.arrays_from_movie_df(movies))
+
+
+def _expected(movies, genre=None, year_from=None, year_to=None, lang=None):
+    """Matching TMDB ids, most popular first, ties in row order."""
+    aliases = {"scifi": "Science Fiction"}
+    wanted = {aliases.get(g, g) for g in genre.split(",")} if genre else set()
+    year = pd.to_numeric(movies["release_date"].str[:4], errors="coerce").fillna(0)
+    match = movies["genres"].apply(lambda genres: wanted <= set(genres))
+    if year_from is not None:
+        match &= year >= year_from
+    if year_to is not None:
+        match &= (year > 0) & (year <= year_to)
+    if lang is not None:
+        match &= movies["original_language"] == lang
+    return movies[match].sort_values("popularity", ascending=False, kind="stable")["id"].tolist()
+
+
+@pytest.mark.parametrize("query", FILTERS, ids=str)
+def test_mask_matches_pandas(movies, index, query):
+    mask = index.mask(MovieFilter.parse(**query))
+    assert sorted(movies["id"][mask].tolist()) == sorted(_expected(movies, **query))
+    assert index.mask(MovieFilter.parse(**query)) is mask  # cached per filter
+    assert not mask.flags.writeable
+
+
+def test_genre_bitsets(movies, index):
+    for name in GENRES:
+        expected = movies["genres"].apply(lambda genres: name in genres).to_numpy()
+        bits = np.unpackbits(index.genre_bitsets[filter_index.genre_key(name)], count=index.n).astype(bool)
+        assert (bits == expected).all()
+    assert index.describe()["genres"] == {name: int(movies["genres"].apply(lambda g: name in g).sum())
+                                          for name in index.genre_names}
+
+
+def test_unknown_genre_is_an_error(index):
+    with pytest.raises(ValueError, match="unknown genre"):
+        index.mask(MovieFilter.parse(genre="Space Opera"))
+
+
+@pytest.mark.parametrize("query", [None] + FILTERS, ids=str)
+def test_browse_pages_match_pandas(movies, index, query, monkeypatch):
+    # Small chunks, so pages walk the popularity order in several steps.
+    monkeypatch.setattr(filter_index, "BROWSE_MIN_CHUNK", 64)
+    spec = MovieFilter.parse(**query) if query else None
+    expected = _expected(movies, **(query or {}))
+    pages, offset, limit = [], 0, 37
+    while True:
+        rows, total = index.browse(spec, offset, limit)
+        assert total == len(expected)
+        if not len(rows):
+            break
+        assert len(rows) == min(limit, total - offset)
+        pages.extend(movies["id"].to_numpy()[rows].tolist())
+        offset += limit
+    assert pages == expected
+
+
+def test_browse_movies_uses_the_active_model(movies, index, monkeypatch):
+    registry = ModelRegistry()
+    registry.activate(LoadedModel("test", movies["id"].to_numpy(), movies["title"].to_numpy(), filter_index=index))
+    monkeypatch.setattr(recommand, "registry", registry)
+
+    query = dict(genre="Drama", year_from=1970, year_to=2005, lang="en")
+    expected = _expected(movies, **query)
+    page = recommand.browse_movies(MovieFilter.parse(**query), offset=24, limit=24)
+    assert page == {"movies": expected[24:48], "total": len(expected)}
+    assert recommand.browse_movies(None, 0, 5)["movies"] == _expected(movies)[:5]
+    assert recommand.browse_movies(MovieFilter.parse(lang="fr"), offset=10**6)["movies"] == []
+
+    registry.activate(LoadedModel("bare", movies["id"].to_numpy(), movies["title"].to_numpy()))
+    with pytest.raises(ValueError, match="no genre/year/language columns"):
+        recommand.browse_movies(MovieFilter.parse(genre="Drama"))
@@ -0,0 +1,40 @@
+"""
+Readiness probe and the admin-only /metrics endpoint.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from app.recommendation_model import recommand
+from app.routes import admin
+
+
+@pytest.fixture
+def client():
+    # No ``with``: the lifespan would start loading the real model.
+    return TestClient(main.app)
+
+
+@pytest.mark.parametrize("state", [recommand.MODEL_LOADING, recommand.MODEL_FAILED])
+def test_not_ready_is_503(client, monkeypatch, state):
+    monkeypatch.setattr(recommand, "model_state", state)
+    response = client.get("/health/ready")
+    assert response.status_code == 503 and response.json()["state"] == state
+    assert client.get("/health/live").status_code == 200
+
+
+def test_ready_is_200(client, monkeypatch):
+    monkeypatch.setattr(recommand, "model_state", recommand.MODEL_READY)
+    response = client.get("/health/ready")
+    assert response.status_code == 200 and response.json()["state"] == "ready"
+
+
+def test_metrics_need_the_admin_token(client, monkeypatch):
+    monkeypatch.setattr(admin.settings, "ADMIN_TOKEN", None)
+    assert client.get("/metrics").status_code == 404
+    monkeypatch.setattr(admin.settings, "ADMIN_TOKEN", "s3cret")
+    assert client.get("/metrics").status_code == 403
+    assert client.get("/metrics", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    response = client.get("/metrics", headers={"X-Admin-Token": "s3cret"})
+    assert response.status_code == 200 and "tmdb_breaker" in response.json()
+    assert client.get("/api/admin/model", headers={"X-Admin-Token": "s3cret"}).status_code == 200
@@ -0,0 +1,124 @@
+"""
+Model versions: registry swaps, draining, validated reloads and the CURRENT watcher.
+"""
+import time
+import types
+
+import numpy as np
+import pytest
+
+from app.recommendation_model import artifacts, recommand
+from app.recommendation_model.model_registry import LoadedModel, ModelRegistry
+
+N = 20
+
+
+def _arrays(seed, ids=None):
+    rng = np.random.default_rng(seed)
+    similarity = rng.random((N, N)).astype(np.float32)
+    similarity = (similarity + similarity.T) / 2
+    np.fill_diagonal(similarity, 1.0)
+    return {
+        "ids": np.arange(1000, 1000 + N, dtype=np.int64) if ids is None else ids,
+        "titles": np.array([f"Movie {seed}-{i}" for i in range(N)]),
+        "similarity": similarity,
+    }
+
+
+@pytest.fixture
+def artifact_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifacts, "ARTIFACTS_DIR", tmp_path)
+    monkeypatch.setattr(artifacts, "CURRENT_FILE", tmp_path / "CURRENT")
+    monkeypatch.setattr(recommand, "registry", ModelRegistry())
+    monkeypatch.setattr(recommand, "model_state", recommand.MODEL_READY)
+    monkeypatch.setattr(recommand, "model_error", None)
+    artifacts.write_artifact(tmp_path / "v1", _arrays(1), "v1")
+    artifacts.write_artifact(tmp_path / "v2", _arrays(2), "v2")
+    artifacts.write_artifact(tmp_path / "bad", _arrays(3, ids=np.full(N, 7, dtype=np.int64)), "bad")
+    artifacts.set_current_version("v1")
+    recommand.reload_model("v1")
+    return tmp_path
+
+
+def _model(version):
+    return LoadedModel(version, np.arange(3), np.array(["a", "b", "c"]))
+
+
+def test_activate_swaps_and_retires():
+    registry = ModelRegistry()
+    assert registry.version is None and registry.activate(_model("v1")) is None
+    previous = registry.activate(_model("v2"))
+    assert previous.version == "v1" and registry.version == "v2"
+    # Nothing was using v1, so it is not kept around.
+    assert registry.stats()["draining"] == [] and registry.stats()["swaps"] == 1
+    with pytest.raises(RuntimeError, match="no model version is active"):
+        with ModelRegistry().use():
+            pass
+
+
+def test_in_flight_requests_finish_on_their_version():
+    registry = ModelRegistry()
+    registry.activate(_model("v1"))
+    with registry.use() as pinned:
+        registry.activate(_model("v2"))
+        assert pinned.version == "v1"
+        with registry.use() as fresh:
+            assert fresh.version == "v2"
+        draining = registry.stats()["draining"]
+        assert [(model["version"], model["in_flight"]) for model in draining] == [("v1", 1)]
+    assert registry.stats()["draining"] == []
+    assert registry.stats()["active"]["in_flight"] == 0
+
+
+def test_reload_swaps_to_a_valid_version(artifact_dir):
+    assert recommand.reload_model() == {"previous": "v1", "active": "v1", "swapped": False}
+    assert recommand.reload_model("v2") == {"previous": "v1", "active": "v2", "swapped": True}
+    assert recommand.active_version() == "v2"
+    with recommand.registry.use() as model:
+        assert model.title_index.resolve("Movie 2-5") == 5
+
+
+def test_validation_rejects_a_bad_version(artifact_dir):
+    with pytest.raises(RuntimeError, match="duplicate movie ids"):
+        recommand.reload_model("bad")
+    with pytest.raises(RuntimeError, match="not found"):
+        recommand.reload_model("v9")
+    assert recommand.active_version() == "v1"
+    assert recommand.model_status()["error"].startswith("reload failed")
+
+
+def test_check_current_follows_current(artifact_dir):
+    assert recommand._check_current("v1") == "v1"
+    artifacts.set_current_version("v2")
+    assert recommand._check_current("v1") == "v2"
+    assert recommand.active_version() == "v2"
+    # A version that fails validation is not retried until CURRENT moves again.
+    artifacts.set_current_version("bad")
+    assert recommand._check_current("v2") == "bad"
+    assert recommand.active_version() == "v2"
+
+
+class _Stop(BaseException):
+    pass
+
+
+def test_watcher_survives_failing_polls(artifact_dir, monkeypatch):
+    polls = []
+    reads = iter([OSError("CURRENT unreadable"), "v1", ValueError("bad poll"), "v2"])
+
+    def current_version():
+        value = next(reads)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def sleep(_):
+        polls.append(recommand.active_version())
+        if len(polls) == 4:
+            raise _Stop
+
+    monkeypatch.setattr(artifacts, "current_version", current_version)
+    monkeypatch.setattr(recommand, "time", types.SimpleNamespace(sleep=sleep, perf_counter=time.perf_counter))
+    with pytest.raises(_Stop):
+        recommand._watch_current(1)
+    assert polls == ["v1", "v1", "v1", "v2"]
@@ -0,0 +1,62 @@
+"""
+``fields=`` projection of hydrated movies.
+"""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.cache.cache import TTLCache
+from app.recommendation_model.cold_start import ColdStartPool
+from app.routes import recommendation
+from benchmarks.tmdb_stub import TMDBStub
+
+CARD = {"id", "title", "poster_path", "vote_average", "genres", "overview", "status"}
+
+
+def test_parse_fields():
+    assert recommendation.parse_fields(None) is None
+    assert recommendation.parse_fields("full") is None
+    assert recommendation.parse_fields("title, runtime") == ("id", "title", "runtime")
+    assert set(recommendation.parse_fields("card,runtime")) == CARD | {"genre_ids", "runtime"}
+
+
+def test_projection_at_hydration(monkeypatch):
+    monkeypatch.setattr(recommendation.settings, "MOVIE_STORE_ENABLED", False)
+    monkeypatch.setattr(recommendation, "response_cache", TTLCache(max_entries=100, ttl=60))
+    pool = ColdStartPool()
+    pool.replace([11, 12, 13], [1.0, 1.0, 1.0], "test")
+    monkeypatch.setattr(recommendation.recommendation_model, "cold_start_pool", pool)
+    with TMDBStub(latency=0.0, missing_ids=[13]) as stub:
+        monkeypatch.setattr(recommendation, "tmdb_base_url", stub.base_url)
+        fields = recommendation.parse_fields("card")
+        movies = recommendation.fetch_multiple_movies([11, 12, 11, 13], fields=fields)
+        assert [movie["id"] for movie in movies] == [11, 12, 11, 13]
+        assert set(movies[0]) == CARD
+        assert movies[3]["status"] == "unavailable"
+        # The cache keeps the full details.
+        assert "production_companies" in recommendation.movie_cache.get(11)
+
+        app = FastAPI()
+        app.include_router(recommendation.recommendation_router)
+        with TestClient(app) as client:
+            sample = client.get("/api/cold-sample?fields=card").json()["movies"]
+            assert sorted(movie["id"] for movie in sample) == [11, 12, 13]
+            assert all(set(movie) <= CARD for movie in sample)
+            full = client.get("/api/cold-sample").json()["movies"]
+            assert any("production_companies" in movie for movie in full)
+
+            top = client.get("/api/top-rated?fields=title").json()["movies"]
+            assert all(set(movie) == {"id", "title"} for movie in top)
+            assert "overview" in client.get("/api/top-rated").json()["movies"][0]
+
+
+def test_search_drops_placeholders_under_projection(monkeypatch):
+    monkeypatch.setattr(recommendation.settings, "MOVIE_STORE_ENABLED", False)
+    monkeypatch.setattr(recommendation, "movie_cache", TTLCache(max_entries=100, ttl=60))
+    monkeypatch.setattr(recommendation, "search_titles", lambda query, limit: [(21, 1.0), (22, 0.9)])
+    with TMDBStub(latency=0.0, missing_ids=[22]) as stub:
+        monkeypatch.setattr(recommendation, "tmdb_base_url", stub.base_url)
+        fields = recommendation.parse_fields("title,runtime")
+        payload = recommendation._search_payload("query", 5, fields=fields)
+    assert payload["source"] == "local"
+    assert [movie["id"] for movie in payload["movies"]] == [21]
+    assert set(payload["movies"][0]) == {"id", "title", "runtime"}
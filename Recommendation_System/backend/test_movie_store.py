@@ -0,0 +1,124 @@
+"""
+Stale documents of the Mongo details store are only refreshed with data
+that actually came from TMDB.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.cache.cache import TTLCache
+from app.cache.circuit_breaker import CircuitBreaker
+from app.cache.rate_limit import BackoffScheduler, TokenBucket
+from app.cache.single_flight import SingleFlight
+from app.database import movie_store
+from app.routes import recommendation
+from benchmarks.tmdb_stub import TMDBStub, fake_movie
+
+OUTDATED = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+class FakeStore:
+    """In-memory stand-in for find_movie_details / save_movie_details."""
+
+    def __init__(self):
+        self.docs = {}
+
+    def find(self, movie_ids, max_age):
+        cutoff = datetime.now(timezone.utc) - max_age
+        found = {i: self.docs[i][0] for i in movie_ids if i in self.docs}
+        return found, [i for i in found if self.docs[i][1] < cutoff]
+
+    def save(self, movies):
+        for movie in movies:
+            self.docs[movie["id"]] = (movie, datetime.now(timezone.utc))
+        return len(movies)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = FakeStore()
+    monkeypatch.setattr(recommendation.settings, "MOVIE_STORE_ENABLED", True)
+    monkeypatch.setattr(recommendation, "_store_retry_at", 0.0)
+    monkeypatch.setattr(recommendation, "find_movie_details", store.find)
+    monkeypatch.setattr(recommendation, "save_movie_details", store.save)
+    executor = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(recommendation, "tmdb_executor", executor)
+    monkeypatch.setattr(recommendation, "tmdb_retries", BackoffScheduler(executor))
+    monkeypatch.setattr(recommendation, "movie_cache", TTLCache(ttl=60, stale_ttl=60))
+    monkeypatch.setattr(recommendation, "tmdb_limiter", TokenBucket(rate=1000, burst=100))
+    monkeypatch.setattr(recommendation, "tmdb_flights", SingleFlight())
+    monkeypatch.setattr(recommendation, "tmdb_breaker", CircuitBreaker(lambda: False, min_calls=100))
+    store.executor = executor
+    return store
+
+
+def _load(store, movie_id):
+    movies = recommendation.fetch_multiple_movies([movie_id])
+    # Let the background refresh finish.
+    store.executor.shutdown(wait=True)
+    return movies
+
+
+@pytest.mark.parametrize("outage", ["tmdb down", "breaker open"])
+def test_failed_refresh_keeps_the_store_timestamp(store, monkeypatch, outage):
+    outdated = {**fake_movie(900), "title": "Old title"}
+    store.docs[900] = (outdated, OUTDATED)
+    stub = TMDBStub(latency=0.0)
+    monkeypatch.setattr(recommendation, "tmdb_base_url", stub.base_url)
+    stub.server.server_close()  # nothing listens there: connection refused
+    if outage == "breaker open":
+        recommendation.tmdb_breaker._open(0.0)
+
+    movies = _load(store, 900)
+
+    assert movies[0]["title"] == "Old title"
+    assert store.docs[900] == (outdated, OUTDATED)
+
+
+def test_successful_refresh_updates_the_store(store, monkeypatch):
+    store.docs[900] = ({**fake_movie(900), "title": "Old title"}, OUTDATED)
+    with TMDBStub(latency=0.0) as stub:
+        monkeypatch.setattr(recommendation, "tmdb_base_url", stub.base_url)
+        _load(store, 900)
+
+    details, updated_at = store.docs[900]
+    assert details["title"] == "Movie 900"
+    assert updated_at > datetime.now(timezone.utc) - timedelta(minutes=1)
+
+
+class _Catalogue:
+    """The slice of a pymongo collection save_movie_details uses, with Mongo's update semantics."""
+
+    def __init__(self, docs):
+        self.docs = {doc["id"]: dict(doc) for doc in docs}
+
+    def create_index(self, key):
+        pass
+
+    def bulk_write(self, operations, ordered=True):
+        modified = upserted = 0
+        for op in operations:
+            movie_id = op._filter["id"]
+            if movie_id not in self.docs:
+                if not op._upsert:
+                    continue
+                self.docs[movie_id] = {"id": movie_id, **op._doc.get("$setOnInsert", {})}
+                upserted += 1
+            else:
+                modified += 1
+            self.docs[movie_id].update(op._doc["$set"])
+        return type("BulkWriteResult", (), {"modified_count": modified, "upserted_count": upserted})()
+
+
+def test_saving_details_never_adds_catalogue_movies(monkeypatch):
+    catalogue = _Catalogue([{"id": 900, "title": "Catalogue title"}])
+    monkeypatch.setattr(movie_store, "movie_data", catalogue)
+
+    written = movie_store.save_movie_details([fake_movie(900), fake_movie(901), None, {"title": "no id"}])
+
+    assert written == 1
+    assert sorted(catalogue.docs) == [900]
+    doc = catalogue.docs[900]
+    assert doc["title"] == "Catalogue title" and doc[movie_store.DETAILS_FIELD]["id"] == 900
+    assert doc[movie_store.UPDATED_AT_FIELD].tzinfo is not None
@@ -0,0 +1,70 @@
+"""
+Top-K neighbour index against the dense similarity ranking it replaces.
+"""
+import numpy as np
+import pytest
+
+from app.cache.cache import TTLCache
+from app.recommendation_model import recommand
+from app.recommendation_model.model_registry import LoadedModel, ModelRegistry
+from app.recommendation_model.neighbour_index import build_neighbour_index, rank_row
+from app.recommendation_model.title_index import TitleIndex
+
+N = 150
+K = 12
+
+
+@pytest.fixture(scope="module")
+def similarity():
+    rng = np.random.default_rng(11)
+    vectors = rng.random((N, 24)) ** 3
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    similarity = vectors @ vectors.T
+    # Rounded scores give ties, which rank by ascending row.
+    return np.round(similarity, 2)
+
+
+def test_rank_row_matches_a_full_sort(similarity):
+    for row in range(0, N, 7):
+        order = [int(r) for r in np.lexsort((np.arange(N), -similarity[row])) if r != row]
+        assert rank_row(similarity[row], row, K).tolist() == order[:K]
+
+
+@pytest.mark.parametrize("block_size", [1, 16, 1024])
+def test_index_matches_rank_row(similarity, block_size):
+    rows, scores = build_neighbour_index(similarity, k=K, block_size=block_size)
+    assert rows.shape == scores.shape == (N, K)
+    assert rows.dtype == np.int32 and scores.dtype == np.float16
+    for row in range(N):
+        expected = rank_row(similarity[row], row, K)
+        assert (rows[row] == expected).all()
+        assert (scores[row] == similarity[row, expected].astype(np.float16)).all()
+    assert np.all(np.diff(scores.astype(np.float32), axis=1) <= 0)
+
+
+def test_memory_mapped_input_and_small_catalogues(similarity, tmp_path):
+    np.save(tmp_path / "similarity.npy", similarity)
+    mapped = np.load(tmp_path / "similarity.npy", mmap_mode="r")
+    assert (build_neighbour_index(mapped, k=K, block_size=40)[0] == build_neighbour_index(similarity, k=K)[0]).all()
+    # k is capped at the number of other movies.
+    rows, _ = build_neighbour_index(similarity[:5, :5], k=K)
+    assert rows.shape == (5, 4) and all(row not in rows[row] for row in range(5))
+
+
+def test_serving_from_the_index_matches_the_dense_matrix(similarity, monkeypatch):
+    ids = np.arange(3000, 3000 + N, dtype=np.int64)
+    titles = np.array([f"Film {i:03d}" for i in range(N)])
+    rows, scores = build_neighbour_index(similarity, k=K)
+    dense = LoadedModel("dense", ids, titles, vector=similarity, title_index=TitleIndex(ids, titles))
+    sparse = LoadedModel("index", ids, titles, neighbour_rows=rows, neighbour_scores=scores,
+                         title_index=TitleIndex(ids, titles))
+    monkeypatch.setattr(recommand, "ranked_cache", TTLCache(max_entries=1000))
+    results = {}
+    for model in (dense, sparse):
+        registry = ModelRegistry()
+        registry.activate(model)
+        monkeypatch.setattr(recommand, "registry", registry)
+        results[model.version] = [recommand.recommand_similar(f"Film {row:03d}", 0, K) for row in range(N)]
+        # The index ends at K; the dense matrix ranks deeper.
+        assert len(recommand.recommand_similar("Film 000", K, 5)) == (5 if model is dense else 0)
+    assert results["index"] == results["dense"]
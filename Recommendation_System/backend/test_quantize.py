@@ -0,0 +1,61 @@
+"""
+float16 / int8 similarity storage: dequantization error and ranking recall floors.
+"""
+import numpy as np
+import pytest
+
+from app.recommendation_model.quantize import (INT8_MAX, QuantizedSimilarity, quantize_arrays, quantize_int8,
+                                               recall_at, recall_report, similarity_from_arrays)
+
+N = 400
+
+
+@pytest.fixture(scope="module")
+def similarity():
+    # Cosine similarity of sparse, non-negative vectors, like the TF-IDF tags.
+    rng = np.random.default_rng(14)
+    vectors = rng.random((N, 60)) * (rng.random((N, 60)) < 0.1)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+    return vectors @ vectors.T
+
+
+def test_int8_rows_use_their_own_scale(similarity):
+    q, scale = quantize_int8(similarity, block_size=64)
+    assert q.dtype == np.int8 and scale.dtype == np.float32 and scale.shape == (N,)
+    off_diagonal = np.where(np.eye(N, dtype=bool), 0, np.abs(q.astype(np.int32)))
+    nonzero_rows = np.abs(np.where(np.eye(N, dtype=bool), 0, similarity)).max(axis=1) > 0
+    assert (off_diagonal.max(axis=1)[nonzero_rows] == INT8_MAX).all()
+    # Every off-diagonal score is within half a step of the original.
+    error = np.abs(QuantizedSimilarity(q, scale)[np.arange(N)] - similarity)
+    np.fill_diagonal(error, 0)
+    assert (error <= scale[:, None] / 2 + 1e-6).all()
+
+
+def test_quantized_rows_index_like_the_dense_matrix(similarity):
+    view = similarity_from_arrays(quantize_arrays(similarity, "int8"))
+    assert isinstance(view, QuantizedSimilarity) and view.shape == (N, N) and len(view) == N
+    block = view[np.array([3, 8])]
+    assert block.shape == (2, N) and block.dtype == np.float32
+    assert (block[1] == view[8]).all()
+    assert view.nbytes == N * N + 4 * N
+
+    half = similarity_from_arrays(quantize_arrays(similarity, "float16"))
+    assert half.dtype == np.float16 and half.nbytes == similarity.nbytes // 4
+    with pytest.raises(ValueError, match="unsupported similarity dtype"):
+        quantize_arrays(similarity, "int4")
+
+
+def test_recall_floor(similarity):
+    report = recall_report(similarity, dtypes=("float32", "float16", "int8"), ks=(6, 12), block_size=100)
+    assert report["float32"]["recall@6"] == report["float32"]["recall@12"] == 1.0
+    assert report["float16"]["recall@6"] >= 0.99 and report["float16"]["recall@12"] >= 0.99
+    assert report["int8"]["recall@6"] >= 0.97 and report["int8"]["recall@12"] >= 0.97
+    assert report["int8"]["bytes"] == N * N + 4 * N
+    sampled = recall_report(similarity, dtypes=("int8",), sample=50)
+    assert sampled["int8"]["recall@12"] >= 0.95
+
+
+def test_recall_at():
+    reference = np.array([[1, 2, 3], [4, 5, 6]])
+    assert recall_at(reference, np.array([[3, 2, 1], [4, 7, 8]]), 3) == pytest.approx(4 / 6)
+    assert recall_at(reference, np.array([[1, 9, 2], [4, 5, 9]]), 1) == 1.0
@@ -0,0 +1,153 @@
+"""
+Outbound TMDB pacing: token bucket, Retry-After and background retries.
+"""
+import time
+from email.utils import formatdate
+
+import pytest
+from fastapi import HTTPException
+
+from app.cache.cache import TTLCache
+from app.cache.rate_limit import BackoffScheduler, TokenBucket, parse_retry_after
+from app.routes import recommendation
+from benchmarks.tmdb_stub import TMDBStub
+
+
+def test_burst_then_rate():
+    bucket = TokenBucket(rate=20, burst=5)
+    assert all(bucket.reserve()[0] for _ in range(5))
+    reserved, wait = bucket.reserve()
+    assert not reserved and 0.04 < wait <= 0.05
+    reserved, wait = bucket.reserve(max_wait=0.1)
+    assert reserved and 0.04 < wait <= 0.05
+    # The next slot is one interval later again.
+    assert 0.09 < bucket.reserve(max_wait=0.2)[1] <= 0.1
+
+
+def test_pause_blocks_every_caller():
+    bucket = TokenBucket(rate=1000, burst=10)
+    bucket.pause(5)
+    granted, wait = bucket.acquire()
+    assert not granted and 4.9 < wait <= 5
+    assert bucket.stats()["throttled"] == 1
+    assert bucket.stats()["paused_for_seconds"] > 4.9
+
+
+def test_acquire_never_sleeps():
+    bucket = TokenBucket(rate=1, burst=1)
+    assert bucket.acquire()[0]
+    started = time.perf_counter()
+    granted, wait = bucket.acquire()
+    assert time.perf_counter() - started < 0.01
+    assert not granted and 0.9 < wait <= 1
+    assert bucket.stats()["acquired"] == 1 and bucket.stats()["throttled"] == 1
+
+
+def test_shared_file_is_one_bucket(tmp_path):
+    path = str(tmp_path / "tmdb.bucket")
+    first = TokenBucket(rate=10, burst=3, shared_path=path)
+    second = TokenBucket(rate=10, burst=3, shared_path=path)
+    assert first.reserve()[0] and second.reserve()[0] and first.reserve()[0]
+    assert not second.reserve()[0]
+    first.pause(30)
+    reserved, wait = second.reserve(max_wait=10)
+    assert not reserved and wait > 29
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert 8 < parse_retry_after(formatdate(time.time() + 10, usegmt=True)) <= 10
+
+
+def _fresh_limits(monkeypatch, bucket):
+    monkeypatch.setattr(recommendation, "tmdb_limiter", bucket)
+    monkeypatch.setattr(recommendation, "tmdb_retries", BackoffScheduler(recommendation.tmdb_executor))
+
+
+def test_429_pauses_and_retries_in_background(monkeypatch):
+    _fresh_limits(monkeypatch, TokenBucket(rate=100, burst=10))
+    with TMDBStub(latency=0.0, throttled_ids=[77], retry_after=0.3) as stub:
+        monkeypatch.setattr(recommendation, "tmdb_base_url", stub.base_url)
+        recommendation.movie_cache.pop(77)
+
+        started = time.perf_counter()
+        assert recommendation.fetch_movie_from_tmdb(77, delay=0.05) is None
+        assert time.perf_counter() - started < 0.25
+        assert recommendation.tmdb_limiter.stats()["pauses"] == 1
+        # A pending retry keeps other callers from hitting TMDB again.
+        assert recommendation.fetch_movie_from_tmdb(77) is None
+        assert stub.hits["/3/movie/77"] == 1
+
+        deadline = time.monotonic() + 3
+        while 77 not in recommendation.movie_cache and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert recommendation.fetch_movie_from_tmdb(77)["id"] == 77
+        assert stub.hits["/3/movie/77"] == 2
+        assert recommendation.tmdb_retries.stats()["ran"] == 1
+
+
+def test_throttled_call_fails_fast(monkeypatch):
+    bucket = TokenBucket(rate=100, burst=10)
+    bucket.pause(30)
+    _fresh_limits(monkeypatch, bucket)
+    with TMDBStub(latency=0.0) as stub:
+        monkeypatch.setattr(recommendation, "tmdb_base_url", stub.base_url)
+        recommendation.movie_cache.pop(78)
+
+        started = time.perf_counter()
+        assert recommendation.fetch_movie_from_tmdb(78) is None
+        assert time.perf_counter() - started < 0.1
+        assert stub.total_hits == 0
+        assert recommendation.tmdb_retries.stats()["pending"] == 1
+
+
+def test_throttled_lists_serve_stale_copies(monkeypatch):
+    bucket = TokenBucket(rate=100, burst=10)
+    bucket.pause(30)
+    _fresh_limits(monkeypatch, bucket)
+    now = [0.0]
+    cache = TTLCache(ttl=10, stale_ttl=100, clock=lambda: now[0])
+    cache.set(79, {"id": 79, "title": "Old copy"})
+    now[0] = 50
+    saved = []
+    monkeypatch.setattr(recommendation, "movie_cache", cache)
+    monkeypatch.setattr(recommendation, "_save_to_store", saved.extend)
+    monkeypatch.setattr(recommendation.settings, "MOVIE_STORE_ENABLED", False)
+    with TMDBStub(latency=0.0) as stub:
+        monkeypatch.setattr(recommendation, "tmdb_base_url", stub.base_url)
+        started = time.perf_counter()
+        movies = recommendation.fetch_multiple_movies([79, 80])
+        assert time.perf_counter() - started < 0.1
+        assert stub.total_hits == 0
+
+    assert movies[0]["title"] == "Old copy" and movies[1]["status"] == "unavailable"
+    assert saved == []
+    assert recommendation.tmdb_retries.stats()["pending"] == 2
+
+
+def test_throttled_search_is_503(monkeypatch):
+    bucket = TokenBucket(rate=100, burst=10)
+    bucket.pause(2.5)
+    _fresh_limits(monkeypatch, bucket)
+    monkeypatch.setattr(recommendation, "search_titles", lambda query, limit: [])
+    with pytest.raises(HTTPException) as raised:
+        recommendation._search_payload("no such movie", 5)
+    assert raised.value.status_code == 503 and raised.value.headers == {"Retry-After": "3"}
+
+
+def test_hydration_workers_wait_for_tokens_past_the_burst(monkeypatch):
+    _fresh_limits(monkeypatch, TokenBucket(rate=50, burst=5))
+    monkeypatch.setattr(recommendation, "movie_cache", TTLCache(ttl=60))
+    monkeypatch.setattr(recommendation.settings, "MOVIE_STORE_ENABLED", False)
+    with TMDBStub(latency=0.0) as stub:
+        monkeypatch.setattr(recommendation, "tmdb_base_url", stub.base_url)
+        movies = recommendation.fetch_multiple_movies(list(range(300, 320)))
+        assert stub.total_hits == 20
+
+    assert [movie["id"] for movie in movies] == list(range(300, 320))
+    assert not [movie for movie in movies if movie.get("status") == "unavailable"]
+    stats = recommendation.tmdb_limiter.stats()
+    assert stats["throttled"] == 0 and stats["waited_seconds"] > 0.2
+    assert recommendation.tmdb_retries.stats()["scheduled"] == 0
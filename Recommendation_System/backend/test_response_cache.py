@@ -0,0 +1,107 @@
+"""
+/api/top-rated and /api/search responses are cached and support conditional GET.
+"""
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.cache.cache import TTLCache
+from app.cache.rate_limit import BackoffScheduler, TokenBucket
+from app.routes import recommendation
+from benchmarks.tmdb_stub import TMDBStub
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(recommendation, "response_cache", TTLCache(max_entries=100, ttl=60))
+    with TMDBStub(latency=0.0) as stub:
+        monkeypatch.setattr(recommendation, "tmdb_base_url", stub.base_url)
+        app = FastAPI()
+        app.include_router(recommendation.recommendation_router)
+        with TestClient(app) as test_client:
+            test_client.stub = stub
+            yield test_client
+
+
+def test_top_rated_is_cached_with_etag(client):
+    first = client.get("/api/top-rated?min_rating=7&min_votes=1000")
+    assert first.status_code == 200 and len(first.json()["movies"]) == 20
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"].startswith("public, max-age=")
+
+    again = client.get("/api/top-rated", params={"min_rating": "7.0", "min_votes": 1000, "page": 1})
+    assert again.content == first.content and again.headers["etag"] == etag
+    assert client.stub.hits["/3/discover/movie"] == 1
+
+    revalidated = client.get("/api/top-rated?min_rating=7", headers={"If-None-Match": f'W/{etag}, "other"'})
+    assert revalidated.status_code == 304 and revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+
+    page_2 = client.get("/api/top-rated?page=2")
+    assert page_2.headers["etag"] != etag
+    assert client.stub.hits["/3/discover/movie"] == 2
+
+
+def test_search_key_is_normalised(client):
+    first = client.get("/api/search", params={"query": "The  Matrix "})
+    assert first.status_code == 200 and first.json()["query"] == "the matrix"
+    second = client.get("/api/search", params={"query": "the matrix"})
+    assert second.headers["etag"] == first.headers["etag"]
+    assert client.stub.hits["/3/search/movie"] == 1
+
+    client.get("/api/search", params={"query": "the matrix", "limit": 5})
+    assert client.stub.hits["/3/search/movie"] == 2
+    assert client.get("/api/search", params={"query": "x"}).status_code == 400
+
+
+def test_errors_are_not_cached(client, monkeypatch):
+    monkeypatch.setattr(recommendation, "tmdb_base_url", client.stub.base_url + "/missing")
+    assert client.get("/api/top-rated").status_code == 404
+    monkeypatch.setattr(recommendation, "tmdb_base_url", client.stub.base_url)
+    assert client.get("/api/top-rated").status_code == 200
+    assert len(recommendation.response_cache) == 1
+
+
+def test_prewarm(client):
+    recommendation.prewarm_top_rated(3)
+    assert client.stub.hits["/3/discover/movie"] == 3
+    for page in (1, 2, 3):
+        assert client.get(f"/api/top-rated?page={page}").status_code == 200
+    assert client.stub.hits["/3/discover/movie"] == 3
+
+
+def test_degraded_responses_are_cached_briefly(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(recommendation, "response_cache", TTLCache(max_entries=100, ttl=60, clock=lambda: now[0]))
+    monkeypatch.setattr(recommendation, "movie_cache", TTLCache(max_entries=100, ttl=60))
+    monkeypatch.setattr(recommendation, "tmdb_limiter", TokenBucket(rate=100, burst=10))
+    monkeypatch.setattr(recommendation, "tmdb_retries", BackoffScheduler(recommendation.tmdb_executor))
+    monkeypatch.setattr(recommendation.settings, "MOVIE_STORE_ENABLED", False)
+    monkeypatch.setattr(recommendation.settings, "SEARCH_CACHE_TTL_SECONDS", 600)
+    monkeypatch.setattr(recommendation.settings, "DEGRADED_RESPONSE_CACHE_TTL_SECONDS", 15)
+    monkeypatch.setattr(recommendation, "search_titles", lambda query, limit: [(31, 1.0), (32, 0.9)])
+    # 31 answers 429 once, then recovers through the background retry.
+    with TMDBStub(latency=0.0, throttled_ids=[31], retry_after=0.1) as stub:
+        monkeypatch.setattr(recommendation, "tmdb_base_url", stub.base_url)
+        app = FastAPI()
+        app.include_router(recommendation.recommendation_router)
+        with TestClient(app) as client:
+            degraded = client.get("/api/search", params={"query": "some movie"})
+            assert [movie["id"] for movie in degraded.json()["movies"]] == [32]
+            assert degraded.headers["cache-control"] == "public, max-age=15"
+
+            deadline = time.perf_counter() + 5
+            while 31 not in recommendation.movie_cache and time.perf_counter() < deadline:
+                time.sleep(0.05)
+            assert 31 in recommendation.movie_cache
+            assert client.get("/api/search", params={"query": "some movie"}).content == degraded.content
+
+            now[0] = 16
+            healed = client.get("/api/search", params={"query": "some movie"})
+            assert [movie["id"] for movie in healed.json()["movies"]] == [31, 32]
+            assert healed.headers["cache-control"] == "public, max-age=600"
+            now[0] = 500
+            assert client.get("/api/search", params={"query": "some movie"}).content == healed.content
+            assert stub.hits["/3/movie/31"] == 2
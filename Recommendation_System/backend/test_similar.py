@@ -0,0 +1,93 @@
+"""
+/api/similar paging through the per-seed ranked-list cache on a small model.
+"""
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.cache.cache import TTLCache
+from app.recommendation_model import recommand
+from app.recommendation_model.model_registry import LoadedModel, ModelRegistry
+from app.recommendation_model.title_index import TitleIndex
+from app.routes import recommendation
+from benchmarks.tmdb_stub import TMDBStub
+
+N = 40
+IDS = np.arange(500, 500 + N, dtype=np.int64)
+TITLES = np.array([f"Title {i:02d}" for i in range(N)])
+
+
+def _similarity():
+    rng = np.random.default_rng(9)
+    similarity = rng.random((N, N))
+    similarity = (similarity + similarity.T) / 2
+    np.fill_diagonal(similarity, 1.0)
+    return similarity
+
+
+def _expected(similarity, row):
+    """Every other movie, most similar first."""
+    order = [int(r) for r in np.argsort(-similarity[row], kind="stable") if r != row]
+    return IDS[order].tolist()
+
+
+@pytest.fixture
+def similarity(monkeypatch):
+    similarity = _similarity()
+    registry = ModelRegistry()
+    registry.activate(LoadedModel("small", IDS, TITLES, vector=similarity, title_index=TitleIndex(IDS, TITLES)))
+    monkeypatch.setattr(recommand, "registry", registry)
+    monkeypatch.setattr(recommand, "ranked_cache", TTLCache(max_entries=100))
+    # Shallow lists, so paging has to rank deeper a few times.
+    monkeypatch.setattr(recommand, "RANKED_LIST_DEPTH", 8)
+    return similarity
+
+
+@pytest.mark.parametrize("limit", [1, 5, 7, 50])
+def test_pages_concatenate_to_one_ranking(similarity, limit):
+    pages, offset = [], 0
+    while True:
+        page = recommand.recommand_similar("Title 03", offset, limit)
+        if not page:
+            break
+        assert len(page) <= limit
+        pages.extend(page)
+        offset += limit
+    assert pages == _expected(similarity, 3)
+    assert len(set(pages)) == N - 1
+    assert len(recommand.ranked_cache) == 1
+
+
+def test_paging_reuses_the_cached_list(similarity):
+    first = recommand.recommand_similar("Title 10", 0, 6)
+    ranked, complete = recommand.ranked_cache.get(("small", 10, None))
+    assert len(ranked) == 8 and not complete
+    assert recommand.recommand_similar("Title 10", 6, 2) == ranked[6:8].tolist()
+    assert recommand.ranked_cache.get(("small", 10, None))[0] is ranked
+    # Past the cached depth the list is re-ranked deeper, keeping its head.
+    deeper = recommand.recommand_similar("Title 10", 8, 4)
+    ranked, _ = recommand.ranked_cache.get(("small", 10, None))
+    assert len(ranked) == 16 and ranked[:6].tolist() == first and ranked[8:12].tolist() == deeper
+    assert recommand.recommand_similar("No such title", 0, 6) == {"error": "Movie not found"}
+
+
+def test_similar_route_pages(similarity, monkeypatch):
+    monkeypatch.setattr(recommendation.settings, "MOVIE_STORE_ENABLED", False)
+    monkeypatch.setattr(recommendation, "movie_cache", TTLCache(max_entries=100, ttl=60))
+    with TMDBStub(latency=0.0) as stub:
+        monkeypatch.setattr(recommendation, "tmdb_base_url", stub.base_url)
+        app = FastAPI()
+        app.include_router(recommendation.recommendation_router)
+        with TestClient(app) as client:
+            pages = []
+            for offset in range(0, 18, 6):
+                body = client.get("/api/similar", params={"name": "title 21", "offset": offset, "limit": 6}).json()
+                assert (body["offset"], body["limit"]) == (offset, 6)
+                pages.extend(movie["id"] for movie in body["movies"])
+            top_6 = client.get("/api/top_6", params={"name": "Title 21"}).json()["movies"]
+            next_6 = client.get("/api/top_6_to_12", params={"name": "Title 21"}).json()["movies"]
+            assert client.get("/api/similar", params={"name": "x", "limit": 0}).status_code == 422
+
+    assert pages == _expected(similarity, 21)[:18]
+    assert [movie["id"] for movie in top_6 + next_6] == pages[:12]
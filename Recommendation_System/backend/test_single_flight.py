@@ -0,0 +1,106 @@
+"""
+Concurrent TMDB lookups for the same resource share one upstream request.
+
+Runs against the local TMDB stub from ``benchmarks`` with an artificial
+latency, so every caller arrives while the first request is still in flight.
+"""
+import threading
+
+from app.cache.single_flight import SingleFlight
+from app.routes import recommendation
+from benchmarks.tmdb_stub import TMDBStub
+
+CALLERS = 8
+
+
+def _run_concurrently(fn):
+    barrier = threading.Barrier(CALLERS)
+    results = [None] * CALLERS
+
+    def worker(i):
+        barrier.wait()
+        results[i] = fn()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(CALLERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def _with_stub(monkeypatch, **kwargs):
+    stub = TMDBStub(**kwargs)
+    monkeypatch.setattr(recommendation, "tmdb_base_url", stub.base_url)
+    monkeypatch.setattr(recommendation, "tmdb_flights", SingleFlight())
+    return stub
+
+
+def test_movie_details_are_fetched_once(monkeypatch):
+    with _with_stub(monkeypatch, latency=0.3) as stub:
+        recommendation.movie_cache.pop(4242)
+        movies = _run_concurrently(lambda: recommendation.fetch_movie_from_tmdb(4242, use_cache=False))
+
+        assert stub.hits["/3/movie/4242"] == 1
+        assert all(movie is movies[0] and movie["id"] == 4242 for movie in movies)
+        stats = recommendation.tmdb_flights.stats()
+        assert stats["executed"] == 1
+        assert stats["coalesced"] == CALLERS - 1
+        assert stats["in_flight"] == 0
+
+        # Nothing is remembered once the flight lands.
+        recommendation.fetch_movie_from_tmdb(4242, use_cache=False)
+        assert stub.hits["/3/movie/4242"] == 2
+
+
+def test_not_found_is_shared(monkeypatch):
+    with _with_stub(monkeypatch, latency=0.3, missing_ids=[404]) as stub:
+        movies = _run_concurrently(lambda: recommendation.fetch_movie_from_tmdb(404, use_cache=False))
+
+        assert movies == [None] * CALLERS
+        assert stub.hits["/3/movie/404"] == 1
+
+
+def test_top_rated_pages_are_coalesced_per_page(monkeypatch):
+    with _with_stub(monkeypatch, latency=0.3) as stub:
+        pages = _run_concurrently(lambda: recommendation._top_rated_payload(7.0, 1000, 1))
+
+        assert stub.hits["/3/discover/movie"] == 1
+        assert all(page["movies"] == pages[0]["movies"] for page in pages)
+
+        _run_concurrently(lambda: recommendation._top_rated_payload(7.0, 1000, 2))
+        assert stub.hits["/3/discover/movie"] == 2
+        assert recommendation.tmdb_flights.stats()["coalesced"] == 2 * (CALLERS - 1)
+
+
+def test_errors_reach_every_caller():
+    flights = SingleFlight()
+    entered = threading.Event()
+    release = threading.Event()
+    errors = []
+
+    def failing():
+        entered.set()
+        release.wait(5)
+        raise RuntimeError("upstream down")
+
+    def caller():
+        try:
+            flights.do("key", failing)
+        except RuntimeError as exc:
+            errors.append(exc)
+
+    leader = threading.Thread(target=caller)
+    leader.start()
+    entered.wait(5)
+    followers = [threading.Thread(target=caller) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    while flights.stats()["coalesced"] < 3:
+        pass
+    release.set()
+    for thread in [leader] + followers:
+        thread.join()
+
+    assert len(errors) == 4 and all(exc is errors[0] for exc in errors)
+    assert flights.stats() == {"executed": 1, "coalesced": 3, "failures": 1, "in_flight": 0, "coalesced_ratio": 0.75}
@@ -0,0 +1,61 @@
+"""
+Title and TMDB id lookups of the model rows, without Mongo.
+"""
+import numpy as np
+import pytest
+
+from app.recommendation_model import recommand, title_index
+from app.recommendation_model.model_registry import LoadedModel
+from app.recommendation_model.title_index import TitleIndex, normalize_title
+
+IDS = np.array([603, 155, 272, 49026, 603, 27205])
+TITLES = np.array(["The Matrix", "The Dark Knight", "Batman Begins", "The Dark Knight Rises", "the  MATRIX", ""])
+
+
+@pytest.fixture
+def index():
+    return TitleIndex(IDS, TITLES)
+
+
+def test_exact_titles(index):
+    assert normalize_title("  The\tDark   KNIGHT ") == "the dark knight"
+    assert index.row_for_title("the dark knight") == 1
+    assert index.row_for_title("THE MATRIX") == 0  # first of the duplicated titles
+    assert index.row_for_title("") is None and index.row_for_title("Inception") is None
+
+
+def test_partial_titles_match_at_word_starts(index):
+    assert index.find_partial("Dark Knight") == 1        # lowest row of several matches
+    assert index.find_partial("knight rises") == 3
+    assert index.find_partial("BAT") == 2
+    assert index.find_partial("ark knight") is None      # not at a word start
+    assert index.find_partial("  ") is None
+    assert index.resolve("the dark knight rises") == 3   # exact beats the partial row 1
+    assert index.resolve("rises") == 3
+    assert index.resolve("Inception") is None
+
+
+@pytest.mark.parametrize("dense", [True, False])
+def test_rows_for_ids(monkeypatch, dense):
+    if not dense:
+        monkeypatch.setattr(title_index, "MAX_DENSE_ID", 1000)
+    index = TitleIndex(IDS, TITLES)
+    assert (index.row_by_id is not None) == dense
+    assert index.row_for_id(603) == 0        # first row for a duplicated id
+    assert index.row_for_id("27205") == 5
+    assert index.row_for_id(550) is None and index.row_for_id(-1) is None and index.row_for_id("x") is None
+    assert index.rows_for_ids([272, 550, 603, "155", 10**9, 49026]).tolist() == [2, 0, 3]
+
+
+class _NoMongo:
+    def __getattr__(self, name):
+        raise AssertionError(f"title lookups must not query Mongo (movie_data.{name})")
+
+
+def test_find_movie_index_never_queries_mongo(index, monkeypatch):
+    monkeypatch.setattr(recommand, "movie_data", _NoMongo())
+    model = LoadedModel("test", IDS, TITLES, title_index=index)
+    assert recommand._find_movie_index(model, "The Dark Knight Rises") == 3
+    assert recommand._find_movie_index(model, "batman") == 2
+    assert recommand._find_movie_index(model, "Inception") is None
+    assert recommand._find_movie_index(model, "") is None
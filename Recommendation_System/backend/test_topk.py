@@ -0,0 +1,68 @@
+"""
+argpartition top-k against the full sort it replaced (``argsort()[::-1]``).
+"""
+import numpy as np
+import pytest
+
+from app.recommendation_model.topk import top_k, top_k_block, top_k_window, top_k_window_block
+
+
+def _baseline(row, self_index, start, end):
+    """The ranking ``_top_indices_from_distances`` used before top_k."""
+    order = np.argsort(row)[::-1]
+    order = [i for i in order if i != self_index]
+    return order[start:end]
+
+
+def _stable(row, k, exclude=None):
+    """Descending score, ties by ascending index: the order top_k promises."""
+    order = [i for i in np.lexsort((np.arange(len(row)), -row)) if i != exclude]
+    return order[:k]
+
+
+@pytest.mark.parametrize("n,k", [(1, 1), (7, 3), (50, 6), (50, 49), (50, 50), (2000, 12)])
+def test_matches_full_sort_without_ties(n, k):
+    rng = np.random.default_rng(n + k)
+    block = rng.permutation(n * 5).reshape(5, n).astype(np.float64)
+    for r, row in enumerate(block):
+        assert top_k(row, k).tolist() == _baseline(row, None, 0, k)
+        self_index = (r * 7) % n
+        assert top_k(row, k, exclude=self_index).tolist() == _baseline(row, self_index, 0, k)
+        assert top_k_window(row, 2, k, exclude=self_index).tolist() == _baseline(row, self_index, 2, k)
+    exclude = np.arange(5) % n
+    expected = [_baseline(row, e, 0, k) for row, e in zip(block, exclude)]
+    assert top_k_block(block, k, exclude=exclude).tolist() == expected
+
+
+def test_self_excluded_wherever_it_ranks():
+    row = np.array([0.1, 0.9, 0.5, 0.7, 0.3])
+    assert top_k(row, 2, exclude=1).tolist() == [3, 2]   # self is the best match
+    assert top_k(row, 2, exclude=0).tolist() == [1, 3]   # self is not selected at all
+    assert top_k(row, 10, exclude=4).tolist() == [1, 3, 2, 0]
+    assert top_k_block(row.reshape(1, -1), 0, exclude=[1]).shape == (1, 0)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_ties_rank_by_ascending_index(seed):
+    # Few distinct scores, so ties straddle the k-th position in most rows.
+    rng = np.random.default_rng(seed)
+    block = rng.integers(0, 4, size=(40, 300)).astype(np.float32)
+    exclude = rng.integers(0, 300, size=40)
+    for k in (1, 10, 150, 299):
+        top = top_k_block(block, k, exclude=exclude)
+        for row, e, got in zip(block, exclude, top):
+            assert got.tolist() == _stable(row, k, e)
+            # Same scores, in the same order, as the old full sort.
+            assert row[got].tolist() == row[_baseline(row, e, 0, k)].tolist()
+    start, end = 5, 17
+    window = top_k_window_block(block, start, end, exclude=exclude)
+    assert window.tolist() == [_stable(row, end, e)[start:end] for row, e in zip(block, exclude)]
+
+
+def test_tie_order_differs_from_reversed_argsort():
+    # Reversing an ascending sort put tied scores highest index first; top_k
+    # keeps the lowest index first, the order the neighbour index stores.
+    row = np.array([1.0, 3.0, 3.0, 2.0, 3.0])
+    assert _baseline(row, None, 0, 3) == [4, 2, 1]
+    assert top_k(row, 3).tolist() == [1, 2, 4]
+    assert top_k(row, 2, exclude=2).tolist() == [1, 4]
@@ -0,0 +1,122 @@
+"""
+"For You" feed: recency-weighted history blend and invalidation on history changes.
+"""
+import types
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.cache.cache import TTLCache
+from app.recommendation_model import recommand
+from app.recommendation_model.model_registry import LoadedModel, ModelRegistry
+from app.recommendation_model.title_index import TitleIndex
+from app.routes import history, recommendation
+from app.routes.auth_route import get_current_user
+from benchmarks.tmdb_stub import TMDBStub
+
+N = 12
+IDS = np.arange(900, 900 + N, dtype=np.int64)
+TITLES = np.array([f"Feed Movie {i:02d}" for i in range(N)])
+
+
+def _similarity():
+    # Row 0 is close to row 2 (0.9), row 1 to row 3 (0.8); everything else is
+    # a little similar to both, so the recency weights decide the order.
+    similarity = np.full((N, N), 0.1)
+    np.fill_diagonal(similarity, 1.0)
+    similarity[0, 2] = similarity[2, 0] = 0.9
+    similarity[1, 3] = similarity[3, 1] = 0.8
+    return similarity
+
+
+@pytest.fixture
+def model(monkeypatch):
+    registry = ModelRegistry()
+    registry.activate(LoadedModel("feed", IDS, TITLES, vector=_similarity(), title_index=TitleIndex(IDS, TITLES)))
+    monkeypatch.setattr(recommand, "registry", registry)
+
+
+def test_recent_history_weighs_more(model):
+    # [0, 1]: row 1 is newest (1.0 vs 0.75), so its neighbour 3 leads.
+    assert recommand.recommand_for_history(IDS[[0, 1]].tolist(), 2) == [IDS[3], IDS[2]]
+    assert recommand.recommand_for_history(IDS[[1, 0]].tolist(), 2) == [IDS[2], IDS[3]]
+    # Watched movies are never recommended back.
+    assert not set(IDS[:2]) & set(recommand.recommand_for_history(IDS[:2].tolist(), N))
+
+
+def test_weights_grow_linearly_with_recency(model):
+    history_ids = IDS[[4, 0, 1]].tolist()
+    similarity = _similarity()
+    weights = np.array([0.5 + 0.5 / 3, 0.5 + 1.0 / 3, 1.0])
+    scores = weights @ similarity[[4, 0, 1]]
+    scores[[4, 0, 1]] = -np.inf
+    expected = IDS[np.argsort(-scores, kind="stable")[:5]].tolist()
+    assert recommand.recommand_for_history(history_ids, 5) == expected
+    # Ids the model does not know are skipped.
+    assert recommand.recommand_for_history([1, *history_ids, "x"], 5) == expected
+    assert recommand.recommand_for_history([1, 2]) == {"error": "No history movies known to the model"}
+
+
+class _History:
+    """The two queries and two updates the history routes make."""
+
+    def __init__(self):
+        self.docs = {}
+
+    def find_one(self, query):
+        doc = self.docs.get(query["email"])
+        return None if doc is None else {**doc, "movie_list": list(doc["movie_list"])}
+
+    def insert_one(self, doc):
+        self.docs[doc["email"]] = {**doc, "movie_list": list(doc["movie_list"])}
+
+    def update_one(self, query, update):
+        movie_list = self.docs[query["email"]]["movie_list"]
+        if "$push" in update:
+            movie_list.append(update["$push"]["movie_list"])
+        else:
+            movie_list.remove(update["$pull"]["movie_list"])
+
+
+def test_history_changes_invalidate_the_feed(model, monkeypatch):
+    collection = _History()
+    monkeypatch.setattr(history, "movie_history", collection)
+    monkeypatch.setattr(recommendation, "movie_history", collection)
+    monkeypatch.setattr(recommendation, "user_recommendation_cache", TTLCache(max_entries=10))
+    monkeypatch.setattr(recommendation, "movie_cache", TTLCache(max_entries=100, ttl=60))
+    monkeypatch.setattr(recommendation.settings, "MOVIE_STORE_ENABLED", False)
+    cache = recommendation.user_recommendation_cache
+
+    with TMDBStub(latency=0.0) as stub:
+        monkeypatch.setattr(recommendation, "tmdb_base_url", stub.base_url)
+        app = FastAPI()
+        app.include_router(recommendation.recommendation_router)
+        app.include_router(history.history_router)
+        app.dependency_overrides[get_current_user] = lambda: types.SimpleNamespace(email="fan@example.com")
+        with TestClient(app) as client:
+            def feed():
+                body = client.get("/api/user/recommendations", params={"limit": 2}).json()
+                return body["source"], [movie["id"] for movie in body["movies"]]
+
+            def watch(movie_id):
+                return client.post("/api/user/history/", json={"tmdb_movie_id": movie_id}).json()["message"]
+
+            cache.set("fan@example.com", ("feed", [int(IDS[11])]))
+            assert watch(int(IDS[0])) == "Movie added to history."  # first insert
+            assert "fan@example.com" not in cache
+            assert feed() == ("history", [IDS[2], IDS[1]])
+            assert cache.get("fan@example.com")[0] == "feed"
+
+            assert watch(int(IDS[1])) == "Movie added to history."  # $push
+            assert "fan@example.com" not in cache
+            assert feed() == ("history", [IDS[3], IDS[2]])
+
+            # A duplicate changes nothing, so the cached feed stays.
+            assert watch(int(IDS[1])) == "Movie already exists in history."
+            assert "fan@example.com" in cache
+
+            assert client.delete(f"/api/user/history/{int(IDS[1])}").status_code == 200
+            assert "fan@example.com" not in cache
+            assert feed() == ("history", [IDS[2], IDS[1]])